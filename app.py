@@ -1,22 +1,111 @@
 import os
+import time
 import logging
 import gradio as gr
 import yaml
 from src.rag_pipeline import RAGPipeline
+from src.batching import MicroBatcher
+from src.serving import PipelineLoader, READY, FAILED
+from src.prefork import PreforkPool
+from src.admission import AdmissionController, AdmissionRejected
+from src.api import create_api
+
+# Startup timings are measured from here
+PROCESS_START = time.monotonic()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize the RAG Pipeline
-logger.info("Initializing Intelligence Engine...")
-try:
-    rag = RAGPipeline()
-except Exception as e:
-    logger.error(f"Failed to initialize Intelligence Engine: {e}")
-    rag = None
+def load_app_config(config_path: str = "config.yaml") -> dict:
+    """Read config.yaml for the serving layer; missing or broken config means defaults."""
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, 'r') as f:
+                return yaml.safe_load(f) or {}
+        except Exception as e:
+            logger.warning(f"Config load failed: {e}. Using defaults.")
+    return {}
+
+app_config = load_app_config()
+serving_config = app_config.get('serving', {})
+
+EXAMPLE_QUERIES = [
+    "Identify primary friction points in Credit Card services.",
+    "Analyze recurring issues within Money Transfer protocols.",
+    "Summarize customer sentiment regarding Personal Loan interest disclosures.",
+    "Evaluate common obstacles in Savings Account access.",
+    "Describe the profile of reported fraudulent transactions."
+]
+
+# The engine loads in the background so the dashboard can bind its port at once
+rag = None
+batcher = None
+batching_config = serving_config.get('batching', {})
+warmup_config = serving_config.get('warmup', {})
+prefork_config = serving_config.get('prefork', {})
+
+# Bounded, per-client fair admission in front of the pipeline for the UI and the API
+admission_config = serving_config.get('admission', {})
+admission = AdmissionController(
+    max_concurrency=admission_config.get('max_concurrency', 8),
+    max_queue=admission_config.get('max_queue', 64),
+    max_queue_per_client=admission_config.get('max_queue_per_client', 8),
+    max_queue_time_ms=admission_config.get('max_queue_time_ms', 2000),
+    overflow=admission_config.get('overflow', 'reject')
+)
+
+# Forking is only safe while this process is single-threaded, so a pre-fork pool
+# is started here, before the dashboard, the API server and the loader thread
+# exist; the loader then only warms it up. The port binds after the index loads.
+prefork_pool = None
+if __name__ == "__main__" and prefork_config.get('enabled', False):
+    prefork_pool = PreforkPool(
+        RAGPipeline(load_models=False),
+        workers=prefork_config.get('workers', os.cpu_count() or 1),
+        threads_per_worker=prefork_config.get('threads_per_worker', 1)
+    ).start()
+
+def _build_engine():
+    """RAGPipeline, or the pre-fork pool of workers sharing one copy of its index."""
+    if prefork_pool is not None:
+        return prefork_pool
+    return RAGPipeline()
+
+def _on_engine_loaded(pipeline):
+    """Publish the pipeline (and its batcher) to request handlers."""
+    global rag, batcher
+    # Concurrent clicks are merged into batched pipeline calls
+    if batching_config.get('enabled', False):
+        batcher = MicroBatcher(
+            pipeline,
+            max_batch_size=batching_config.get('max_batch_size', 8),
+            max_wait_ms=batching_config.get('max_wait_ms', 20)
+        )
+    rag = pipeline
 
-def analyze_query(question: str):
+engine = PipelineLoader(
+    _build_engine,
+    warmup_queries=warmup_config.get('queries', EXAMPLE_QUERIES) if warmup_config.get('enabled', True) else [],
+    on_loaded=_on_engine_loaded,
+    started_at=PROCESS_START
+)
+
+def engine_status_markdown() -> str:
+    """Readiness banner shown above the query console."""
+    status = engine.status()
+    if status["state"] == READY:
+        return f"🟢 **Engine ready** ({status['elapsed_s']:.1f}s since launch)"
+    if status["state"] == FAILED:
+        return f"🔴 **Engine offline:** {status['error']}"
+    return f"🟡 **{status['message']}...** ({status['progress']:.0%}, {status['elapsed_s']:.0f}s)"
+
+def refresh_engine_status():
+    """Timer callback: update the banner and stop polling once loading is over."""
+    done = engine.status()["state"] in (READY, FAILED)
+    return engine_status_markdown(), gr.Timer(active=not done)
+
+def analyze_query(question: str, request: gr.Request = None):
     """
     Handle analytical queries and return formatted intelligence with source evidence.
     """
@@ -24,13 +113,22 @@ def analyze_query(question: str):
         return "Warning: Please provide a valid analytical query.", ""
     
     if rag is None:
-        return "Internal Error: Intelligence Engine offline. Contact system administrator.", ""
+        if engine.status()["state"] == FAILED:
+            return "Internal Error: Intelligence Engine offline. Contact system administrator.", ""
+        return "Notice: Intelligence Engine is still starting up. Please retry in a moment.", ""
     
     try:
         logger.info(f"Processing analytical query: {question}")
-        response = rag.query(question)
+        response = admission.run(
+            request.session_hash if request is not None and request.session_hash else "anonymous",
+            lambda: batcher.query(question) if batcher is not None else rag.query(question),
+            degraded=lambda: rag.query_extractive(question)
+        )
+        engine.record_answer()
         
         answer = response.get("answer", "Analysis inconclusive based on available data.")
+        if response.get("served_by", "").startswith("extractive_"):
+            answer += "\n\n_Summary generated from the retrieved records; the language model was busy, unavailable or over its time budget._"
         sources_list = response.get("sources", [])
         
         # Format sources for professional display
@@ -57,6 +155,9 @@ def analyze_query(question: str):
             
         return answer, sources_display
         
+    except AdmissionRejected as e:
+        logger.warning(f"Query shed: {e.reason}")
+        return "Notice: The Intelligence Engine is at capacity. Please retry in a few seconds.", ""
     except Exception as e:
         logger.error(f"Intelligence generation failed: {e}")
         return f"System Failure: {str(e)}", ""
@@ -111,6 +212,8 @@ with gr.Blocks(title="CrediTrust Intelligence Dashboard") as demo:
                 """,
                 elem_classes="header-text"
             )
+            engine_status = gr.Markdown(engine_status_markdown())
+            status_timer = gr.Timer(1.0)
             
             with gr.Group():
                 query_input = gr.Textbox(
@@ -128,13 +231,7 @@ with gr.Blocks(title="CrediTrust Intelligence Dashboard") as demo:
             with sidebar:
                 gr.Markdown("### 📌 Example Queries")
                 gr.Examples(
-                    examples=[
-                        ["Identify primary friction points in Credit Card services."],
-                        ["Analyze recurring issues within Money Transfer protocols."],
-                        ["Summarize customer sentiment regarding Personal Loan interest disclosures."],
-                        ["Evaluate common obstacles in Savings Account access."],
-                        ["Describe the profile of reported fraudulent transactions."]
-                    ],
+                    examples=[[query] for query in EXAMPLE_QUERIES],
                     inputs=[query_input],
                     label=""
                 )
@@ -146,6 +243,8 @@ with gr.Blocks(title="CrediTrust Intelligence Dashboard") as demo:
                 output_sources = gr.Markdown(elem_classes="evidence-panel")
 
     # Event Handlers
+    status_timer.tick(fn=refresh_engine_status, outputs=[engine_status, status_timer])
+
     submit_btn.click(
         fn=analyze_query,
         inputs=query_input,
@@ -159,20 +258,39 @@ with gr.Blocks(title="CrediTrust Intelligence Dashboard") as demo:
         outputs=[query_input, output_answer, output_sources]
     )
 
+# Let concurrent analysts reach the handler at once so the batcher can group them
+demo.queue(default_concurrency_limit=serving_config.get('concurrency_limit', 32))
+
+def _on_port_bound():
+    logger.info(f"Startup: time to port {time.monotonic() - PROCESS_START:.2f}s")
+    engine.start()
+
 # Dashboard Deployment Configuration
 if __name__ == "__main__":
-    config_path = "config.yaml"
-    server_name = "0.0.0.0"
-    server_port = 7860
-    
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-                server_name = config.get('ui', {}).get('server_name', server_name)
-                server_port = config.get('ui', {}).get('server_port', server_port)
-        except Exception as e:
-            logger.warning(f"Config load failed: {e}. Using defaults.")
+    server_name = app_config.get('ui', {}).get('server_name', "0.0.0.0")
+    server_port = app_config.get('ui', {}).get('server_port', 7860)
+    api_config = dict(serving_config.get('api', {}))
             
     logger.info(f"Deploying Intelligence Dashboard at http://{server_name}:{server_port}")
-    demo.launch(server_name=server_name, server_port=server_port, share=False, css=custom_css)
+    if api_config.pop('enabled', True):
+        # JSON API and dashboard share one server and one pipeline instance
+        import uvicorn
+        
+        api = create_api(
+            get_pipeline=lambda: rag,
+            get_batcher=lambda: batcher,
+            get_status=engine.status,
+            config=api_config,
+            on_startup=_on_port_bound,
+            get_metrics=lambda: (rag.metrics.render_prometheus() if hasattr(rag, "metrics") else "")
+            + admission.render_prometheus(),
+            admission=admission
+        )
+        logger.info(f"JSON API available at http://{server_name}:{server_port}/api/v1")
+        app = gr.mount_gradio_app(api, demo, path="/", css=custom_css)
+        uvicorn.run(app, host=server_name, port=server_port)
+    else:
+        demo.launch(server_name=server_name, server_port=server_port, share=False, css=custom_css,
+                    prevent_thread_lock=True)
+        _on_port_bound()
+        demo.block_thread()
@@ -0,0 +1,226 @@
+"""
+Admission control in front of the RAG pipeline.
+
+At most `max_concurrency` requests run at once. Up to `max_queue` more wait in
+per-client FIFO queues that are served round-robin, so one analyst (or one
+bulk API client) cannot starve the others. A request is shed when:
+- the queue is full (`queue_full`)
+- its client already has `max_queue_per_client` requests waiting (`client_queue_full`)
+- it waits longer than `max_queue_time_ms` (`queue_timeout`)
+
+Shed requests raise `AdmissionRejected`, or with `overflow="extractive"` are
+answered by a cheap degraded path (retrieval + extractive summary) outside the
+concurrency limit. Bounding the queue bounds the queueing delay, which keeps
+tail latency of admitted requests stable under bursts.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+from src.instrumentation import Histogram, render_histogram
+
+logger = logging.getLogger(__name__)
+
+QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; `reason` says why."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request shed: {reason}")
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Bounded, per-client fair admission queue with load shedding.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 64,
+        max_queue_per_client: int = 8,
+        max_queue_time_ms: float = 2000,
+        overflow: str = "reject"
+    ):
+        """
+        Args:
+            max_concurrency: Requests allowed to run at once
+            max_queue: Requests allowed to wait across all clients
+            max_queue_per_client: Requests one client may have waiting
+            max_queue_time_ms: Longest a request may wait before it is shed
+            overflow: "reject" to raise AdmissionRejected, or "extractive" to
+                serve shed requests through the degraded path given to `run`
+        """
+        if overflow not in ("reject", "extractive"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.max_queue_per_client = max(1, int(max_queue_per_client))
+        self.max_queue_time = max_queue_time_ms / 1000.0
+        self.overflow = overflow
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+        self._queues = {}          # client_id -> deque of waiting tickets
+        self._rotation = deque()   # clients with waiting tickets, in service order
+
+        self.admitted = 0
+        self.degraded = 0
+        self.shed = {"queue_full": 0, "client_queue_full": 0, "queue_timeout": 0}
+        self.queue_wait = Histogram(QUEUE_WAIT_BUCKETS)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    @property
+    def in_flight(self) -> int:
+        return self._active
+
+    def acquire(self, client_id: str = "anonymous") -> float:
+        """
+        Wait for a slot.
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            AdmissionRejected: The request was shed
+        """
+        started = time.monotonic()
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._active += 1
+                self._admit(0.0)
+                return 0.0
+            if self._waiting >= self.max_queue:
+                self._shed("queue_full")
+            client_queue = self._queues.get(client_id)
+            if client_queue is not None and len(client_queue) >= self.max_queue_per_client:
+                self._shed("client_queue_full")
+            if client_queue is None:
+                client_queue = self._queues[client_id] = deque()
+                self._rotation.append(client_id)
+            ticket = threading.Event()
+            client_queue.append(ticket)
+            self._waiting += 1
+
+        ticket.wait(self.max_queue_time)
+
+        with self._lock:
+            if not ticket.is_set():
+                # Timed out before release() handed this ticket a slot
+                client_queue.remove(ticket)
+                self._waiting -= 1
+                if not client_queue:
+                    del self._queues[client_id]
+                    self._rotation.remove(client_id)
+                self._shed("queue_timeout")
+            waited = time.monotonic() - started
+            self._admit(waited)
+        return waited
+
+    def release(self):
+        """Free a slot, handing it to the next client in round-robin order."""
+        with self._lock:
+            if self._rotation:
+                client_id = self._rotation.popleft()
+                client_queue = self._queues[client_id]
+                ticket = client_queue.popleft()
+                self._waiting -= 1
+                if client_queue:
+                    self._rotation.append(client_id)
+                else:
+                    del self._queues[client_id]
+                # The slot passes straight to the waiter; _active is unchanged
+                ticket.set()
+            else:
+                self._active -= 1
+
+    @contextmanager
+    def admit(self, client_id: str = "anonymous") -> Iterator[float]:
+        """Hold a slot for the enclosed block; yields the seconds spent queued."""
+        waited = self.acquire(client_id)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def run(self, client_id: str, fn: Callable[[], Any], degraded: Callable[[], Any] = None) -> Any:
+        """
+        Run `fn` under admission control.
+
+        Args:
+            client_id: Fairness key (session, API key or client address)
+            fn: The full request
+            degraded: Cheap fallback used for shed requests when overflow="extractive"
+
+        Returns:
+            The result of `fn`, or of `degraded` if the request was shed
+        """
+        try:
+            self.acquire(client_id)
+        except AdmissionRejected as e:
+            if self.overflow != "extractive" or degraded is None:
+                raise
+            logger.warning(f"{e}; serving degraded response to {client_id}")
+            with self._lock:
+                self.degraded += 1
+            return degraded()
+        try:
+            return fn()
+        finally:
+            self.release()
+
+    def _admit(self, waited: float):
+        self.admitted += 1
+        self.queue_wait.observe(waited)
+
+    def _shed(self, reason: str):
+        self.shed[reason] += 1
+        raise AdmissionRejected(reason)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self._active,
+                "queue_depth": self._waiting,
+                "admitted": self.admitted,
+                "degraded": self.degraded,
+                "shed": dict(self.shed)
+            }
+
+    def render_prometheus(self, prefix: str = "rag_admission") -> str:
+        """Gauges, counters and the queue-wait histogram in Prometheus text format."""
+        with self._lock:
+            lines = [
+                f"# HELP {prefix}_queue_depth Requests waiting for a slot.",
+                f"# TYPE {prefix}_queue_depth gauge",
+                f"{prefix}_queue_depth {self._waiting}",
+                f"# HELP {prefix}_in_flight Requests holding a slot.",
+                f"# TYPE {prefix}_in_flight gauge",
+                f"{prefix}_in_flight {self._active}",
+                f"# HELP {prefix}_admitted_total Requests admitted.",
+                f"# TYPE {prefix}_admitted_total counter",
+                f"{prefix}_admitted_total {self.admitted}",
+                f"# HELP {prefix}_shed_total Requests shed, by reason.",
+                f"# TYPE {prefix}_shed_total counter"
+            ]
+            lines.extend(f'{prefix}_shed_total{{reason="{reason}"}} {count}' for reason, count in sorted(self.shed.items()))
+            lines.extend([
+                f"# HELP {prefix}_degraded_total Shed requests answered by the extractive path.",
+                f"# TYPE {prefix}_degraded_total counter",
+                f"{prefix}_degraded_total {self.degraded}",
+                f"# HELP {prefix}_queue_wait_seconds Time admitted requests spent queued.",
+                f"# TYPE {prefix}_queue_wait_seconds histogram"
+            ])
+            lines.extend(render_histogram(f"{prefix}_queue_wait_seconds", self.queue_wait))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,397 @@
+"""
+Precomputed Aggregate Cube for Counting and Trend Questions
+
+Questions such as "how many money transfer complaints about fraud in 2023 by
+state?" are aggregates: answering them from three retrieved chunks is slow
+and wrong. `build_cube` counts the processed complaints once per
+(product_category, issue, company, state, month) cell and stores the cells
+as dictionary-encoded NumPy arrays in a single .npz file (no pickle), a few
+MB even for the full dataset. `AggregateCube.count` answers filtered and
+grouped counts with vectorised masks in milliseconds, and
+`AggregateCube.parse_question` recognises counting/trend questions so
+`RAGPipeline.query` can answer them from the cube instead of the LLM.
+
+Usage:
+    python -m src.aggregate_cube --input data/processed/complaints_parquet --output data/processed/aggregate_cube.npz
+    python -m src.aggregate_cube --cube data/processed/aggregate_cube.npz --question "How many credit card complaints by state in 2023?"
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.preprocessing import DATE_COL, read_processed_parquet
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cube dimension -> processed-data column (the names match the chunk metadata keys)
+DIMENSIONS = {
+    "product_category": "Product",
+    "issue": "Issue",
+    "company": "Company",
+    "state": "State",
+    "month": DATE_COL
+}
+# Derived from "month"; usable in filters and group_by like a dimension
+YEAR = "year"
+
+# Routing needs explicit counting intent, or a trend / breakdown phrase tied to
+# the word "complaints": "monthly fees" or "issues across products" alone are
+# qualitative questions for retrieval.
+_NEAR = r"(?:\W+\w+){0,4}?\W+"
+_COUNT_RE = re.compile(rf"\b(?:how many|count of|count the|tally of)\b|(?<!\ba )\b(?:number|volume) of{_NEAR}complaints?\b")
+_TREND_TERMS = r"trends?|trending|over time|per month|per year|each month|each year"
+_TREND_RE = re.compile(
+    rf"\b(?:monthly|yearly|annual) complaints?\b"
+    rf"|\bcomplaints?{_NEAR}(?:{_TREND_TERMS})\b|\b(?:{_TREND_TERMS}){_NEAR}complaints?\b"
+)
+_GROUP_TERMS = r"(?:by|per|for each|across) (products?|issues?|compan(?:y|ies)|states?|months?|years?)"
+_GROUP_RE = re.compile(rf"\b{_GROUP_TERMS}\b")
+_COMPLAINTS_GROUP_RE = re.compile(rf"\bcomplaints?{_NEAR}{_GROUP_TERMS}\b")
+_GROUP_WORDS = {
+    "product": "product_category", "issue": "issue", "compan": "company",
+    "state": "state", "month": "month", "year": YEAR
+}
+_YEAR_RE = re.compile(r"\b((?:19|20)\d{2})\b")
+_YEAR_RANGE_RE = re.compile(r"\b(?:between|from) ((?:19|20)\d{2}) (?:and|to|-) ((?:19|20)\d{2})\b")
+_SINCE_RE = re.compile(r"\b(since|after|from) ((?:19|20)\d{2})\b")
+# Alias fragments too generic to identify a product or issue on their own
+_GENERIC_TERMS = {
+    "other", "problem", "problems", "issue", "issues", "account", "service", "services", "terms",
+    "loan", "card", "money", "company", "information", "managing", "trouble", "fees", "report"
+}
+
+# Capitalised words that are not names the cube would need to match
+_CAPITALISED_OK = {
+    "i", "cfpb", "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december"
+}
+_CAPITALISED_RE = re.compile(r"\b[A-Z][\w&'-]*")
+
+
+def _label(value: str) -> str:
+    return value if value else "(not provided)"
+
+
+class AggregateCube:
+    """
+    Complaint counts per (product_category, issue, company, state, month) cell.
+    """
+
+    def __init__(self, values: Dict[str, np.ndarray], codes: Dict[str, np.ndarray], counts: np.ndarray):
+        """
+        Args:
+            values: Dimension -> sorted array of distinct values (the dictionary)
+            codes: Dimension -> int32 code per cell, indexing `values[dimension]`
+            counts: Complaint count per cell
+        """
+        self.values = values
+        self.codes = codes
+        self.counts = counts
+        self._lookup = {dim: {str(v).lower(): i for i, v in enumerate(vals)} for dim, vals in values.items()}
+        # Year of each month code, for year filters and grouping
+        self._month_years = np.array([int(m[:4]) if m[:4].isdigit() else 0 for m in values["month"]], dtype=np.int32)
+        self._aliases = None
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def cells(self) -> int:
+        return len(self.counts)
+
+    def save(self, path: str):
+        """Write the cube as one uncompressed .npz (loadable without pickle)."""
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        arrays = {"counts": self.counts}
+        for dim in DIMENSIONS:
+            arrays[f"values_{dim}"] = self.values[dim].astype(str)
+            arrays[f"codes_{dim}"] = self.codes[dim]
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "AggregateCube":
+        with np.load(path, allow_pickle=False) as data:
+            values = {dim: data[f"values_{dim}"] for dim in DIMENSIONS}
+            codes = {dim: data[f"codes_{dim}"] for dim in DIMENSIONS}
+            counts = data["counts"]
+        return cls(values, codes, counts)
+
+    def _wanted_codes(self, dimension: str, wanted: Any) -> np.ndarray:
+        """Codes of the requested values (case-insensitive; unknown values match nothing)."""
+        wanted = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+        if dimension == YEAR:
+            return np.flatnonzero(np.isin(self._month_years, [int(year) for year in wanted]))
+        lookup = self._lookup[dimension]
+        return np.array([lookup[str(v).lower()] for v in wanted if str(v).lower() in lookup], dtype=np.int32)
+
+    def _group_codes(self, dimension: str, mask: np.ndarray):
+        """Per-cell group codes for the masked cells, and the label of each code."""
+        if dimension == YEAR:
+            years = self._month_years[self.codes["month"][mask]]
+            labels, codes = np.unique(years, return_inverse=True)
+            return codes, [str(year) for year in labels]
+        return self.codes[dimension][mask], [_label(str(v)) for v in self.values[dimension]]
+
+    def count(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        group_by: Optional[List[str]] = None,
+        limit: Optional[int] = 10
+    ) -> Dict[str, Any]:
+        """
+        Count complaints matching `filters`, optionally broken down by dimensions.
+
+        Args:
+            filters: Dimension (or "year") -> value or list of values
+            group_by: Dimensions (or "year") to break the count down by
+            limit: Largest groups to return (None for all); month/year
+                breakdowns are returned in chronological order instead
+
+        Returns:
+            {"total", "filters", "group_by", "groups": [{<dim>: value, ..., "count"}]}
+        """
+        filters = {key: value for key, value in (filters or {}).items() if value not in (None, [], "")}
+        group_by = list(group_by or [])
+        for dimension in list(filters) + group_by:
+            if dimension not in DIMENSIONS and dimension != YEAR:
+                raise ValueError(f"Unknown aggregate dimension: {dimension}")
+
+        mask = np.ones(self.cells, dtype=bool)
+        for dimension, wanted in filters.items():
+            column = self.codes["month" if dimension == YEAR else dimension]
+            mask &= np.isin(column, self._wanted_codes(dimension, wanted))
+        counts = self.counts[mask]
+        result = {"total": int(counts.sum()), "filters": filters, "group_by": group_by, "groups": []}
+        if not group_by:
+            return result
+
+        # Mixed-radix key over the grouped dimensions, then one bincount
+        key = np.zeros(len(counts), dtype=np.int64)
+        labels = []
+        for dimension in group_by:
+            codes, dim_labels = self._group_codes(dimension, mask)
+            key = key * len(dim_labels) + codes
+            labels.append(dim_labels)
+        unique_keys, inverse = np.unique(key, return_inverse=True)
+        sums = np.bincount(inverse, weights=counts).astype(np.int64)
+
+        chronological = group_by[0] in ("month", YEAR)
+        order = np.arange(len(unique_keys)) if chronological else np.argsort(-sums, kind="stable")
+        if limit is not None and not chronological:
+            order = order[:limit]
+        for i in order:
+            remainder, group = int(unique_keys[i]), {}
+            for dimension, dim_labels in zip(reversed(group_by), reversed(labels)):
+                remainder, code = divmod(remainder, len(dim_labels))
+                group[dimension] = dim_labels[code]
+            result["groups"].append({**{dim: group[dim] for dim in group_by}, "count": int(sums[i])})
+        return result
+
+    def _build_aliases(self) -> Dict[str, List[tuple]]:
+        """Question phrases identifying each product, issue and company value."""
+        aliases = {}
+        for dimension in ("product_category", "issue"):
+            entries = []
+            for value in self.values[dimension]:
+                value = str(value)
+                parts = re.split(r",\s*(?:or\s+)?|\s+or\s+|\s+and\s+", value.lower())
+                for part in {value.lower(), *parts}:
+                    part = part.strip()
+                    if len(part) >= 4 and part not in _GENERIC_TERMS:
+                        entries.append((re.compile(rf"\b{re.escape(re.sub(r's$', '', part))}s?\b"), value))
+            aliases[dimension] = entries
+        companies = []
+        for value in self.values["company"]:
+            name = str(value).split(",")[0].strip().lower()
+            if len(name) >= 4:
+                companies.append((re.compile(rf"\b{re.escape(name)}\b"), str(value)))
+        aliases["company"] = companies
+        return aliases
+
+    def parse_question(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Recognise a counting or trend question about complaints.
+
+        Args:
+            question: Free-text user question
+
+        Returns:
+            {"filters", "group_by"} for `count`, or None if the question is
+            not an aggregate one, or qualifies its count with nothing the cube
+            recognises (no filter or breakdown) or with a capitalised name it
+            does not know, e.g. an unlisted company. Counting the whole corpus
+            there would be confidently wrong, so such questions go to retrieval.
+        """
+        question = " ".join(question.split())
+        text = question.lower()
+        groups = [_GROUP_WORDS[next(w for w in _GROUP_WORDS if m.startswith(w))] for m in _GROUP_RE.findall(text)]
+        is_count = bool(_COUNT_RE.search(text))
+        is_trend = bool(_TREND_RE.search(text))
+        if not (is_count or is_trend or _COMPLAINTS_GROUP_RE.search(text)):
+            return None
+        if is_trend and not any(dim in ("month", YEAR) for dim in groups):
+            groups.append(YEAR if re.search(r"\b(per year|yearly|each year|annual)", text) else "month")
+
+        if self._aliases is None:
+            self._aliases = self._build_aliases()
+        filters = {}
+        spans = []
+        for dimension, entries in self._aliases.items():
+            matched = set()
+            for pattern, value in entries:
+                for match in pattern.finditer(text):
+                    matched.add(value)
+                    spans.append(match.span())
+            if matched:
+                filters[dimension] = sorted(matched)
+        states = [token for token in re.findall(r"\b[A-Z]{2}\b", question) if token.lower() in self._lookup["state"]]
+        if states:
+            filters["state"] = sorted(set(states))
+
+        year_range, since = _YEAR_RANGE_RE.search(text), _SINCE_RE.search(text)
+        if year_range:
+            first, last = sorted(int(year) for year in year_range.groups())
+            filters[YEAR] = list(range(first, last + 1))
+        elif since:
+            first = int(since.group(2)) + (since.group(1) == "after")
+            last = max(int(self._month_years.max(initial=0)), first)
+            filters[YEAR] = list(range(first, last + 1))
+        elif _YEAR_RE.search(text):
+            filters[YEAR] = sorted({int(year) for year in _YEAR_RE.findall(text)})
+
+        if not filters and not groups:
+            return None
+        for match in _CAPITALISED_RE.finditer(question):
+            word = match.group()
+            if (match.start() == 0 or word.lower() in _CAPITALISED_OK or word in states
+                    or any(start <= match.start() < end for start, end in spans)):
+                continue
+            return None
+        return {"filters": filters, "group_by": list(dict.fromkeys(groups))}
+
+
+def format_answer(result: Dict[str, Any], max_groups: int = 10) -> str:
+    """Plain-text answer citing the counts."""
+    described = []
+    for dimension, value in result["filters"].items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        described.append(f"{dimension.replace('_', ' ')}: {' or '.join(str(v) for v in values)}")
+    scope = f" matching {'; '.join(described)}" if described else ""
+    parts = [f"There are {result['total']:,} complaints{scope}."]
+    if result["groups"]:
+        dims = result["group_by"]
+        chronological = dims[0] in ("month", YEAR)
+        shown = result["groups"] if chronological else result["groups"][:max_groups]
+        breakdown = ", ".join(f"{' / '.join(group[dim] for dim in dims)}: {group['count']:,}" for group in shown)
+        qualifier = "" if chronological else f" (top {len(shown)})"
+        parts.append(f"By {' and '.join(dim.replace('_', ' ') for dim in dims)}{qualifier}: {breakdown}.")
+    parts.append("Counts are from the precomputed complaint aggregates, not from retrieved excerpts.")
+    return " ".join(parts)
+
+
+def _cell_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Complaint counts per cube cell for one chunk of processed rows."""
+    cells = pd.DataFrame({
+        dim: df[col].astype("string").fillna("").str.strip() if col in df.columns else ""
+        for dim, col in DIMENSIONS.items()
+    })
+    cells["month"] = cells["month"].str.slice(0, 7)
+    return cells.groupby(list(DIMENSIONS), observed=True, sort=False).size().rename("count").reset_index()
+
+
+def _iter_processed(input_path: str, chunk_size: int = 200000) -> Iterator[pd.DataFrame]:
+    columns = list(DIMENSIONS.values())
+    if os.path.isdir(input_path) or input_path.endswith(".parquet"):
+        yield read_processed_parquet(input_path, columns=columns)
+    else:
+        yield from pd.read_csv(input_path, usecols=lambda c: c in columns, chunksize=chunk_size, dtype=str)
+
+
+def build_cube(frames) -> AggregateCube:
+    """
+    Count complaints per cell and dictionary-encode the cells.
+
+    Args:
+        frames: DataFrame or iterable of DataFrames of processed complaints
+
+    Returns:
+        AggregateCube
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    partials = [_cell_counts(frame) for frame in frames]
+    if partials:
+        cells = pd.concat(partials, ignore_index=True).groupby(list(DIMENSIONS), sort=False)["count"].sum().reset_index()
+    else:
+        cells = pd.DataFrame({**{dim: pd.Series(dtype=str) for dim in DIMENSIONS}, "count": pd.Series(dtype=np.int64)})
+
+    values, codes = {}, {}
+    for dim in DIMENSIONS:
+        dim_codes, uniques = pd.factorize(cells[dim].astype(str), sort=True)
+        values[dim] = np.asarray(uniques, dtype=str)
+        codes[dim] = dim_codes.astype(np.int32)
+    return AggregateCube(values, codes, cells["count"].to_numpy(dtype=np.int64))
+
+
+def build_cube_from_path(input_path: str, output_path: str) -> AggregateCube:
+    """Build the cube from the processed CSV or Parquet dataset and save it."""
+    started = time.perf_counter()
+    cube = build_cube(_iter_processed(input_path))
+    cube.save(output_path)
+    logger.info(
+        f"Aggregated {cube.total:,} complaints into {cube.cells:,} cells in {time.perf_counter() - started:.1f}s "
+        f"({os.path.getsize(output_path) / 1e6:.2f} MB at {output_path})"
+    )
+    return cube
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the complaint aggregate cube.")
+    parser.add_argument("--input", default=None, help="Processed CSV or Parquet dataset to aggregate")
+    parser.add_argument("--output", default="data/processed/aggregate_cube.npz", help="Where to write the cube")
+    parser.add_argument("--cube", default=None, help="Existing cube to query instead of building one")
+    parser.add_argument("--question", default=None, help="Counting/trend question to answer")
+    args = parser.parse_args()
+
+    if args.cube:
+        cube = AggregateCube.load(args.cube)
+    else:
+        input_path = args.input
+        if input_path is None:
+            input_path = "data/processed/complaints_parquet"
+            if not os.path.isdir(input_path):
+                input_path = "data/processed/filtered_complaints.csv"
+        cube = build_cube_from_path(input_path, args.output)
+
+    if args.question:
+        started = time.perf_counter()
+        parsed = cube.parse_question(args.question)
+        if parsed is None:
+            print("Not a counting or trend question; it would be answered by the RAG pipeline.")
+            return 1
+        result = cube.count(**parsed)
+        print(format_answer(result))
+        print(json.dumps(result, indent=2))
+        print(f"\nAnswered in {(time.perf_counter() - started) * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+JSON HTTP API for the RAG pipeline.
+
+Served by `app.py` next to the Gradio dashboard and sharing its pipeline
+instance. Endpoints (all under `/api/v1`):
+- POST /query         one question -> response dict
+- POST /query/batch   many questions answered in one batched pipeline call
+- POST /search        retrieval only, with `k` and a metadata `filter`
+- POST /aggregate     complaint counts from the aggregate cube (`filters`, `group_by`)
+- POST /query/stream  server-sent events: `sources`, `token`..., `done`
+- GET  /health        engine readiness
+
+plus GET /metrics (Prometheus text format) at the root. Sending
+`X-Profile: 1` with /query profiles that request (see src/profiling.py).
+
+Requests are bounded in body size (declared or streamed), question length,
+batch size and `k`.
+Pipeline calls go through an `AdmissionController` (shared with the dashboard
+when app.py passes one in), keyed by the `X-Client-Id` header or the client
+address; shed requests receive 503 with a Retry-After header (429 when the
+client's own queue is full), or an extractive answer for /query when the
+controller's overflow policy is "extractive".
+"""
+
+import json
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from src.admission import AdmissionController, AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_CONFIG = {
+    "max_body_bytes": 65536,
+    "max_question_chars": 2000,
+    "max_batch_size": 64,
+    "max_k": 50,
+    # Only used when create_api builds its own AdmissionController
+    "max_concurrency": 8,
+    "queue_timeout_s": 10.0,
+    "allow_profile_header": True
+}
+
+
+class QueryRequest(BaseModel):
+    question: str
+    k: Optional[int] = None
+    filter: Optional[Dict[str, Any]] = None
+    deadline_ms: Optional[float] = None
+
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    k: Optional[int] = None
+    filter: Optional[Dict[str, Any]] = None
+
+
+class SearchRequest(BaseModel):
+    query: str
+    k: Optional[int] = None
+    filter: Optional[Dict[str, Any]] = None
+
+
+class AggregateRequest(BaseModel):
+    filters: Optional[Dict[str, Any]] = None
+    group_by: Optional[List[str]] = None
+    limit: Optional[int] = 10
+
+
+class BodySizeLimit:
+    """
+    ASGI middleware answering 413 to request bodies over `max_bytes`.
+
+    A declared Content-Length is checked up front; bodies without one
+    (chunked transfer encoding) are counted as they are read.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": "Request body too large"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the endpoint's body read, so FastAPI renders it
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class _SlotStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that calls `release` once it is done, however it ends.
+
+    Releasing in the body generator's `finally` is not enough: a generator
+    closed before its first `next()` (client gone, or sending the headers
+    failed) never runs its body, so the admission slot would leak.
+    """
+
+    def __init__(self, content, release: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release()
+
+
+def _sse(event: str, data: Any) -> str:
+    """Encode one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_api(
+    get_pipeline: Callable[[], Any],
+    get_batcher: Callable[[], Any] = None,
+    get_status: Callable[[], Dict[str, Any]] = None,
+    config: Dict[str, Any] = None,
+    on_startup: Callable[[], None] = None,
+    get_metrics: Callable[[], str] = None,
+    admission: AdmissionController = None
+) -> FastAPI:
+    """
+    Build the FastAPI app.
+
+    Args:
+        get_pipeline: Returns the shared RAGPipeline, or None while it is loading
+        get_batcher: Returns the shared MicroBatcher, if any
+        get_status: Returns the engine readiness dict for /health
+        config: Overrides for DEFAULT_API_CONFIG (the `serving.api` config section)
+        on_startup: Called once the server is accepting connections
+        get_metrics: Returns the Prometheus exposition text for /metrics
+        admission: Shared admission controller (defaults to one sized by
+            `max_concurrency` / `queue_timeout_s`)
+
+    Returns:
+        FastAPI application; mount the Gradio dashboard on it with
+        `gr.mount_gradio_app`
+    """
+    settings = {**DEFAULT_API_CONFIG, **(config or {})}
+    if admission is None:
+        admission = AdmissionController(
+            max_concurrency=settings["max_concurrency"],
+            max_queue_time_ms=settings["queue_timeout_s"] * 1000
+        )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if on_startup is not None:
+            on_startup()
+        yield
+
+    app = FastAPI(title="CrediTrust Complaint Intelligence API", lifespan=lifespan)
+    router = APIRouter(prefix="/api/v1")
+
+    app.add_middleware(BodySizeLimit, max_bytes=settings["max_body_bytes"])
+
+    def pipeline_or_503():
+        pipeline = get_pipeline()
+        if pipeline is None:
+            raise HTTPException(status_code=503, detail="Engine is starting up", headers={"Retry-After": "5"})
+        return pipeline
+
+    def check_question(text: str):
+        if not text or not text.strip():
+            raise HTTPException(status_code=422, detail="Question must not be empty")
+        if len(text) > settings["max_question_chars"]:
+            raise HTTPException(status_code=413, detail=f"Question exceeds {settings['max_question_chars']} characters")
+
+    def check_k(k: Optional[int]):
+        if k is not None and not 1 <= k <= settings["max_k"]:
+            raise HTTPException(status_code=422, detail=f"k must be between 1 and {settings['max_k']}")
+
+    def client_id(http_request: Request) -> str:
+        return http_request.headers.get("x-client-id") or (http_request.client.host if http_request.client else "anonymous")
+
+    def rejected(e: AdmissionRejected) -> HTTPException:
+        status = 429 if e.reason == "client_queue_full" else 503
+        return HTTPException(status_code=status, detail=f"Server busy ({e.reason}), retry later",
+                             headers={"Retry-After": "1"})
+
+    @contextmanager
+    def slot(http_request: Request):
+        try:
+            admission.acquire(client_id(http_request))
+        except AdmissionRejected as e:
+            raise rejected(e)
+        try:
+            yield
+        finally:
+            admission.release()
+
+    @router.get("/health")
+    def health():
+        status = get_status() if get_status is not None else {"state": "ready"}
+        return JSONResponse(status_code=200 if get_pipeline() is not None else 503, content=status)
+
+    @router.post("/query")
+    def query(request: QueryRequest, http_request: Request, x_profile: Optional[str] = Header(default=None)):
+        check_question(request.question)
+        check_k(request.k)
+        pipeline = pipeline_or_503()
+        batcher = get_batcher() if get_batcher is not None else None
+        profile = settings["allow_profile_header"] and x_profile not in (None, "", "0", "false")
+
+        def answer():
+            if batcher is not None and not profile and request.k is None and request.filter is None \
+                    and request.deadline_ms is None:
+                return batcher.query(request.question)
+            return pipeline.query(request.question, k=request.k, filter=request.filter, profile=profile,
+                                  deadline_ms=request.deadline_ms)
+
+        try:
+            return admission.run(
+                client_id(http_request),
+                answer,
+                degraded=lambda: pipeline.query_extractive(request.question, k=request.k, filter=request.filter)
+            )
+        except AdmissionRejected as e:
+            raise rejected(e)
+
+    @router.post("/query/batch")
+    def query_batch(request: BatchQueryRequest, http_request: Request):
+        if not request.questions:
+            raise HTTPException(status_code=422, detail="questions must not be empty")
+        if len(request.questions) > settings["max_batch_size"]:
+            raise HTTPException(status_code=413, detail=f"At most {settings['max_batch_size']} questions per batch")
+        for question in request.questions:
+            check_question(question)
+        check_k(request.k)
+        pipeline = pipeline_or_503()
+        with slot(http_request):
+            return {"responses": pipeline.query_batch(request.questions, k=request.k, filter=request.filter)}
+
+    @router.post("/search")
+    def search(request: SearchRequest, http_request: Request):
+        check_question(request.query)
+        check_k(request.k)
+        pipeline = pipeline_or_503()
+        with slot(http_request):
+            results = pipeline.retrieve_relevant_complaints(request.query, k=request.k, filter=request.filter)
+        return {"query": request.query, "results": results}
+
+    @router.post("/aggregate")
+    def aggregate(request: AggregateRequest, http_request: Request):
+        pipeline = pipeline_or_503()
+        if getattr(pipeline, "cube", None) is None:
+            raise HTTPException(status_code=404, detail="No aggregate cube loaded")
+        with slot(http_request):
+            try:
+                return pipeline.query_aggregate(request.filters, request.group_by, request.limit)
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+
+    @router.post("/query/stream")
+    def query_stream(request: QueryRequest, http_request: Request):
+        check_question(request.question)
+        check_k(request.k)
+        pipeline = pipeline_or_503()
+        try:
+            admission.acquire(client_id(http_request))
+        except AdmissionRejected as e:
+            raise rejected(e)
+
+        def events() -> Iterator[str]:
+            try:
+                for item in pipeline.stream_answer(request.question, k=request.k, filter=request.filter,
+                                                   deadline_ms=request.deadline_ms):
+                    yield _sse(item["event"], item["data"])
+            except Exception as e:
+                logger.error(f"Streaming query failed: {e}")
+                yield _sse("error", {"detail": str(e)})
+
+        # The slot is held until the stream finishes or the client disconnects
+        return _SlotStreamingResponse(events(), admission.release, media_type="text/event-stream",
+                                      headers={"Cache-Control": "no-cache"})
+
+    @app.get("/metrics")
+    def metrics():
+        body = get_metrics() if get_metrics is not None else ""
+        return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+    app.include_router(router)
+    return app
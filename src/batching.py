@@ -0,0 +1,116 @@
+"""
+Dynamic micro-batching for concurrent dashboard requests.
+
+Queries submitted from many request threads are collected for up to
+`max_wait_ms` (or until `max_batch_size` is reached) and answered with a
+single `RAGPipeline.query_batch` call, so embedding, FAISS search and
+generation run as batched forward passes instead of one per request.
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent queries into batches for a shared pipeline.
+    """
+
+    def __init__(self, rag_pipeline, max_batch_size: int = 8, max_wait_ms: float = 20.0):
+        """
+        Args:
+            rag_pipeline: Object exposing `query_batch(List[str]) -> List[Dict]`;
+                if it also has `resolve_deadline`, time spent queued here
+                counts against each query's deadline
+            max_batch_size: Largest number of queries answered in one call
+            max_wait_ms: How long the first query of a batch waits for company
+        """
+        self.rag = rag_pipeline
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self.batches_run = 0
+        self.queries_served = 0
+
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, question: str) -> Future:
+        """Queue a question; the returned future resolves to its response dict."""
+        if self._stopped.is_set():
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((question, future, time.monotonic()))
+        return future
+
+    def query(self, question: str, timeout: float = None) -> Dict[str, Any]:
+        """Blocking convenience wrapper with the same contract as `RAGPipeline.query`."""
+        return self.submit(question).result(timeout=timeout)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.queries_served / self.batches_run if self.batches_run else 0.0
+
+    def _collect(self, first) -> List:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown sentinel: finish this batch, then stop.
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            # Skip callers that gave up before their batch started
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            questions = [question for question, _, _ in batch]
+            try:
+                if hasattr(self.rag, "resolve_deadline"):
+                    # The batch is due when its longest-waiting query is
+                    deadline = self.rag.resolve_deadline()
+                    if deadline is not None:
+                        deadline -= time.monotonic() - min(submitted for _, _, submitted in batch)
+                    responses = self.rag.query_batch(questions, deadline=deadline)
+                else:
+                    responses = self.rag.query_batch(questions)
+            except Exception as e:
+                logger.error(f"Batched query failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.queries_served += len(batch)
+            for (_, future, _), response in zip(batch, responses):
+                future.set_result(response)
+
+    def close(self, timeout: float = 5.0):
+        """Stop accepting work and let the worker drain the queue."""
+        self._stopped.set()
+        self._queue.put(None)
+        self._worker.join(timeout=timeout)
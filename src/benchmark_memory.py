@@ -0,0 +1,298 @@
+"""
+Peak-Memory and Startup Benchmark for Index Build and Load
+
+For each corpus size (complaints indexed) this runs, each in a fresh process:
+- build:  load_and_sample_data -> chunk_complaints -> build_and_save_vector_store
+- ingest: ingest_from_parquet over the same chunks with precomputed embeddings
+- load:   RAGPipeline._load_vector_store (the serving startup path)
+
+and records per stage: wall time, peak RSS (the kernel high-water mark, reset
+before every stage through /proc/self/clear_refs), RSS growth, the
+tracemalloc peak and the allocation sites that grew most since the previous
+stage, plus an RSS timeline sampled in the background. tracemalloc only sees
+Python and NumPy allocations (not FAISS's C++ heap) and slows the run; pass
+`--no_tracemalloc` for accurate wall times.
+
+A linear fit of peak RSS against corpus size per stage is the scaling curve
+used to predict the memory needed for `--predict` complaints.
+
+The corpus comes from src/synthetic_corpus.py. `--embeddings hashing` uses
+the model-free HashingEmbeddings of the model's dimension, which is enough to
+measure the index and docstore without loading the embedding model.
+
+Usage:
+    python -m src.benchmark_memory --sizes 10000 20000 40000 --embeddings hashing
+    python -m src.benchmark_memory --sizes 5000 10000 --predict 1370000 --output memory.json
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+import yaml
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def _proc_status_mb() -> Dict[str, float]:
+    """Current (VmRSS) and peak (VmHWM) resident set size of this process."""
+    fields = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    fields[line.split(':')[0]] = int(line.split()[1]) / 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        fields = {'VmRSS': peak, 'VmHWM': peak}
+    return fields
+
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM to the current RSS (Linux >= 4.0); False if unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class MemoryMonitor:
+    """
+    Per-stage wall time, peak RSS and tracemalloc statistics for one process.
+    """
+
+    def __init__(self, trace_allocations: bool = True, sample_interval: float = 0.05, top_n: int = 10):
+        """
+        Args:
+            trace_allocations: Run tracemalloc and snapshot at the end of each stage
+            sample_interval: Seconds between RSS timeline samples
+            top_n: Allocation sites reported per stage
+        """
+        self.trace_allocations = trace_allocations
+        self.top_n = top_n
+        self.stages = []
+        self.timeline = []
+        self._started = time.perf_counter()
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, args=(sample_interval,), daemon=True)
+        self._sampler.start()
+        if trace_allocations:
+            tracemalloc.start(10)
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def _sample(self, interval: float):
+        while not self._stop.wait(interval):
+            self.timeline.append((round(time.perf_counter() - self._started, 3), _proc_status_mb()['VmRSS']))
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """Measure the enclosed block; yields the stage record for extra fields."""
+        peak_reset = _reset_peak_rss()
+        before = _proc_status_mb()['VmRSS']
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+        record = {"stage": name, "start_s": round(time.perf_counter() - self._started, 3)}
+        started = time.perf_counter()
+        yield record
+        record["wall_s"] = time.perf_counter() - started
+        status = _proc_status_mb()
+        record.update({
+            "rss_before_mb": before,
+            "rss_after_mb": status['VmRSS'],
+            # Without clear_refs the high-water mark covers the whole process lifetime
+            "peak_rss_mb": status['VmHWM'],
+            "peak_rss_is_per_stage": peak_reset
+        })
+        if self.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            growth = snapshot.compare_to(self._snapshot, 'lineno')[:self.top_n]
+            self._snapshot = snapshot
+            record.update({
+                "traced_current_mb": current / 1e6,
+                "traced_peak_mb": peak / 1e6,
+                "top_growth": [
+                    {"site": str(stat.traceback[0]), "size_diff_mb": stat.size_diff / 1e6, "count_diff": stat.count_diff}
+                    for stat in growth
+                ]
+            })
+        self.stages.append(record)
+
+    def close(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._sampler.join()
+        if self.trace_allocations:
+            tracemalloc.stop()
+        return {"stages": self.stages, "rss_timeline": self.timeline}
+
+
+def _embeddings(kind: str):
+    from src.embeddings import create_embeddings
+    return create_embeddings("hashing:384" if kind == "hashing" else EMBEDDING_MODEL)
+
+
+def _run_build(processed_path: str, size: int, store_path: str, embeddings_kind: str,
+               trace_allocations: bool) -> Dict[str, Any]:
+    """Build job: sample, chunk and index `size` complaints; also exports embeddings for the ingest job."""
+    from src.build_vector_store import load_and_sample_data, chunk_complaints, build_and_save_vector_store
+
+    embeddings = _embeddings(embeddings_kind)
+    monitor = MemoryMonitor(trace_allocations)
+    with monitor.stage("load_data"):
+        df = load_and_sample_data(processed_path, target_sample_size=size)
+    with monitor.stage("chunk") as record:
+        documents = chunk_complaints(df)
+        record["chunks"] = len(documents)
+    del df
+    with monitor.stage("build_and_save_vector_store"):
+        build_and_save_vector_store(documents, EMBEDDING_MODEL, store_path, embeddings=embeddings)
+    result = monitor.close()
+
+    # Input for ingest_from_parquet, outside the measured stages
+    import faiss
+    index = faiss.read_index(os.path.join(store_path, "index.faiss"))
+    pd.DataFrame({
+        "document": [doc.page_content for doc in documents],
+        "embedding": list(index.reconstruct_n(0, index.ntotal)),
+        "complaint_id": [str(doc.metadata.get("complaint_id")) for doc in documents]
+    }).to_parquet(store_path + ".embeddings.parquet", index=False)
+    result["chunks"] = len(documents)
+    return result
+
+
+def _run_ingest(embeddings_path: str, store_path: str, embeddings_kind: str, trace_allocations: bool) -> Dict[str, Any]:
+    from src.rebuild_index_from_external import ingest_from_parquet
+
+    embeddings = _embeddings(embeddings_kind)
+    monitor = MemoryMonitor(trace_allocations)
+    with monitor.stage("ingest_from_parquet"):
+        ingest_from_parquet(embeddings_path, EMBEDDING_MODEL, store_path, embedding_column="embedding",
+                            embeddings=embeddings)
+    return monitor.close()
+
+
+def _run_load(store_path: str, config_dir: str, trace_allocations: bool) -> Dict[str, Any]:
+    """Load job: the serving startup path, without the embedding model (as in the pre-fork parent)."""
+    from src.rag_pipeline import RAGPipeline
+
+    config_path = os.path.join(config_dir, "benchmark_config.yaml")
+    with open(config_path, 'w') as f:
+        yaml.safe_dump({
+            'paths': {'vector_store': store_path},
+            'models': {'embeddings': EMBEDDING_MODEL, 'llm': 'google/flan-t5-small'},
+            'rag_params': {'top_k': 3}
+        }, f)
+    monitor = MemoryMonitor(trace_allocations)
+    with monitor.stage("load_vector_store") as record:
+        pipeline = RAGPipeline(config_path=config_path, load_models=False)
+        record["vectors"] = pipeline.vector_store.index.ntotal
+    return monitor.close()
+
+
+def _in_fresh_process(fn, *args) -> Dict[str, Any]:
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(fn, *args).result()
+
+
+def prepare_corpus(tmp: str, max_size: int, seed: int = 42) -> str:
+    """Generate and preprocess enough synthetic complaints to sample `max_size` from."""
+    from src.synthetic_corpus import generate_corpus
+    from src.preprocessing import process_dataset
+
+    raw_path = os.path.join(tmp, "raw.csv")
+    processed_path = os.path.join(tmp, "processed")
+    # Every row has a narrative; about a quarter are in the products the pipeline keeps
+    generate_corpus(raw_path, int(max_size * 4.5) + 1000, seed=seed, narrative_rate=1.0)
+    process_dataset(raw_path, processed_path, output_format='parquet')
+    os.remove(raw_path)
+    return processed_path
+
+
+def fit_scaling(sizes: List[int], peaks: List[float]) -> Dict[str, float]:
+    """Least-squares `peak_mb = fixed_mb + per_complaint_kb * size / 1024`."""
+    slope, intercept = np.polyfit(np.asarray(sizes, dtype=np.float64), np.asarray(peaks, dtype=np.float64), 1)
+    return {"fixed_mb": float(intercept), "per_complaint_kb": float(slope * 1024)}
+
+
+def predict_mb(fit: Dict[str, float], size: int) -> float:
+    return fit["fixed_mb"] + fit["per_complaint_kb"] * size / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure peak memory and time of index build and load paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 10000, 20000], help="Complaints indexed per run")
+    parser.add_argument("--embeddings", choices=["model", "hashing"], default="model",
+                        help="Embed with the real model, or with model-free hashing embeddings of the same dimension")
+    parser.add_argument("--predict", type=int, nargs="*", default=[1370000], help="Corpus sizes to extrapolate to")
+    parser.add_argument("--no_tracemalloc", action="store_true", help="Skip allocation tracing (faster, exact timings)")
+    parser.add_argument("--workdir", default=None, help="Directory for generated data (default: temporary)")
+    parser.add_argument("--output", default=None, help="Optional JSON file for the full results")
+    args = parser.parse_args()
+
+    sizes = sorted(set(args.sizes))
+    trace = not args.no_tracemalloc
+    runs = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        print(f"Generating a synthetic corpus for up to {sizes[-1]} complaints...")
+        processed_path = prepare_corpus(tmp, sizes[-1])
+        for size in sizes:
+            store_path = os.path.join(tmp, f"store_{size}")
+            build = _in_fresh_process(_run_build, processed_path, size, store_path, args.embeddings, trace)
+            ingest = _in_fresh_process(_run_ingest, store_path + ".embeddings.parquet", store_path + "_ingested",
+                                       args.embeddings, trace)
+            load = _in_fresh_process(_run_load, store_path, tmp, trace)
+            runs.append({
+                "size": size,
+                "chunks": build["chunks"],
+                "stages": build["stages"] + ingest["stages"] + load["stages"],
+                "rss_timelines": {"build": build["rss_timeline"], "ingest": ingest["rss_timeline"],
+                                  "load": load["rss_timeline"]}
+            })
+
+    stage_names = [stage["stage"] for stage in runs[0]["stages"]]
+    print("\n=== Index Memory Benchmark ===")
+    print(f"{'size':>9} {'chunks':>9} | {'stage':<28} {'wall s':>8} {'peak RSS MB':>12} {'RSS +MB':>9} {'traced peak MB':>15}")
+    for run in runs:
+        for stage in run["stages"]:
+            traced = f"{stage['traced_peak_mb']:>15.1f}" if "traced_peak_mb" in stage else f"{'-':>15}"
+            print(f"{run['size']:>9} {run['chunks']:>9} | {stage['stage']:<28} {stage['wall_s']:>8.2f} "
+                  f"{stage['peak_rss_mb']:>12.1f} {stage['rss_after_mb'] - stage['rss_before_mb']:>9.1f} {traced}")
+
+    scaling = {}
+    if len(runs) > 1:
+        print("\n=== Scaling (peak RSS = fixed + per-complaint x size) ===")
+        for name in stage_names:
+            peaks = [next(s["peak_rss_mb"] for s in run["stages"] if s["stage"] == name) for run in runs]
+            fit = fit_scaling([run["size"] for run in runs], peaks)
+            fit["predicted_mb"] = {str(size): predict_mb(fit, size) for size in args.predict}
+            scaling[name] = fit
+            predictions = "  ".join(f"{size:,}: {mb / 1024:.1f} GB" for size, mb in
+                                    zip(args.predict, fit["predicted_mb"].values()))
+            print(f"{name:<28} fixed {fit['fixed_mb']:>8.1f} MB  {fit['per_complaint_kb']:>7.2f} KB/complaint  {predictions}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"embeddings": args.embeddings, "tracemalloc": trace, "runs": runs, "scaling": scaling}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Preprocessing Benchmark
+
+Generates a synthetic CFPB-schema CSV and measures rows/sec of:
+- the legacy per-row path (`Series.apply(clean_narrative)` + `DataFrame.to_csv`)
+- `process_dataset` with one worker
+- `process_dataset` with a process pool
+- `process_dataset(..., output_format='parquet')`
+
+CSV outputs are hashed to confirm they are byte-identical. Loading the
+processed CSV is then compared with loading the pruned Parquet dataset
+(wall time and peak RSS, each measured in a fresh process).
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.preprocessing import (
+    NARRATIVE_COL, clean_narrative, filter_complaints, process_dataset, read_processed_parquet
+)
+from src.build_vector_store import LOAD_COLUMNS
+from src.synthetic_corpus import generate_corpus
+
+def legacy_process_dataset(input_path: str, output_path: str, chunk_size: int):
+    """The original row-by-row implementation, kept here as the baseline."""
+    first_chunk = True
+    for chunk in pd.read_csv(input_path, chunksize=chunk_size, low_memory=False):
+        df_filtered = filter_complaints(chunk)
+        if not df_filtered.empty:
+            df_filtered['cleaned_narrative'] = df_filtered[NARRATIVE_COL].apply(clean_narrative)
+            df_filtered.to_csv(output_path, mode='a', index=False, header=first_chunk)
+            first_chunk = False
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _peak_rss_mb() -> float:
+    """High-water RSS of this process (VmHWM; ru_maxrss is inherited across fork/exec)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _load_stats(path: str):
+    """Loads processed data the way load_and_sample_data does; runs in a fresh process."""
+    baseline_rss_mb = _peak_rss_mb()
+    start = time.perf_counter()
+    if os.path.isdir(path):
+        df = read_processed_parquet(path, columns=LOAD_COLUMNS)
+    else:
+        df = pd.read_csv(path)
+    elapsed = time.perf_counter() - start
+    peak_rss_mb = _peak_rss_mb() - baseline_rss_mb
+    return elapsed, peak_rss_mb, df.memory_usage(deep=True).sum() / 1e6
+
+def measure_load(path: str):
+    """Returns (seconds, peak RSS growth MB, frame MB) for loading `path` in a clean interpreter."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_load_stats, path).result()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the preprocessing engine on synthetic CFPB data.")
+    parser.add_argument("--rows", type=int, default=2000000, help="Number of synthetic raw rows")
+    parser.add_argument("--chunk_size", type=int, default=50000, help="Rows per CSV chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes for the parallel run")
+    parser.add_argument("--narrative_rate", type=float, default=0.4, help="Share of rows with a narrative")
+    parser.add_argument("--duplicate_rate", type=float, default=0.02, help="Share of duplicated narratives")
+    parser.add_argument("--skip_legacy", action="store_true", help="Skip the slow legacy baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = os.path.join(tmp, "raw.csv")
+        print(f"Generating {args.rows} synthetic rows...")
+        start = time.perf_counter()
+        generate_corpus(raw_path, args.rows, narrative_rate=args.narrative_rate, duplicate_rate=args.duplicate_rate)
+        print(f"Generated in {time.perf_counter() - start:.1f}s ({os.path.getsize(raw_path) / 1e6:.0f} MB)")
+
+        runs = []
+        if not args.skip_legacy:
+            runs.append(("legacy", lambda out: legacy_process_dataset(raw_path, out, args.chunk_size)))
+        runs.append(("engine x1", lambda out: process_dataset(raw_path, out, args.chunk_size, workers=1)))
+        if args.workers > 1:
+            runs.append((f"engine x{args.workers}",
+                         lambda out: process_dataset(raw_path, out, args.chunk_size, workers=args.workers)))
+
+        parquet_path = os.path.join(tmp, "parquet")
+        start = time.perf_counter()
+        process_dataset(raw_path, parquet_path, args.chunk_size, workers=args.workers, output_format='parquet')
+        parquet_elapsed = time.perf_counter() - start
+
+        results = []
+        for name, run in runs:
+            out_path = os.path.join(tmp, f"{name.replace(' ', '_')}.csv")
+            start = time.perf_counter()
+            run(out_path)
+            elapsed = time.perf_counter() - start
+            results.append((name, elapsed, _sha256(out_path)))
+            csv_path = out_path
+
+        csv_load = measure_load(csv_path)
+        parquet_load = measure_load(parquet_path)
+
+    print("\n=== Preprocessing Benchmark ===")
+    for name, elapsed, digest in results:
+        print(f"{name:>12}: {elapsed:8.2f}s  {args.rows / elapsed:12,.0f} rows/sec  sha256={digest[:16]}")
+    print(f"{'parquet':>12}: {parquet_elapsed:8.2f}s  {args.rows / parquet_elapsed:12,.0f} rows/sec")
+    identical = len({digest for _, _, digest in results}) == 1
+    print(f"CSV outputs byte-identical: {identical}")
+
+    print("\n=== Processed Data Load ===")
+    for name, (elapsed, peak_rss, frame_mb) in (("csv", csv_load), ("parquet", parquet_load)):
+        print(f"{name:>12}: {elapsed:8.2f}s  peak RSS +{peak_rss:7.1f} MB  frame {frame_mb:8.1f} MB")
+    return 0 if identical else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Retrieval Benchmark
+
+Builds FAISS indexes from one embedding set and compares them against exact
+search. For every index type and search parameter it reports:
+- recall@k against an exact (flat L2) ground truth
+- p50/p95/p99 latency of single-query search on one thread
+- single-thread QPS and multi-thread batch QPS
+- build (train + add) time, serialized index size and the growth of the
+  process's resident memory (RSS) while building and holding the index
+
+Embeddings come from the persisted vector store (`--vector_store`), a `.npy`
+file (`--embeddings`), or a synthetic clustered set (`--synthetic N`).
+Queries are held-out vectors from the same set. Results are written as JSON
+tagged with the git commit so runs can be compared across commits.
+
+Usage:
+    python -m src.benchmark_retrieval --synthetic 200000 --dim 384 --output retrieval.json
+    python -m src.benchmark_retrieval --vector_store vector_store --k 10
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+from typing import Any, Dict, List
+
+import numpy as np
+import yaml
+import faiss
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.load_test import summarize_latencies
+from src.prefork import process_memory_mb
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Index factory strings and the search parameters swept for each; `{nlist}` is
+# replaced by 4 * sqrt(n). Overridden by `benchmark_retrieval.indexes` in config.yaml.
+DEFAULT_INDEXES = [
+    {"factory": "Flat", "search_params": [""]},
+    {"factory": "HNSW32,Flat", "search_params": ["efSearch=16", "efSearch=32", "efSearch=64", "efSearch=128"]},
+    {"factory": "IVF{nlist},Flat", "search_params": ["nprobe=1", "nprobe=4", "nprobe=16", "nprobe=64"]},
+    {"factory": "IVF{nlist},SQ8", "search_params": ["nprobe=4", "nprobe=16", "nprobe=64"]},
+]
+
+
+def synthetic_embeddings(n: int, dim: int = 384, n_clusters: int = 256, seed: int = 42) -> np.ndarray:
+    """Unit-norm vectors drawn around random centroids, like sentence embeddings of topical text."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    vectors = centroids[rng.integers(0, n_clusters, size=n)]
+    vectors += 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def load_vector_store_embeddings(path: str) -> np.ndarray:
+    """Reconstruct the stored vectors from a persisted langchain FAISS index."""
+    index = faiss.read_index(os.path.join(path, "index.faiss"))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def split_queries(vectors: np.ndarray, n_queries: int, seed: int = 42):
+    """Hold out `n_queries` random vectors as queries; the rest is the database."""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    return np.ascontiguousarray(vectors[order[n_queries:]]), np.ascontiguousarray(vectors[order[:n_queries]])
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Mean fraction of the exact top-k neighbours present in the approximate top-k."""
+    k = truth.shape[1]
+    hits = sum(len(np.intersect1d(row_found[row_found >= 0], row_truth)) for row_found, row_truth in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def build_index(factory: str, database: np.ndarray):
+    """Train and fill an index; returns (index, build seconds)."""
+    started = time.perf_counter()
+    index = faiss.index_factory(database.shape[1], factory)
+    if not index.is_trained:
+        index.train(database)
+    index.add(database)
+    return index, time.perf_counter() - started
+
+
+def measure_search(index, queries: np.ndarray, k: int, threads: int) -> Dict[str, Any]:
+    """Single-query latency on one thread, then batch QPS on `threads` threads."""
+    faiss.omp_set_num_threads(1)
+    latencies = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    started = time.perf_counter()
+    for i in range(len(queries)):
+        query_started = time.perf_counter()
+        _, found[i:i + 1] = index.search(queries[i:i + 1], k)
+        latencies.append(time.perf_counter() - query_started)
+    single = summarize_latencies(latencies, time.perf_counter() - started)
+
+    faiss.omp_set_num_threads(threads)
+    started = time.perf_counter()
+    index.search(queries, k)
+    batch_elapsed = time.perf_counter() - started
+
+    return {
+        "found": found,
+        "p50_ms": single["p50_ms"],
+        "p95_ms": single["p95_ms"],
+        "p99_ms": single["p99_ms"],
+        "qps_single_thread": single["throughput_qps"],
+        "qps_multi_thread": len(queries) / batch_elapsed if batch_elapsed > 0 else float("inf"),
+        "threads": threads
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _load_index_configs(config_path: str) -> List[Dict[str, Any]]:
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+        indexes = config.get('benchmark_retrieval', {}).get('indexes')
+        if indexes:
+            return indexes
+    return DEFAULT_INDEXES
+
+
+def run_benchmark(database: np.ndarray, queries: np.ndarray, indexes: List[Dict[str, Any]],
+                  k: int = 10, threads: int = None) -> List[Dict[str, Any]]:
+    """Benchmark each index/search-parameter pair against exact search."""
+    threads = threads or os.cpu_count() or 1
+    nlist = max(1, int(4 * np.sqrt(len(database))))
+
+    faiss.omp_set_num_threads(threads)
+    exact = faiss.IndexFlatL2(database.shape[1])
+    exact.add(database)
+    _, truth = exact.search(queries, k)
+
+    results = []
+    parameter_space = faiss.ParameterSpace()
+    for spec in indexes:
+        factory = spec["factory"].format(nlist=nlist)
+        faiss.omp_set_num_threads(threads)
+        rss_before = process_memory_mb(os.getpid())["rss_mb"]
+        index, build_seconds = build_index(factory, database)
+        # Pages freed by the previous index may be reused, so this can understate small indexes
+        rss_delta_mb = process_memory_mb(os.getpid())["rss_mb"] - rss_before
+        serialized_mb = len(faiss.serialize_index(index)) / 1e6
+        logger.info(f"Built {factory} in {build_seconds:.2f}s "
+                    f"(+{rss_delta_mb:.1f} MB RSS, {serialized_mb:.1f} MB serialized)")
+
+        for params in spec.get("search_params") or [""]:
+            if params:
+                parameter_space.set_index_parameters(index, params)
+            search = measure_search(index, queries, k, threads)
+            results.append({
+                "index": factory,
+                "search_params": params,
+                f"recall@{k}": recall_at_k(search.pop("found"), truth),
+                **search,
+                "build_seconds": build_seconds,
+                "rss_delta_mb": rss_delta_mb,
+                "serialized_mb": serialized_mb
+            })
+        del index
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types for complaint retrieval.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--vector_store", default=None, help="Persisted FAISS vector store directory")
+    source.add_argument("--embeddings", default=None, help=".npy file of embeddings (n x dim)")
+    source.add_argument("--synthetic", type=int, default=None, help="Number of synthetic embeddings")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of synthetic embeddings")
+    parser.add_argument("--queries", type=int, default=1000, help="Held-out query vectors")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--threads", type=int, default=None, help="Threads for batch search (default: all cores)")
+    parser.add_argument("--config", default="config.yaml", help="Config with benchmark_retrieval.indexes")
+    parser.add_argument("--output", default="retrieval_benchmark.json", help="JSON results file")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype(np.float32)
+        source_name = args.embeddings
+    elif args.synthetic:
+        vectors = synthetic_embeddings(args.synthetic, args.dim)
+        source_name = f"synthetic:{args.synthetic}x{args.dim}"
+    else:
+        path = args.vector_store or "vector_store"
+        vectors = load_vector_store_embeddings(path)
+        source_name = path
+
+    database, queries = split_queries(vectors, min(args.queries, len(vectors) // 10 or 1))
+    logger.info(f"Benchmarking {len(database)} vectors x {database.shape[1]} dims with {len(queries)} queries")
+    results = run_benchmark(database, queries, _load_index_configs(args.config), k=args.k, threads=args.threads)
+
+    recall_key = f"recall@{args.k}"
+    print("\n=== Retrieval Benchmark ===")
+    print(f"{'index':<18} {'params':<14} {recall_key:>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'qps 1t':>9} {'qps mt':>10} {'build s':>8} {'RSS MB':>8} {'file MB':>8}")
+    for row in results:
+        print(f"{row['index']:<18} {row['search_params']:<14} {row[recall_key]:>10.4f} {row['p50_ms']:>8.3f} "
+              f"{row['p95_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['qps_single_thread']:>9.0f} "
+              f"{row['qps_multi_thread']:>10.0f} {row['build_seconds']:>8.2f} "
+              f"{row['rss_delta_mb']:>8.1f} {row['serialized_mb']:>8.1f}")
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dataset": {"source": source_name, "vectors": len(database), "dim": int(database.shape[1]),
+                    "queries": len(queries), "k": args.k},
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import argparse
 import pandas as pd
 import numpy as np
 import logging
@@ -6,24 +7,55 @@ from typing import List, Dict
 
 # NLP / AI Libraries
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 from sklearn.model_selection import train_test_split
 
+from src.embeddings import create_embeddings
+from src.preprocessing import read_duplicate_counts, read_processed_parquet
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def load_and_sample_data(input_path: str, target_sample_size: int = 15000) -> pd.DataFrame:
+# Columns read by chunk_complaints; anything else in the processed data is skipped.
+LOAD_COLUMNS = [
+    'Complaint ID', 'Date received', 'Product', 'Sub-product', 'Issue', 'Sub-issue',
+    'Company', 'State', 'cleaned_narrative', 'processed_run'
+]
+
+def load_and_sample_data(
+    input_path: str,
+    target_sample_size: int = 15000,
+    products: List[str] = None,
+    years: List[int] = None
+) -> pd.DataFrame:
     """
     Loads the cleaned dataset and performs stratified sampling across product categories.
+
+    `input_path` may be the processed CSV or the partitioned Parquet dataset
+    written by `process_dataset(..., output_format='parquet')`. For Parquet only
+    LOAD_COLUMNS are read and `products` / `years` prune whole partitions.
     """
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"Cleaned dataset not found at {input_path}")
 
     logger.info(f"Loading data from {input_path}...")
-    df = pd.read_csv(input_path)
+    if os.path.isdir(input_path) or input_path.endswith('.parquet'):
+        df = read_processed_parquet(input_path, columns=LOAD_COLUMNS, products=products, years=years)
+    else:
+        df = pd.read_csv(input_path)
+
+    # Incremental runs append amended complaints as new rows; keep the latest
+    if 'processed_run' in df.columns:
+        df = df.sort_values('processed_run', kind='stable')
+    if 'Complaint ID' in df.columns:
+        df = df.drop_duplicates(subset='Complaint ID', keep='last')
+
+    # Attach near-duplicate counts when preprocessing ran with dedup=True
+    duplicate_counts = read_duplicate_counts(input_path)
+    if not duplicate_counts.empty and 'Complaint ID' in df.columns:
+        df['duplicate_count'] = df['Complaint ID'].map(duplicate_counts).fillna(0).astype(int)
     
     # Ensure mandatory columns exist
     required_cols = ['Product', 'cleaned_narrative', 'Complaint ID']
@@ -82,6 +114,7 @@ def chunk_complaints(df: pd.DataFrame, chunk_size: int = 500, chunk_overlap: int
             "company": row.get("Company", ""),
             "state": row.get("State", ""),
             "date_received": row.get("Date received", ""),
+            "duplicate_count": int(row.get("duplicate_count", 0)),
             "total_chunks": len(chunks)
         }
 
@@ -95,12 +128,15 @@ def chunk_complaints(df: pd.DataFrame, chunk_size: int = 500, chunk_overlap: int
     logger.info(f"Total chunks created: {len(documents)}")
     return documents
 
-def build_and_save_vector_store(documents: List[Document], model_name: str, save_path: str):
+def build_and_save_vector_store(documents: List[Document], model_name: str, save_path: str, embeddings=None):
     """
     Generates embeddings and builds/persists the FAISS vector store.
+
+    `embeddings` overrides the model named by `model_name` (see `create_embeddings`).
     """
-    logger.info(f"Initializing embedding model: {model_name}...")
-    embeddings = HuggingFaceEmbeddings(model_name=model_name)
+    if embeddings is None:
+        logger.info(f"Initializing embedding model: {model_name}...")
+        embeddings = create_embeddings(model_name)
 
     logger.info("Generating embeddings and building FAISS index (this may take a few minutes)...")
     vector_store = FAISS.from_documents(documents, embeddings)
@@ -114,18 +150,73 @@ def build_and_save_vector_store(documents: List[Document], model_name: str, save
     vector_store.save_local(save_path)
     logger.info("Vector store persisted successfully.")
 
+def apply_delta_to_vector_store(delta_path: str, model_name: str, save_path: str,
+                                chunk_size: int = 500, chunk_overlap: int = 50, embeddings=None) -> int:
+    """
+    Applies an incremental preprocessing delta to an existing vector store.
+
+    Chunks belonging to amended complaints are deleted first, then the delta's
+    chunks are embedded and added, so refresh cost scales with the delta size.
+    `embeddings` overrides the model named by `model_name`, and must match the
+    one the store was built with. Returns the number of chunks added.
+    """
+    if not os.path.exists(delta_path):
+        logger.info(f"No delta found at {delta_path}; vector store is up to date.")
+        return 0
+
+    if os.path.isdir(delta_path) or delta_path.endswith('.parquet'):
+        df = read_processed_parquet(delta_path, columns=LOAD_COLUMNS)
+    else:
+        df = pd.read_csv(delta_path)
+    if df.empty:
+        return 0
+    df = df.drop_duplicates(subset='Complaint ID', keep='last')
+
+    if embeddings is None:
+        embeddings = create_embeddings(model_name)
+    vector_store = FAISS.load_local(save_path, embeddings, allow_dangerous_deserialization=True)
+
+    changed_ids = set(df['Complaint ID'].astype(str))
+    stale = [
+        doc_id for doc_id, doc in vector_store.docstore._dict.items()
+        if str(doc.metadata.get('complaint_id')) in changed_ids
+    ]
+    if stale:
+        logger.info(f"Removing {len(stale)} chunks of amended complaints...")
+        vector_store.delete(stale)
+
+    documents = chunk_complaints(df, chunk_size, chunk_overlap)
+    logger.info(f"Adding {len(documents)} chunks from {len(df)} new or amended complaints...")
+    vector_store.add_documents(documents)
+    vector_store.save_local(save_path)
+    return len(documents)
+
 def main():
     # Configuration
     INPUT_PATH = "data/processed/filtered_complaints.csv"
+    PARQUET_PATH = "data/processed/complaints_parquet"
     VECTOR_STORE_DIR = "vector_store"
     MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
     TARGET_SAMPLE_SIZE = 15000
     CHUNK_SIZE = 500
     CHUNK_OVERLAP = 50
 
+    parser = argparse.ArgumentParser(description="Build the FAISS vector store from the processed complaints.")
+    parser.add_argument("--apply_delta", default=None, metavar="PATH",
+                        help="Update the existing store with the delta of an incremental preprocessing run "
+                             "(e.g. data/processed/filtered_complaints_delta.csv) instead of rebuilding it")
+    args = parser.parse_args()
+
     try:
-        # 1. Load and Sample
-        df_sampled = load_and_sample_data(INPUT_PATH, TARGET_SAMPLE_SIZE)
+        if args.apply_delta:
+            added = apply_delta_to_vector_store(args.apply_delta, MODEL_NAME, VECTOR_STORE_DIR,
+                                                CHUNK_SIZE, CHUNK_OVERLAP)
+            print(f"\nAdded {added} chunks from {args.apply_delta} to {VECTOR_STORE_DIR}")
+            return
+
+        # 1. Load and Sample (prefer the columnar dataset when it has been built)
+        source_path = PARQUET_PATH if os.path.isdir(PARQUET_PATH) else INPUT_PATH
+        df_sampled = load_and_sample_data(source_path, TARGET_SAMPLE_SIZE)
         
         # 2. Chunk
         documents = chunk_complaints(df_sampled, CHUNK_SIZE, CHUNK_OVERLAP)
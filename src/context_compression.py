@@ -0,0 +1,229 @@
+"""
+Query-Focused Context Compression
+
+Retrieved chunks are ~500 characters and most of each is irrelevant to the
+question, yet flan-t5's encoder cost and the prompt's truncation both grow
+with context length. `ContextCompressor` sits between retrieval and
+`RAGPipeline._create_prompt`: it splits the retrieved chunks into sentences,
+scores them against the query in one batched embedding call, and keeps the
+best sentences within a token budget. Kept sentences stay under their
+original source (and in their original order), so attribution in the
+prompt is unchanged.
+
+The CLI measures what it buys: per question, the compression ratio and the
+generation latency with and without compression.
+
+Usage:
+    python -m src.context_compression --budget 160 --output compression_report.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def split_sentences(text: str, min_chars: int = 3) -> List[str]:
+    """Split on sentence punctuation and line breaks, dropping fragments."""
+    return [s.strip() for s in _SENTENCE_RE.split(text or "") if len(s.strip()) >= min_chars]
+
+
+def approx_tokens(text: str) -> int:
+    """Rough T5 sentencepiece token count (about 1.3 tokens per word)."""
+    return int(len(text.split()) * 1.3) + 1
+
+
+class ContextCompressor:
+    """
+    Keeps the retrieved sentences most similar to the query, within a token budget.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        token_budget: int = 160,
+        min_sentence_chars: int = 20,
+        max_sentence_words: int = 40,
+        count_tokens: Callable[[str], int] = approx_tokens
+    ):
+        """
+        Args:
+            embeddings: LangChain embeddings (the pipeline's query embedder)
+            token_budget: Tokens of excerpt text kept per query
+            min_sentence_chars: Shorter fragments are dropped
+            max_sentence_words: Longer sentences (e.g. unpunctuated narratives)
+                are split into windows of this many words
+            count_tokens: Token counter for the budget (e.g. the generator's tokenizer)
+        """
+        self.embeddings = embeddings
+        self.token_budget = token_budget
+        self.min_sentence_chars = min_sentence_chars
+        self.max_sentence_words = max_sentence_words
+        self.count_tokens = count_tokens
+
+    @property
+    def signature(self) -> str:
+        """Settings that change what the LLM sees (part of the prompt version)."""
+        return f"c{self.token_budget}-{self.min_sentence_chars}-{self.max_sentence_words}"
+
+    def _sentences(self, text: str) -> List[str]:
+        sentences = []
+        for sentence in split_sentences(text, self.min_sentence_chars):
+            words = sentence.split()
+            for start in range(0, len(words), self.max_sentence_words):
+                sentences.append(" ".join(words[start:start + self.max_sentence_words]))
+        return sentences
+
+    def _select(self, scores: np.ndarray, sentences: List[Tuple[int, int, str]]) -> List[int]:
+        """Indices of the best-scoring sentences that fit the budget (the best one always)."""
+        kept, used = [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            tokens = self.count_tokens(sentences[i][2])
+            if kept and used + tokens > self.token_budget:
+                continue
+            kept.append(int(i))
+            used += tokens
+        return kept
+
+    def compress_batch(
+        self,
+        queries: List[str],
+        retrieved: List[List[Dict[str, Any]]]
+    ) -> List[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """
+        Compress the retrieved documents of several queries with one embedding call.
+
+        Args:
+            queries: User questions
+            retrieved: Retrieval results per question (`retrieve_relevant_complaints` format)
+
+        Returns:
+            Per question, the compressed documents (same dicts with `content`
+            reduced to the kept sentences, `source_rank` set to the original
+            1-based position, documents with no kept sentence dropped) and
+            stats: original/compressed tokens, ratio and sentence counts
+        """
+        # (source position, sentence position, text) per query
+        per_query = [
+            [(rank, j, sentence) for rank, doc in enumerate(docs, 1)
+             for j, sentence in enumerate(self._sentences(doc["content"]))]
+            for docs in retrieved
+        ]
+        texts = list(dict.fromkeys([*queries, *(s for sentences in per_query for _, _, s in sentences)]))
+        position = {text: i for i, text in enumerate(texts)}
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        results = []
+        for query, docs, sentences in zip(queries, retrieved, per_query):
+            original_tokens = sum(self.count_tokens(doc["content"]) for doc in docs)
+            if not sentences:
+                results.append((docs, {"original_tokens": original_tokens, "compressed_tokens": original_tokens,
+                                       "ratio": 1.0, "sentences_total": 0, "sentences_kept": 0}))
+                continue
+            scores = vectors[[position[s] for _, _, s in sentences]] @ vectors[position[query]]
+            kept = sorted(sentences[i] for i in self._select(scores, sentences))
+
+            compressed = []
+            for rank, doc in enumerate(docs, 1):
+                doc_sentences = [text for source, _, text in kept if source == rank]
+                if doc_sentences:
+                    compressed.append({**doc, "content": " ".join(doc_sentences), "source_rank": rank})
+            compressed_tokens = sum(self.count_tokens(doc["content"]) for doc in compressed)
+            results.append((compressed, {
+                "original_tokens": original_tokens,
+                "compressed_tokens": compressed_tokens,
+                "ratio": round(compressed_tokens / max(original_tokens, 1), 4),
+                "sentences_total": len(sentences),
+                "sentences_kept": len(kept)
+            }))
+        return results
+
+    def compress(self, query: str, retrieved_docs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Compress one query's retrieved documents; see `compress_batch`."""
+        return self.compress_batch([query], [retrieved_docs])[0]
+
+
+def measure(rag, questions: List[str], k: int = None) -> List[Dict[str, Any]]:
+    """
+    Generate every answer with and without compression and compare.
+
+    Args:
+        rag: RAGPipeline with a `compressor`
+        questions: Questions to answer
+        k: Documents retrieved per question
+
+    Returns:
+        Per question: compression ratio, generation latency (ms) with and
+        without compression, and the latency saved
+    """
+    rows = []
+    for question in questions:
+        retrieved = rag.retrieve_relevant_complaints(question, k=k)
+        if not retrieved:
+            continue
+        compressed, stats = rag.compressor.compress(question, retrieved)
+        latencies = {}
+        for label, docs in (("full", retrieved), ("compressed", compressed)):
+            prompt = rag._create_prompt(question, rag._format_context(docs))
+            started = time.perf_counter()
+            rag._generate_with_huggingface(prompt, rag.llm_model_name)
+            latencies[label] = (time.perf_counter() - started) * 1000
+        rows.append({
+            "question": question,
+            **stats,
+            "generation_ms_full": round(latencies["full"], 2),
+            "generation_ms_compressed": round(latencies["compressed"], 2),
+            "generation_ms_saved": round(latencies["full"] - latencies["compressed"], 2)
+        })
+    return rows
+
+
+def main():
+    from src.load_test import DEFAULT_QUERIES
+    from src.rag_pipeline import RAGPipeline
+
+    parser = argparse.ArgumentParser(description="Measure context compression ratio and generation latency saved.")
+    parser.add_argument("--config", default="config.yaml", help="Pipeline config")
+    parser.add_argument("--budget", type=int, default=None, help="Token budget (defaults to the configured one)")
+    parser.add_argument("--k", type=int, default=None, help="Documents retrieved per question")
+    parser.add_argument("--output", default=None, help="Optional JSON file for the per-question results")
+    args = parser.parse_args()
+
+    rag = RAGPipeline(config_path=args.config)
+    if rag.compressor is None:
+        rag.compressor = ContextCompressor(rag.embeddings)
+    if args.budget:
+        rag.compressor.token_budget = args.budget
+    # Warm up the generator so model loading is not charged to the first question
+    rag._generate_with_huggingface("warm up", rag.llm_model_name)
+
+    rows = measure(rag, list(DEFAULT_QUERIES), k=args.k)
+    print(f"\n{'ratio':>6} {'full ms':>9} {'comp ms':>9} {'saved ms':>9}  question")
+    for row in rows:
+        print(f"{row['ratio']:>6.2f} {row['generation_ms_full']:>9.1f} {row['generation_ms_compressed']:>9.1f} "
+              f"{row['generation_ms_saved']:>9.1f}  {row['question'][:60]}")
+    if rows:
+        print(f"\nMean ratio {np.mean([r['ratio'] for r in rows]):.2f}, "
+              f"mean generation latency saved {np.mean([r['generation_ms_saved'] for r in rows]):.1f} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
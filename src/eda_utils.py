@@ -1,7 +1,10 @@
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 def perform_eda(df, output_dir='docs/images'):
     if not os.path.exists(output_dir):
@@ -38,3 +41,149 @@ def perform_eda(df, output_dir='docs/images'):
     print(df_with_narrative['narrative_word_count'].describe())
     
     return df_with_narrative
+
+class EDAStats:
+    """
+    Mergeable summary of a raw complaints export for streaming EDA.
+
+    Holds the row count, missing-narrative count, per-product counts and an
+    exact histogram of narrative word counts (np.bincount). Word counts are
+    small integers, so the histogram stays a few KB regardless of corpus size
+    and gives exact quantiles; partial results from chunks processed in any
+    order or process combine with `merge`.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.missing_narratives = 0
+        self.product_counts = pd.Series(dtype='int64')
+        self.word_count_hist = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_chunk(cls, chunk):
+        stats = cls()
+        stats.total = len(chunk)
+        narratives = chunk['Consumer complaint narrative']
+        present = narratives.notna()
+        stats.missing_narratives = int((~present).sum())
+        stats.product_counts = chunk['Product'].value_counts()
+        # len(str.split()) per row matches perform_eda's word count exactly,
+        # without materialising the token lists of the whole column.
+        word_counts = np.fromiter((len(text.split()) for text in narratives[present]), dtype=np.int64)
+        stats.word_count_hist = np.bincount(word_counts)
+        return stats
+
+    def merge(self, other):
+        self.total += other.total
+        self.missing_narratives += other.missing_narratives
+        self.product_counts = self.product_counts.add(other.product_counts, fill_value=0).astype('int64')
+        size = max(len(self.word_count_hist), len(other.word_count_hist))
+        merged = np.zeros(size, dtype=np.int64)
+        merged[:len(self.word_count_hist)] += self.word_count_hist
+        merged[:len(other.word_count_hist)] += other.word_count_hist
+        self.word_count_hist = merged
+        return self
+
+    def quantile(self, q):
+        """Quantile of narrative word counts, linearly interpolated like pandas."""
+        cumulative = np.cumsum(self.word_count_hist)
+        n = cumulative[-1] if len(cumulative) else 0
+        if n == 0:
+            return np.nan
+        position = q * (n - 1)
+        lower, upper = int(np.floor(position)), int(np.ceil(position))
+        lower_value = np.searchsorted(cumulative, lower, side='right')
+        upper_value = np.searchsorted(cumulative, upper, side='right')
+        return lower_value + (position - lower) * (upper_value - lower_value)
+
+    def describe(self):
+        """Same fields as Series.describe() on the per-narrative word counts."""
+        values = np.arange(len(self.word_count_hist))
+        n = int(self.word_count_hist.sum())
+        mean = (values * self.word_count_hist).sum() / n if n else np.nan
+        var = (((values - mean) ** 2) * self.word_count_hist).sum() / (n - 1) if n > 1 else np.nan
+        nonzero = np.flatnonzero(self.word_count_hist)
+        return pd.Series({
+            'count': float(n),
+            'mean': mean,
+            'std': np.sqrt(var),
+            'min': float(nonzero[0]) if n else np.nan,
+            '25%': self.quantile(0.25),
+            '50%': self.quantile(0.5),
+            '75%': self.quantile(0.75),
+            'max': float(nonzero[-1]) if n else np.nan
+        }, name='narrative_word_count')
+
+def _iter_chunk_stats(csv_path, chunk_size, workers):
+    reader = pd.read_csv(
+        csv_path,
+        chunksize=chunk_size,
+        usecols=['Product', 'Consumer complaint narrative'],
+        dtype={'Product': 'category'}
+    )
+    if workers <= 1:
+        for chunk in reader:
+            yield EDAStats.from_chunk(chunk)
+        return
+
+    # Bound the chunks in flight so memory stays proportional to chunk size.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in reader:
+            pending.append(executor.submit(EDAStats.from_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def perform_streaming_eda(csv_path, output_dir='docs/images', chunk_size=100000, workers=1):
+    """
+    Single-pass, chunked version of `perform_eda` for the full raw export.
+
+    Only the Product and narrative columns are parsed, chunks can be summarised
+    in `workers` processes, and memory is bounded by `chunk_size`. Prints the
+    same overview and writes the same two plots; returns the merged EDAStats.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    stats = EDAStats()
+    for chunk_stats in _iter_chunk_stats(csv_path, chunk_size, workers):
+        stats.merge(chunk_stats)
+
+    print("--- Dataset Overview ---")
+    print(f"Total complaints: {stats.total}")
+    print("\nMissing narratives:")
+    perc_missing = (stats.missing_narratives / stats.total) * 100 if stats.total else 0.0
+    print(f"{stats.missing_narratives} ({perc_missing:.2f}%)")
+
+    # Distribution of complaints by product
+    product_counts = stats.product_counts[stats.product_counts > 0].sort_values(ascending=False, kind='stable')
+    plt.figure(figsize=(12, 6))
+    sns.barplot(x=product_counts.values, y=product_counts.index.astype(str), orient='h')
+    plt.xlabel('count')
+    plt.ylabel('Product')
+    plt.title('Distribution of Complaints by Product')
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/product_distribution.png')
+
+    # Narrative length distribution, drawn from the histogram as weights
+    hist = stats.word_count_hist
+    values = np.flatnonzero(hist)
+    weights = hist[values]
+    n = weights.sum()
+    # A weighted KDE uses the effective sample size for Scott's bandwidth;
+    # rescale so the curve matches the one drawn from the raw values.
+    bw_adjust = ((n ** 2 / (weights ** 2).sum()) / n) ** 0.2 if n else 1.0
+
+    plt.figure(figsize=(10, 6))
+    sns.histplot(x=values, weights=weights, bins=50, kde=True, kde_kws={'bw_adjust': bw_adjust})
+    plt.title('Distribution of Complaint Narrative Word Count')
+    plt.xlabel('Word Count')
+    plt.ylabel('Frequency')
+    plt.savefig(f'{output_dir}/narrative_length_dist.png')
+
+    print("\nNarrative length statistics:")
+    print(stats.describe())
+
+    return stats
@@ -0,0 +1,61 @@
+"""
+Embedding backends for the RAG pipeline.
+
+`create_embeddings(name)` maps the `models.embeddings` setting to an embedder:
+- "hashing" or "hashing:<dim>": `HashingEmbeddings`, deterministic and model-free
+- "onnx:<model_dir>": `OnnxEmbeddings`, the int8 ONNX export of the
+  sentence-transformers model (see src/onnx_embeddings.py)
+- anything else: a sentence-transformers model via `HuggingFaceEmbeddings`
+"""
+
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings from hashed unigrams and bigrams.
+
+    No model download and identical vectors across processes and runs, so
+    texts sharing words land close together. Meant for tests, offline
+    benchmarks and fixture indexes, not for production retrieval quality.
+    """
+
+    def __init__(self, size: int = 384):
+        """
+        Args:
+            size: Embedding dimension
+        """
+        self.size = size
+        self._vectorizer = HashingVectorizer(
+            n_features=size, ngram_range=(1, 2), alternate_sign=False, norm='l2', dtype=np.float32
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._vectorizer.transform(texts).toarray().tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def create_embeddings(model_name: str) -> Embeddings:
+    """
+    Build the embedder named by `model_name`.
+
+    Args:
+        model_name: "hashing[:dim]", "onnx:<model_dir>" or a sentence-transformers model name
+
+    Returns:
+        LangChain Embeddings instance
+    """
+    if model_name == "hashing" or model_name.startswith("hashing:"):
+        _, _, size = model_name.partition(":")
+        return HashingEmbeddings(int(size) if size else 384)
+    if model_name.startswith("onnx:"):
+        from src.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(model_name[len("onnx:"):])
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name)
@@ -6,22 +6,190 @@ of the RAG system, focusing on:
 - Retrieval Accuracy (Context Relevance)
 - Answer Relevancy (Question-Answer Alignment)
 - Faithfulness (Grounding in Context)
+
+`MetricsEngine` computes all three from sentence embeddings: questions,
+answers and source sentences are encoded once per run (deduplicated, in
+batches), and the scores are cosine-similarity matrices in NumPy, so
+thousands of questions are scored in one pass. The keyword-overlap functions
+remain as a model-free fallback.
+
+Usage:
+    python -m src.evaluate_quantitative
+    python -m src.evaluate_quantitative --questions questions.txt --workers 8
 """
 
 import os
-import yaml
+import sys
+import json
 import logging
+import argparse
+from typing import Dict, List
+
+import numpy as np
 import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.context_compression import split_sentences
 from src.rag_pipeline import RAGPipeline
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Answers that decline to answer are faithful by construction
+REFUSAL_MARKERS = (
+    "don't have enough information", "not find any relevant", "couldn't find any relevant",
+    "information not available"
+)
+
+def _is_refusal(answer: str) -> bool:
+    answer = answer.lower()
+    return any(marker in answer for marker in REFUSAL_MARKERS)
+
+def answer_relevancy(question: str, answer: str) -> float:
+    """Simple keyword overlap as a proxy for answer relevancy."""
+    q_words = set(question.lower().split())
+    a_words = set(answer.lower().split())
+    if not q_words: return 0.0
+    overlap = q_words.intersection(a_words)
+    return len(overlap) / len(q_words)
+
+def faithfulness(answer: str, context: str) -> float:
+    """Lightweight check if answer keywords appear in context (Faithfulness)."""
+    if _is_refusal(answer):
+        return 1.0  # Safe answer is faithful
+
+    a_words = set(w for w in answer.lower().split() if len(w) > 3)
+    if not a_words: return 1.0
+
+    found = sum(1 for w in a_words if w in context.lower())
+    return found / len(a_words)
+
+class MetricsEngine:
+    """
+    Batched, embedding-based answer relevancy, faithfulness and context relevance.
+    """
+
+    def __init__(self, embeddings, batch_size: int = 256, support_threshold: float = 0.6, block_size: int = 64):
+        """
+        Args:
+            embeddings: LangChain embeddings (e.g. the pipeline's `embeddings`)
+            batch_size: Texts per `embed_documents` call
+            support_threshold: Cosine similarity at which an answer sentence
+                counts as supported by a source sentence
+            block_size: Questions per similarity block (bounds the matrix size)
+        """
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.support_threshold = support_threshold
+        self.block_size = block_size
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Unit-normalised embeddings of `texts`, in order."""
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.append(np.asarray(self.embeddings.embed_documents(texts[start:start + self.batch_size]),
+                                      dtype=np.float32))
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, 1), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def _segment_max(similarity: np.ndarray, row_owner: np.ndarray, col_owner: np.ndarray) -> np.ndarray:
+        """Per row, the best similarity among columns belonging to the same question (-inf if none)."""
+        masked = np.where(row_owner[:, None] == col_owner[None, :], similarity, -np.inf)
+        return masked.max(axis=1) if masked.shape[1] else np.full(len(row_owner), -np.inf)
+
+    def score(self, questions: List[str], answers: List[str], contexts: List[List[str]]) -> pd.DataFrame:
+        """
+        Score every question in one pass.
+
+        Args:
+            questions: Questions
+            answers: Generated answers, aligned with `questions`
+            contexts: Retrieved source texts per question
+
+        Returns:
+            One row per question: answer_relevancy, faithfulness, supported_ratio,
+            context_relevance, answer_sentences and source_sentences
+        """
+        n = len(questions)
+        answer_sentences = [split_sentences(answer) or [answer] for answer in answers]
+        source_sentences = [[s for text in texts for s in split_sentences(text)] for texts in contexts]
+
+        # Encode every distinct text once
+        vocabulary = {}
+        for text in [*questions, *answers, *(s for group in answer_sentences for s in group),
+                     *(s for group in source_sentences for s in group)]:
+            vocabulary.setdefault(text, len(vocabulary))
+        vectors = self._encode(list(vocabulary))
+
+        def rows(texts):
+            return vectors[[vocabulary[text] for text in texts]]
+
+        def owners(groups):
+            return np.repeat(np.arange(n), [len(group) for group in groups])
+
+        question_vecs, answer_vecs = rows(questions), rows(answers)
+        answer_relevancy_scores = np.einsum('ij,ij->i', question_vecs, answer_vecs)
+
+        a_owner, s_owner = owners(answer_sentences), owners(source_sentences)
+        a_vecs = rows([s for group in answer_sentences for s in group])
+        s_vecs = rows([s for group in source_sentences for s in group]) if len(s_owner) else np.zeros((0, vectors.shape[1]))
+
+        best_support = np.full(len(a_owner), -np.inf)
+        context_relevance = np.zeros(n)
+        for start in range(0, n, self.block_size):
+            stop = min(n, start + self.block_size)
+            a_rows = np.flatnonzero((a_owner >= start) & (a_owner < stop))
+            s_rows = np.flatnonzero((s_owner >= start) & (s_owner < stop))
+            # Answer sentences vs source sentences of the same question
+            best_support[a_rows] = self._segment_max(a_vecs[a_rows] @ s_vecs[s_rows].T, a_owner[a_rows], s_owner[s_rows])
+            # Questions vs their source sentences: best-matching sentence
+            block_questions = np.arange(start, stop)
+            best = self._segment_max(question_vecs[start:stop] @ s_vecs[s_rows].T, block_questions, s_owner[s_rows])
+            context_relevance[start:stop] = np.where(np.isfinite(best), best, 0.0)
+
+        has_support = np.isfinite(best_support)
+        support = np.where(has_support, best_support, 0.0)
+        counts = np.bincount(a_owner, minlength=n)
+        faithfulness_scores = np.bincount(a_owner, weights=support, minlength=n) / np.maximum(counts, 1)
+        supported = np.bincount(a_owner, weights=support >= self.support_threshold, minlength=n) / np.maximum(counts, 1)
+
+        refusals = np.array([_is_refusal(answer) for answer in answers], dtype=bool)
+        faithfulness_scores[refusals] = 1.0
+        supported[refusals] = 1.0
+
+        return pd.DataFrame({
+            "question": questions,
+            "answer_relevancy": answer_relevancy_scores,
+            "faithfulness": faithfulness_scores,
+            "supported_ratio": supported,
+            "context_relevance": context_relevance,
+            "answer_sentences": counts,
+            "source_sentences": np.bincount(s_owner, minlength=n) if len(s_owner) else np.zeros(n, dtype=int)
+        })
+
+def write_metrics(df: pd.DataFrame, output_dir: str = "docs", name: str = "quantitative_metrics") -> Dict[str, str]:
+    """Write per-question metrics to CSV and per-question plus aggregate metrics to JSON."""
+    os.makedirs(output_dir, exist_ok=True)
+    csv_path = os.path.join(output_dir, f"{name}.csv")
+    json_path = os.path.join(output_dir, f"{name}.json")
+    df.to_csv(csv_path, index=False)
+    aggregate = df.drop(columns=['question']).mean(numeric_only=True).to_dict()
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({"questions": len(df), "aggregate": aggregate, "per_question": df.to_dict(orient='records')},
+                  f, indent=2, default=float)
+    return {"csv": csv_path, "json": json_path}
+
 class QuantitativeEvaluator:
-    def __init__(self, rag_pipeline: RAGPipeline):
+    def __init__(self, rag_pipeline: RAGPipeline, workers: int = 4, cache_dir: str = ".eval_cache",
+                 questions: List[str] = None):
         self.rag = rag_pipeline
-        self.test_questions = [
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.test_questions = questions or [
             "Why are customers unhappy with Credit Cards?",
             "What recurring issues appear in Money Transfers?",
             "What are the main complaints about Personal Loans?",
@@ -29,64 +197,49 @@ class QuantitativeEvaluator:
             "How do customers describe fraudulent transactions?"
         ]
 
-    def _calculate_overlap_score(self, question: str, answer: str) -> float:
-        """Simple keyword overlap as a proxy for answer relevancy."""
-        q_words = set(question.lower().split())
-        a_words = set(answer.lower().split())
-        if not q_words: return 0.0
-        overlap = q_words.intersection(a_words)
-        return len(overlap) / len(q_words)
-
-    def _check_grounding(self, answer: str, context: str) -> float:
-        """Lightweight check if answer keywords appear in context (Faithfulness)."""
-        if "don't have enough information" in answer.lower() or "not find any relevant" in answer.lower():
-            return 1.0  # Safe answer is faithful
-            
-        a_words = set(w for w in answer.lower().split() if len(w) > 3)
-        if not a_words: return 1.0
-        
-        found = sum(1 for w in a_words if w in context.lower())
-        return found / len(a_words)
-
-    def evaluate(self):
+    def evaluate(self, output_dir: str = "docs") -> pd.DataFrame:
+        # Imported here: the runner imports this module for its scoring
+        from src.evaluation_runner import EvaluationRunner
+
         logger.info("Starting Quantitative Evaluation...")
-        results = []
-        
-        for q in self.test_questions:
-            response = self.rag.generate_answer(q)
-            answer = response['answer']
-            sources = response['sources']
-            context = " ".join([s['content'] for s in sources])
-            
-            relevancy = self._calculate_overlap_score(q, answer)
-            faithfulness = self._check_grounding(answer, context)
-            
-            results.append({
-                "question": q,
-                "relevancy_score": round(relevancy, 2),
-                "faithfulness_score": round(faithfulness, 2),
-                "num_sources": len(sources)
-            })
-            
-        df = pd.DataFrame(results)
-        
+        metrics = MetricsEngine(self.rag.embeddings) if self.rag.embeddings is not None else None
+        records = EvaluationRunner(self.rag, cache_dir=self.cache_dir, workers=self.workers,
+                                   metrics=metrics).run(self.test_questions)
+        df = pd.DataFrame([
+            {
+                "question": record["question"],
+                "relevancy_score": record["relevancy_score"],
+                "faithfulness_score": record["faithfulness_score"],
+                **record.get("metrics", {}),
+                "num_sources": record["num_sources"]
+            }
+            for record in records
+        ])
+
         # Save results
-        output_dir = "docs"
-        os.makedirs(output_dir, exist_ok=True)
-        csv_path = os.path.join(output_dir, "quantitative_metrics.csv")
-        df.to_csv(csv_path, index=False)
-        
-        logger.info(f"Evaluation complete. Metrics saved to {csv_path}")
-        
+        paths = write_metrics(df, output_dir)
+        logger.info(f"Evaluation complete. Metrics saved to {paths['csv']} and {paths['json']}")
+
         # Print summary
         print("\n=== Quantitative Evaluation Summary ===")
-        print(df.drop(columns=['question']).mean())
+        print(df.drop(columns=['question']).mean(numeric_only=True))
         print("========================================\n")
+        return df
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score answer relevancy, faithfulness and context relevance.")
+    parser.add_argument("--questions", default=None, help="Text file with one question per line")
+    parser.add_argument("--workers", type=int, default=4, help="Questions evaluated concurrently")
+    parser.add_argument("--output_dir", default="docs", help="Directory for the CSV and JSON metrics")
+    args = parser.parse_args()
+
     try:
+        questions = None
+        if args.questions:
+            with open(args.questions, 'r', encoding='utf-8') as f:
+                questions = [line.strip() for line in f if line.strip()]
         pipeline = RAGPipeline()
-        evaluator = QuantitativeEvaluator(pipeline)
-        evaluator.evaluate()
+        evaluator = QuantitativeEvaluator(pipeline, workers=args.workers, questions=questions)
+        evaluator.evaluate(args.output_dir)
     except Exception as e:
         logger.error(f"Evaluation failed: {e}")
@@ -9,10 +9,15 @@ This script evaluates the quality of the RAG system by:
 """
 
 import os
+import sys
 import json
 import logging
 from typing import List, Dict
-from rag_pipeline import RAGPipeline
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.rag_pipeline import RAGPipeline
+from src.evaluation_runner import EvaluationRunner
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -34,36 +39,36 @@ BUSINESS_QUESTIONS = [
 ]
 
 
-def evaluate_rag_system(rag_pipeline: RAGPipeline, questions: List[str]) -> List[Dict]:
+def evaluate_rag_system(
+    rag_pipeline: RAGPipeline,
+    questions: List[str],
+    workers: int = 4,
+    cache_dir: str = ".eval_cache"
+) -> List[Dict]:
     """
     Evaluate the RAG system with a set of questions.
     
     Args:
         rag_pipeline: Initialized RAG pipeline
         questions: List of questions to evaluate
+        workers: Questions evaluated concurrently
+        cache_dir: Cache of retrieval and generation results (see src/evaluation_runner.py)
         
     Returns:
         List of evaluation results
     """
-    results = []
+    logger.info(f"Evaluating {len(questions)} questions with {workers} workers...")
+    records = EvaluationRunner(rag_pipeline, cache_dir=cache_dir, workers=workers).run(questions)
     
-    for i, question in enumerate(questions, 1):
-        logger.info(f"Evaluating question {i}/{len(questions)}: {question}")
-        
-        # Get response from RAG system
-        response = rag_pipeline.query(question)
-        
-        # Structure the result
-        result = {
-            "question": question,
-            "answer": response["answer"],
-            "sources": response["sources"],
-            "num_sources": response["num_sources"]
+    return [
+        {
+            "question": record["question"],
+            "answer": record["answer"],
+            "sources": record["sources"],
+            "num_sources": record["num_sources"]
         }
-        
-        results.append(result)
-    
-    return results
+        for record in records
+    ]
 
 
 def generate_markdown_report(results: List[Dict], output_path: str):
@@ -0,0 +1,382 @@
+"""
+Parallel, Cached Evaluation Runner
+
+Runs evaluation questions through `RAGPipeline.query` on a thread pool, the
+same path users hit (validation, aggregate routing, compression), and caches
+each answer on disk with the retrieved sources and the context it was
+produced from, keyed by (question, k, index version, embedding model, LLM,
+prompt version including the context-compression settings). Re-running an
+evaluation only recomputes what changed, and faithfulness is scored against
+the context the answer actually used.
+
+The index version is a content hash of the persisted vector store (or of the
+segment manifest when the pipeline serves a segmented index), so
+rebuilding the index invalidates both caches, while editing the report only
+reads the caches. Degraded answers (deadline, fallback, errors) are not cached.
+
+Metrics are compared with a stored golden baseline; the run fails when
+retrieval overlap, relevancy/faithfulness scores or p95 latency regress beyond
+the tolerances in `evaluation` (config.yaml).
+
+Usage:
+    python -m src.evaluation_runner --workers 4
+    python -m src.evaluation_runner --questions questions.txt --update_baseline
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import yaml
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.rag_pipeline import PROMPT_VERSION
+from src.segmented_index import MANIFEST
+from src.evaluate_quantitative import MetricsEngine, answer_relevancy, faithfulness
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOLERANCES = {
+    # Mean fraction of the baseline's retrieved chunks still retrieved
+    "min_retrieval_overlap": 0.8,
+    # Largest allowed drop in mean relevancy / faithfulness
+    "max_score_drop": 0.05,
+    # Largest allowed relative increase in p95 latency of freshly computed answers
+    "max_latency_increase": 0.25
+}
+
+# Answers produced under pressure say nothing about the model or prompt
+UNCACHEABLE = ("extractive_deadline", "extractive_fallback", "error")
+
+
+def index_fingerprint(vector_store_path: str) -> str:
+    """
+    Content hash of the persisted FAISS index and docstore, or of the manifest
+    of a segmented index (rewritten by every build, split and compaction).
+    """
+    digest = hashlib.sha256()
+    for name in ("index.faiss", "index.pkl", MANIFEST):
+        path = os.path.join(vector_store_path, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def source_id(result: Dict[str, Any]) -> str:
+    """Stable identifier of a retrieved chunk."""
+    metadata = result.get("metadata", {})
+    return f"{metadata.get('complaint_id', '')}:{metadata.get('chunk_index', '')}"
+
+
+class ResultCache:
+    """
+    One JSON file per key under `cache_dir`; writes are atomic, so concurrent
+    workers and interrupted runs never leave a partial entry.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{time.monotonic_ns()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, default=str)
+        os.replace(tmp_path, path)
+
+
+class EvaluationRunner:
+    """
+    Fans evaluation questions out over a worker pool with stage caching.
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        cache_dir: str = ".eval_cache",
+        workers: int = 4,
+        k: int = None,
+        index_version: str = None,
+        use_cache: bool = True,
+        metrics: MetricsEngine = None
+    ):
+        """
+        Args:
+            pipeline: RAGPipeline (or anything with `query(question, k=..., return_context=True)`)
+            cache_dir: Directory for cached retrieval and generation results
+            workers: Questions evaluated concurrently
+            k: Documents retrieved per question (defaults to the pipeline's top_k)
+            index_version: Overrides the fingerprint of `pipeline.vector_store_path`
+                (or of the segmented index when the pipeline uses one)
+            use_cache: Read cached results (fresh results are always written)
+            metrics: Embedding-based scorer applied to all answers in one pass;
+                keyword overlap is used when omitted
+        """
+        self.pipeline = pipeline
+        self.cache = ResultCache(cache_dir)
+        self.workers = max(1, int(workers))
+        self.k = k or getattr(pipeline, 'top_k', 5)
+        segments = getattr(pipeline, 'segments', None)
+        self.index_version = index_version or index_fingerprint(
+            segments.root if segments is not None else pipeline.vector_store_path)
+        self.use_cache = use_cache
+        self.metrics = metrics
+        self.embedding_model = getattr(pipeline, 'embedding_model_name', None)
+        self.llm_model = getattr(pipeline, 'llm_model_name', None)
+        self.prompt_version = getattr(pipeline, 'prompt_version', PROMPT_VERSION)
+
+    def _cached(self, key: str) -> Optional[Any]:
+        return self.cache.get(key) if self.use_cache else None
+
+    def evaluate_question(self, question: str) -> Dict[str, Any]:
+        """Answer and score one question with a single pipeline call, reusing the cache."""
+        key = self.cache.key(
+            "answer", question, self.k, self.index_version, self.embedding_model, self.llm_model, self.prompt_version
+        )
+        generation = self._cached(key)
+        generation_cached = generation is not None
+        if not generation_cached:
+            started = time.perf_counter()
+            response = self.pipeline.query(question, k=self.k, return_context=True)
+            generation = {
+                "answer": response["answer"],
+                "sources": response.get("sources", []),
+                "num_sources": response.get("num_sources", len(response.get("sources", []))),
+                "served_by": response.get("served_by", "generator"),
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "source_ids": [source_id(result) for result in response.get("retrieved", [])],
+                "context": response.get("context", [])
+            }
+            if generation["served_by"] not in UNCACHEABLE:
+                self.cache.put(key, generation)
+
+        record = {"question": question, **generation, "generation_cached": generation_cached}
+        if self.metrics is None:
+            record["relevancy_score"] = answer_relevancy(question, generation["answer"])
+            record["faithfulness_score"] = faithfulness(generation["answer"], " ".join(record["context"]))
+        return record
+
+    def run(self, questions: List[str]) -> List[Dict[str, Any]]:
+        """Evaluate `questions` concurrently; results are returned in input order."""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="eval") as executor:
+            records = list(executor.map(self.evaluate_question, questions))
+        if self.metrics is not None:
+            scores = self.metrics.score(
+                [record["question"] for record in records],
+                [record["answer"] for record in records],
+                [record["context"] for record in records]
+            )
+            for record, row in zip(records, scores.to_dict(orient='records')):
+                record["relevancy_score"] = float(row.pop("answer_relevancy"))
+                record["faithfulness_score"] = float(row.pop("faithfulness"))
+                row.pop("question")
+                record["metrics"] = row
+        for record in records:
+            del record["context"]
+        cached = sum(record["generation_cached"] for record in records)
+        logger.info(f"Evaluated {len(records)} questions in {time.perf_counter() - started:.1f}s "
+                    f"({cached} answers from cache, {self.workers} workers)")
+        return records
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate scores, and latency percentiles over freshly generated answers."""
+    fresh = [record["latency_ms"] for record in records if not record["generation_cached"]]
+    return {
+        "questions": len(records),
+        "relevancy_score": float(np.mean([r["relevancy_score"] for r in records])) if records else 0.0,
+        "faithfulness_score": float(np.mean([r["faithfulness_score"] for r in records])) if records else 0.0,
+        "mean_sources": float(np.mean([r["num_sources"] for r in records])) if records else 0.0,
+        "fresh_answers": len(fresh),
+        "p50_latency_ms": float(np.percentile(fresh, 50)) if fresh else None,
+        "p95_latency_ms": float(np.percentile(fresh, 95)) if fresh else None
+    }
+
+
+def scorer_name(records: List[Dict[str, Any]]) -> str:
+    """"embedding" if the records were scored by a MetricsEngine, else "keyword"."""
+    return "embedding" if any("metrics" in record for record in records) else "keyword"
+
+
+def save_baseline(path: str, records: List[Dict[str, Any]], metadata: Dict[str, Any] = None):
+    """Store per-question retrieval and scores plus the summary as the golden baseline."""
+    baseline = {
+        "metrics": scorer_name(records),
+        **(metadata or {}),
+        "summary": summarize(records),
+        "questions": {
+            record["question"]: {
+                "source_ids": record["source_ids"],
+                "relevancy_score": record["relevancy_score"],
+                "faithfulness_score": record["faithfulness_score"],
+                "latency_ms": record["latency_ms"]
+            }
+            for record in records
+        }
+    }
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def compare_to_baseline(
+    records: List[Dict[str, Any]],
+    baseline: Dict[str, Any],
+    tolerances: Dict[str, float] = None
+) -> List[str]:
+    """
+    Check the run against the golden baseline.
+
+    Args:
+        records: Output of `EvaluationRunner.run`
+        baseline: Contents written by `save_baseline`
+        tolerances: Overrides for DEFAULT_TOLERANCES
+
+    Returns:
+        Human-readable regressions; empty when the run passes. A baseline
+        scored differently (keyword vs embedding metrics, which are on
+        different scales) is not compared at all.
+    """
+    # Baselines written before the scorer was recorded used keyword overlap
+    baseline_scorer, scorer = baseline.get("metrics", "keyword"), scorer_name(records)
+    if baseline_scorer != scorer:
+        return [f"Baseline was scored with {baseline_scorer} metrics but this run with {scorer}; "
+                "re-create it with --update_baseline"]
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    expected = baseline.get("questions", {})
+    shared = [record for record in records if record["question"] in expected]
+    if not shared:
+        return ["No questions in common with the baseline"]
+
+    failures = []
+    overlaps = []
+    for record in shared:
+        baseline_ids = set(expected[record["question"]]["source_ids"])
+        if baseline_ids:
+            overlaps.append(len(baseline_ids & set(record["source_ids"])) / len(baseline_ids))
+    overlap = float(np.mean(overlaps)) if overlaps else 1.0
+    if overlap < tolerances["min_retrieval_overlap"]:
+        failures.append(f"Retrieval overlap {overlap:.3f} < {tolerances['min_retrieval_overlap']}")
+
+    for metric in ("relevancy_score", "faithfulness_score"):
+        current = float(np.mean([record[metric] for record in shared]))
+        previous = float(np.mean([expected[record["question"]][metric] for record in shared]))
+        if previous - current > tolerances["max_score_drop"]:
+            failures.append(f"{metric} dropped from {previous:.3f} to {current:.3f}")
+
+    fresh = [record for record in shared if not record["generation_cached"]]
+    if fresh:
+        current = float(np.percentile([record["latency_ms"] for record in fresh], 95))
+        previous = float(np.percentile([expected[record["question"]]["latency_ms"] for record in fresh], 95))
+        if current > previous * (1 + tolerances["max_latency_increase"]):
+            failures.append(f"p95 latency rose from {previous:.0f} ms to {current:.0f} ms")
+    return failures
+
+
+def _load_evaluation_config(config_path: str) -> Dict[str, Any]:
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            return (yaml.safe_load(f) or {}).get('evaluation', {})
+    return {}
+
+
+def main():
+    from src.rag_pipeline import RAGPipeline
+    from src.evaluate_rag import BUSINESS_QUESTIONS
+
+    parser = argparse.ArgumentParser(description="Evaluate the RAG pipeline against a golden baseline.")
+    parser.add_argument("--questions", default=None, help="Text file with one question per line")
+    parser.add_argument("--config", default="config.yaml", help="Config with the `evaluation` section")
+    parser.add_argument("--workers", type=int, default=None, help="Questions evaluated concurrently")
+    parser.add_argument("--k", type=int, default=None, help="Documents retrieved per question")
+    parser.add_argument("--no_cache", action="store_true", help="Recompute everything (results are still cached)")
+    parser.add_argument("--update_baseline", action="store_true", help="Write this run as the new golden baseline")
+    parser.add_argument("--output", default=None, help="Optional JSON file for per-question results")
+    args = parser.parse_args()
+
+    config = _load_evaluation_config(args.config)
+    if args.questions:
+        with open(args.questions, 'r', encoding='utf-8') as f:
+            questions = [line.strip() for line in f if line.strip()]
+    else:
+        questions = BUSINESS_QUESTIONS
+    baseline_path = config.get('baseline_path', 'docs/evaluation_baseline.json')
+
+    pipeline = RAGPipeline(config_path=args.config)
+    runner = EvaluationRunner(
+        pipeline,
+        cache_dir=config.get('cache_dir', '.eval_cache'),
+        workers=args.workers or config.get('workers', 4),
+        k=args.k,
+        use_cache=not args.no_cache,
+        metrics=MetricsEngine(pipeline.embeddings)
+    )
+    records = runner.run(questions)
+    summary = summarize(records)
+
+    print("\n=== Evaluation Summary ===")
+    for name, value in summary.items():
+        print(f"{name:>20}: {value:.3f}" if isinstance(value, float) else f"{name:>20}: {value}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"summary": summary, "results": records}, f, indent=2, default=str)
+        print(f"\nResults saved to {args.output}")
+
+    if args.update_baseline:
+        save_baseline(baseline_path, records, {
+            "index_version": runner.index_version,
+            "llm": runner.llm_model,
+            "prompt_version": runner.prompt_version,
+            "k": runner.k,
+            "workers": runner.workers
+        })
+        print(f"Baseline written to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --update_baseline to create one")
+        return 0
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    failures = compare_to_baseline(records, baseline, config.get('tolerances'))
+    if failures:
+        print("\nREGRESSION against baseline:")
+        for failure in failures:
+            print(f"- {failure}")
+        return 1
+    print("\nNo regression against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
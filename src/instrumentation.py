@@ -0,0 +1,197 @@
+"""
+Lightweight per-stage instrumentation for the RAG pipeline.
+
+A `Trace` collects monotonic stage timings and counters (tokens, cache hits)
+for one request; `Instrumentation` keeps the current trace in a context
+variable so pipeline internals can call `metrics.stage("faiss_search")`
+without threading it through every signature, and aggregates finished traces
+into histograms exposed in Prometheus text format.
+
+When disabled, `stage()` returns a shared no-op context manager and no trace
+is created, so the cost is one context-variable lookup per stage.
+"""
+
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Seconds; spans cached FAISS lookups up to slow CPU generation
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NULL_STAGE = nullcontext()
+_current_trace = contextvars.ContextVar("rag_trace", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def render_histogram(metric: str, histogram: Histogram, labels: str = "") -> List[str]:
+    """Prometheus exposition lines (`_bucket`, `_sum`, `_count`) for one labelled histogram."""
+    prefix = f"{labels}," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{metric}_bucket{{{prefix}le="{le}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{suffix} {histogram.sum}")
+    lines.append(f"{metric}_count{suffix} {histogram.count}")
+    return lines
+
+
+class Trace:
+    """Stage timings and counters for a single request."""
+
+    __slots__ = ("started", "timings", "counters")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> Dict[str, float]:
+        """The `timings` dict attached to responses: stage milliseconds plus counters."""
+        timings = {f"{name}_ms": round(seconds * 1000, 3) for name, seconds in self.timings.items()}
+        timings["total_ms"] = round(self.elapsed * 1000, 3)
+        timings.update(self.counters)
+        return timings
+
+
+class Instrumentation:
+    """
+    Per-pipeline registry of stage histograms and event counters.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Args:
+            enabled: When False every call is a no-op
+            buckets: Histogram bucket upper bounds in seconds
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self) -> Iterator[Optional[Trace]]:
+        """
+        Open a request trace (or join the one already open in this context).
+
+        Only the outermost trace is recorded into the histograms, so public
+        entry points can be nested (query -> generate_answer -> retrieve).
+        Yields None when instrumentation is disabled.
+        """
+        if not self.enabled:
+            yield None
+            return
+        current = _current_trace.get()
+        if current is not None:
+            yield current
+            return
+        trace = Trace()
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            self._record(trace)
+
+    def stage(self, name: str):
+        """Context manager timing `name` in the current trace, if any."""
+        trace = _current_trace.get()
+        if trace is None:
+            return _NULL_STAGE
+        return trace.stage(name)
+
+    def count(self, name: str, n: int = 1):
+        """Add `n` to counter `name` in the current trace, if any."""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.count(name, n)
+
+    @property
+    def active(self) -> bool:
+        """True inside a trace; guards work done only to feed metrics (e.g. token counting)."""
+        return _current_trace.get() is not None
+
+    def _record(self, trace: Trace):
+        with self._lock:
+            for name, seconds in trace.timings.items():
+                self._histogram(name).observe(seconds)
+            self._histogram("total").observe(trace.elapsed)
+            for name, n in trace.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def _histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(self.buckets)
+        return histogram
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-data copy of the histograms and counters (picklable, for other processes)."""
+        with self._lock:
+            return {
+                "histograms": {name: (list(h.counts), h.sum, h.count) for name, h in self.histograms.items()},
+                "counters": dict(self.counters)
+            }
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Add a `snapshot` (e.g. from a worker process) into this registry."""
+        with self._lock:
+            for name, (counts, total, count) in snapshot["histograms"].items():
+                histogram = self._histogram(name)
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+            for name, n in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def render_prometheus(self, prefix: str = "rag") -> str:
+        """Histograms and counters in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage per request.",
+            f"# TYPE {prefix}_stage_seconds histogram"
+        ]
+        with self._lock:
+            for name in sorted(self.histograms):
+                lines.extend(render_histogram(f"{prefix}_stage_seconds", self.histograms[name], f'stage="{name}"'))
+
+            lines.append(f"# HELP {prefix}_events_total Pipeline event counters (tokens, cache hits).")
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for name in sorted(self.counters):
+                lines.append(f'{prefix}_events_total{{event="{name}"}} {self.counters[name]}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,120 @@
+"""
+Local Load Generator for the Query Path
+
+Drives an in-process RAGPipeline with 1-32 concurrent closed-loop clients and
+reports throughput and latency percentiles, with and without the
+MicroBatcher in front of the pipeline.
+
+Usage:
+    python -m src.load_test --clients 1 2 4 8 16 32 --requests 20
+"""
+
+import time
+import json
+import logging
+import argparse
+import threading
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src.rag_pipeline import RAGPipeline
+from src.batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES = [
+    "Identify primary friction points in Credit Card services.",
+    "Analyze recurring issues within Money Transfer protocols.",
+    "Summarize customer sentiment regarding Personal Loan interest disclosures.",
+    "Evaluate common obstacles in Savings Account access.",
+    "Describe the profile of reported fraudulent transactions."
+]
+
+
+def summarize_latencies(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    """Throughput and latency percentiles (milliseconds) for one run."""
+    values = np.asarray(latencies, dtype=np.float64) * 1000
+    completed = len(values)
+    return {
+        "requests": completed + errors,
+        "errors": errors,
+        "throughput_qps": completed / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": float(np.percentile(values, 50)) if completed else float("nan"),
+        "p95_ms": float(np.percentile(values, 95)) if completed else float("nan"),
+        "p99_ms": float(np.percentile(values, 99)) if completed else float("nan"),
+        "mean_ms": float(values.mean()) if completed else float("nan")
+    }
+
+
+def run_closed_loop(target: Callable[[str], Dict], clients: int, requests_per_client: int,
+                    queries: List[str] = None) -> Dict[str, float]:
+    """
+    Run `clients` threads, each sending `requests_per_client` queries back to back.
+    """
+    queries = queries or DEFAULT_QUERIES
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients)
+
+    def client(client_id: int):
+        start_barrier.wait()
+        for i in range(requests_per_client):
+            question = queries[(client_id + i) % len(queries)]
+            started = time.perf_counter()
+            try:
+                target(question)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+            except Exception as e:
+                logger.warning(f"Request failed: {e}")
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize_latencies(latencies, time.perf_counter() - started, errors[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the RAG query path with and without micro-batching.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Concurrency levels")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--max_batch_size", type=int, default=8, help="MicroBatcher max batch size")
+    parser.add_argument("--max_wait_ms", type=float, default=20, help="MicroBatcher max wait")
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    rag = RAGPipeline()
+    # Load the generator before timing anything
+    rag.query(DEFAULT_QUERIES[0])
+
+    results = []
+    for clients in args.clients:
+        direct = run_closed_loop(rag.query, clients, args.requests)
+        batcher = MicroBatcher(rag, args.max_batch_size, args.max_wait_ms)
+        batched = run_closed_loop(batcher.query, clients, args.requests)
+        batched["mean_batch_size"] = batcher.mean_batch_size
+        batcher.close()
+        results.append({"clients": clients, "direct": direct, "batched": batched})
+
+    print("\n=== Query Path Load Test ===")
+    print(f"{'clients':>7} | {'direct qps':>10} {'p95 ms':>9} | {'batched qps':>11} {'p95 ms':>9} {'batch':>6}")
+    for row in results:
+        d, b = row["direct"], row["batched"]
+        print(f"{row['clients']:>7} | {d['throughput_qps']:>10.2f} {d['p95_ms']:>9.1f} | "
+              f"{b['throughput_qps']:>11.2f} {b['p95_ms']:>9.1f} {b['mean_batch_size']:>6.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
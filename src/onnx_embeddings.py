@@ -0,0 +1,292 @@
+"""
+Quantized ONNX Query Embedder
+
+`OnnxEmbeddings` runs an exported, int8-quantized all-MiniLM-L6-v2 with
+onnxruntime and a Rust `tokenizers` fast tokenizer; mean pooling and L2
+normalisation match the sentence-transformers model, so an index built with
+the PyTorch model can be queried with it. Select it anywhere an embedding
+model name is accepted with `onnx:<model_dir>` (e.g. `models.embeddings` in
+config.yaml), after checking parity.
+
+Subcommands:
+- export:    write tokenizer.json, model.onnx and model_quantized.onnx
+- parity:    cosine similarity of ONNX vs PyTorch vectors; exits 1 below tolerance
+- benchmark: single-query latency and batch throughput of each backend
+
+Usage:
+    python -m src.onnx_embeddings export --output models/all-MiniLM-L6-v2-onnx
+    python -m src.onnx_embeddings parity --model_dir models/all-MiniLM-L6-v2-onnx
+    python -m src.onnx_embeddings benchmark --model_dir models/all-MiniLM-L6-v2-onnx --output embed_bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+QUANTIZED_FILE = "model_quantized.onnx"
+FP32_FILE = "model.onnx"
+
+
+def mean_pool(last_hidden_state: np.ndarray, attention_mask: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """Mask-weighted mean over tokens, then L2 normalisation (sentence-transformers pooling)."""
+    mask = attention_mask[..., None].astype(np.float32)
+    pooled = (last_hidden_state * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    if normalize:
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+    return pooled
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings from an ONNX export of a BERT-style encoder.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        model_file: str = QUANTIZED_FILE,
+        max_length: int = 256,
+        batch_size: int = 32,
+        threads: int = None,
+        session=None,
+        tokenizer=None
+    ):
+        """
+        Args:
+            model_dir: Directory written by `export_onnx` (tokenizer.json and .onnx files)
+            model_file: ONNX file to run (int8 by default, FP32_FILE for the unquantized export)
+            max_length: Token limit per text (all-MiniLM-L6-v2 truncates at 256)
+            batch_size: Texts per inference call in `embed_documents`
+            threads: onnxruntime intra-op threads (default: onnxruntime's choice)
+            session: onnxruntime session to use instead of loading `model_file`
+            tokenizer: `tokenizers.Tokenizer` to use instead of loading tokenizer.json
+        """
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+
+        if tokenizer is None:
+            from tokenizers import Tokenizer
+
+            tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer = tokenizer
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]")
+        self.tokenizer.enable_padding(pad_id=pad_id if pad_id is not None else 0, pad_token="[PAD]")
+
+        if session is None:
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if threads:
+                options.intra_op_num_threads = threads
+            session = ort.InferenceSession(
+                os.path.join(model_dir, model_file), sess_options=options, providers=["CPUExecutionProvider"]
+            )
+        self.session = session
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        features = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+        inputs = {name: value for name, value in features.items() if name in self._input_names}
+        last_hidden_state = self.session.run(None, inputs)[0]
+        return mean_pool(last_hidden_state, features["attention_mask"])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Batch texts of similar length together to minimise padding
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            batch = self._embed_batch([texts[i] for i in rows])
+            if vectors.shape[1] == 0:
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[rows] = batch
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True, opset: int = 17) -> Dict[str, str]:
+    """
+    Export a transformers encoder to ONNX and quantize its weights to int8.
+
+    Args:
+        model_name: HuggingFace model name
+        output_dir: Destination directory
+        quantize: Also write the dynamically quantized (int8 weights) model
+        opset: ONNX opset version
+
+    Returns:
+        Paths of the written models
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(output_dir)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    sample = tokenizer(["An example complaint about a late fee."], return_tensors="pt")
+    paths = {"fp32": os.path.join(output_dir, FP32_FILE)}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in names),
+            paths["fp32"],
+            input_names=names,
+            output_names=["last_hidden_state", "pooler_output"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in names},
+                          "last_hidden_state": {0: "batch", 1: "sequence"}, "pooler_output": {0: "batch"}},
+            opset_version=opset
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        paths["int8"] = os.path.join(output_dir, QUANTIZED_FILE)
+        quantize_dynamic(paths["fp32"], paths["int8"], weight_type=QuantType.QInt8)
+    for name, path in paths.items():
+        logger.info(f"Wrote {name} model to {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    return paths
+
+
+def parity_check(reference: Embeddings, candidate: Embeddings, texts: List[str]) -> Dict[str, float]:
+    """
+    Compare two embedders on the same texts.
+
+    Returns:
+        Minimum and mean cosine similarity between paired vectors, and the
+        largest absolute component difference
+    """
+    a = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    b = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    a /= np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b /= np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    cosine = np.einsum('ij,ij->i', a, b)
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(a - b).max())
+    }
+
+
+def benchmark_embedder(embeddings: Embeddings, queries: List[str], documents: List[str],
+                       batch_sizes: List[int] = (1, 8, 32, 128)) -> Dict[str, Any]:
+    """Single-query latency percentiles and documents/sec per batch size."""
+    from src.load_test import summarize_latencies
+
+    embeddings.embed_query(queries[0])  # warm-up
+    latencies = []
+    started = time.perf_counter()
+    for query in queries:
+        query_started = time.perf_counter()
+        embeddings.embed_query(query)
+        latencies.append(time.perf_counter() - query_started)
+    single = summarize_latencies(latencies, time.perf_counter() - started)
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        for start in range(0, len(documents), batch_size):
+            embeddings.embed_documents(documents[start:start + batch_size])
+        throughput[str(batch_size)] = len(documents) / (time.perf_counter() - started)
+    return {"query_p50_ms": single["p50_ms"], "query_p95_ms": single["p95_ms"],
+            "query_qps": single["throughput_qps"], "docs_per_sec_by_batch_size": throughput}
+
+
+def sample_texts(n: int, seed: int = 42) -> List[str]:
+    """Realistic complaint narratives for parity and throughput runs."""
+    from src.synthetic_corpus import SyntheticCorpus
+    from src.preprocessing import NARRATIVE_COL
+
+    chunk = SyntheticCorpus(seed=seed, narrative_rate=1.0, duplicate_rate=0.0).chunk(n)
+    return chunk[NARRATIVE_COL].tolist()
+
+
+def main():
+    from src.load_test import DEFAULT_QUERIES
+
+    parser = argparse.ArgumentParser(description="Export, validate and benchmark the ONNX query embedder.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Export and quantize the model")
+    export.add_argument("--model", default=DEFAULT_MODEL, help="HuggingFace model name")
+    export.add_argument("--output", default="models/all-MiniLM-L6-v2-onnx", help="Output directory")
+    export.add_argument("--no_quantize", action="store_true", help="Only write the fp32 export")
+
+    for name, help_text in (("parity", "Compare ONNX vectors with the PyTorch model"),
+                            ("benchmark", "Compare latency and throughput of the backends")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--model", default=DEFAULT_MODEL, help="Reference HuggingFace model name")
+        sub.add_argument("--model_dir", default="models/all-MiniLM-L6-v2-onnx", help="Directory written by export")
+        sub.add_argument("--texts", type=int, default=500, help="Synthetic narratives to embed")
+        sub.add_argument("--threads", type=int, default=None, help="onnxruntime intra-op threads")
+        sub.add_argument("--output", default=None, help="Optional JSON file for the results")
+    subparsers.choices["parity"].add_argument("--min_cosine", type=float, default=0.99,
+                                              help="Fail if any pair falls below this cosine similarity")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.model, args.output, quantize=not args.no_quantize)
+        return 0
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    reference = HuggingFaceEmbeddings(model_name=args.model)
+    backends = {"pytorch_fp32": reference}
+    for label, model_file in (("onnx_fp32", FP32_FILE), ("onnx_int8", QUANTIZED_FILE)):
+        if os.path.exists(os.path.join(args.model_dir, model_file)):
+            backends[label] = OnnxEmbeddings(args.model_dir, model_file=model_file, threads=args.threads)
+    texts = list(DEFAULT_QUERIES) + sample_texts(args.texts)
+
+    if args.command == "parity":
+        results = {label: parity_check(reference, backend, texts)
+                   for label, backend in backends.items() if label != "pytorch_fp32"}
+        print("\n=== Embedding Parity vs PyTorch ===")
+        for label, row in results.items():
+            print(f"{label:<12} min cos {row['min_cosine']:.5f}  mean cos {row['mean_cosine']:.5f}  "
+                  f"max |diff| {row['max_abs_diff']:.5f}")
+        passed = bool(results) and all(row["min_cosine"] >= args.min_cosine for row in results.values())
+        print(f"Parity {'OK' if passed else 'FAILED'} (min cosine >= {args.min_cosine})")
+    else:
+        queries = [text[:200] for text in texts[:200]]
+        results = {label: benchmark_embedder(backend, queries, texts) for label, backend in backends.items()}
+        print("\n=== Embedding Backends ===")
+        for label, row in results.items():
+            batches = "  ".join(f"b{size}: {rate:,.0f}/s" for size, rate in row["docs_per_sec_by_batch_size"].items())
+            print(f"{label:<13} query p50 {row['query_p50_ms']:>7.2f} ms  p95 {row['query_p95_ms']:>7.2f} ms | {batches}")
+        passed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
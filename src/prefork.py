@@ -0,0 +1,368 @@
+"""
+Pre-fork serving: one copy of the index, N worker processes.
+
+The parent loads the FAISS index and docstore once (`RAGPipeline(load_models=False)`),
+freezes the garbage collector so collections do not dirty the shared object
+pages, and forks the workers. The index pages are then shared copy-on-write
+and read-only; each worker loads its own embedding model and generator after
+fork, since torch and tokenizer thread pools do not survive fork safely.
+
+`PreforkPool` is the front dispatcher. It exposes the pipeline's query
+methods, sends each call to the worker with the fewest requests in flight,
+and resolves results on a collector thread. Its `metrics` sums the workers'
+stage histograms and counters for /metrics. Streaming is served as a single
+chunk because responses cross a process boundary.
+
+Worker liveness is checked about once a second. A worker that has exited is
+taken out of rotation and its in-flight requests fail. It is not respawned:
+forking again from a server that is already running threads can deadlock
+the child, so restart the app to get it back. With no live worker left every
+call fails immediately.
+
+Usage (memory and throughput report):
+    python -m src.prefork --workers 1 2 4 --clients 8 --requests 10
+"""
+
+import gc
+import os
+import json
+import time
+import queue
+import logging
+import argparse
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.rag_pipeline import RAGPipeline
+from src.instrumentation import Instrumentation
+from src.load_test import DEFAULT_QUERIES, run_closed_loop
+
+logger = logging.getLogger(__name__)
+
+_READY = "__ready__"
+# Request for the worker's metrics snapshot (not a pipeline method)
+_METRICS = "__metrics__"
+
+
+def _worker_main(worker_id: int, pipeline, requests, results, threads_per_worker: int):
+    """Worker loop: load models, then answer requests until the None sentinel."""
+    gc.enable()
+    try:
+        import faiss
+        faiss.omp_set_num_threads(threads_per_worker)
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    try:
+        pipeline.load_models()
+    except Exception as e:
+        results.put((_READY, worker_id, False, f"model load failed: {e}"))
+        return
+    results.put((_READY, worker_id, True, os.getpid()))
+
+    while True:
+        item = requests.get()
+        if item is None:
+            return
+        request_id, method, args, kwargs = item
+        try:
+            handler = pipeline.metrics.snapshot if method == _METRICS else getattr(pipeline, method)
+            results.put((request_id, worker_id, True, handler(*args, **kwargs)))
+        except Exception as e:
+            results.put((request_id, worker_id, False, f"{type(e).__name__}: {e}"))
+
+
+class PreforkPool:
+    """
+    Least-loaded dispatcher over forked pipeline workers.
+    """
+
+    def __init__(self, pipeline: RAGPipeline, workers: int = 2, threads_per_worker: int = 1,
+                 start_timeout: float = 600.0, metrics_timeout: float = 2.0, liveness_interval: float = 1.0):
+        """
+        Args:
+            pipeline: Pipeline built with `load_models=False`; its index is shared by all workers
+            workers: Number of worker processes
+            threads_per_worker: torch/FAISS threads per worker (workers x threads <= cores)
+            start_timeout: Seconds to wait for every worker to load its models
+            metrics_timeout: Seconds `metrics` waits for the workers' snapshots
+            liveness_interval: Seconds between checks for workers that have exited
+        """
+        self.pipeline = pipeline
+        self.num_workers = max(1, int(workers))
+        self.threads_per_worker = threads_per_worker
+        self.start_timeout = start_timeout
+        self.metrics_timeout = metrics_timeout
+        self.liveness_interval = liveness_interval
+
+        self._context = multiprocessing.get_context("fork")
+        self._results = self._context.Queue()
+        self._queues = []
+        self._processes = []
+        self._in_flight = []
+        self._dead = set()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._rotation = itertools.count()
+        self._collector = None
+        self._stopped = threading.Event()
+
+    def start(self) -> "PreforkPool":
+        """
+        Fork the workers and wait until each has loaded its models.
+
+        Call this while the process is still single-threaded (before starting
+        servers or loader threads): a lock held by another thread at fork time
+        stays locked forever in the children.
+        """
+        if threading.active_count() > 1:
+            logger.warning(f"Forking with {threading.active_count()} threads running; "
+                           "workers may deadlock on locks held at fork time")
+        # Freeze everything allocated so far into the permanent generation so the
+        # collector never writes to (and un-shares) the parent's object pages
+        gc.disable()
+        gc.collect()
+        gc.freeze()
+        for worker_id in range(self.num_workers):
+            requests = self._context.Queue()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(worker_id, self.pipeline, requests, self._results, self.threads_per_worker),
+                name=f"rag-worker-{worker_id}",
+                daemon=True
+            )
+            process.start()
+            self._queues.append(requests)
+            self._processes.append(process)
+            self._in_flight.append(set())
+        gc.enable()
+
+        deadline = time.monotonic() + self.start_timeout
+        ready = 0
+        while ready < self.num_workers:
+            request_id, worker_id, ok, payload = self._results.get(timeout=max(0.0, deadline - time.monotonic()))
+            if not ok:
+                self.close()
+                raise RuntimeError(f"Worker {worker_id} failed to start: {payload}")
+            ready += 1
+        logger.info(f"Pre-fork pool ready: {self.num_workers} workers")
+
+        self._collector = threading.Thread(target=self._collect, name="prefork-collector", daemon=True)
+        self._collector.start()
+        return self
+
+    def submit(self, method: str, *args, **kwargs) -> Future:
+        """Run `pipeline.<method>(*args, **kwargs)` on the least-loaded worker."""
+        return self._dispatch(None, method, args, kwargs)
+
+    def _dispatch(self, worker_id: Optional[int], method: str, args, kwargs) -> Future:
+        if self._stopped.is_set():
+            raise RuntimeError("PreforkPool is closed")
+        future = Future()
+        with self._lock:
+            if worker_id is None:
+                # Ties go round-robin so sequential traffic (e.g. warm-up) reaches every worker
+                offset = next(self._rotation)
+                candidates = [(offset + i) % self.num_workers for i in range(self.num_workers)]
+                candidates = [w for w in candidates if w not in self._dead]
+                if not candidates:
+                    raise RuntimeError("No live PreforkPool workers")
+                worker_id = min(candidates, key=lambda w: len(self._in_flight[w]))
+            elif worker_id in self._dead:
+                raise RuntimeError(f"Worker {worker_id} has exited")
+            request_id = next(self._ids)
+            self._in_flight[worker_id].add(request_id)
+            self._pending[request_id] = future
+        self._queues[worker_id].put((request_id, method, args, kwargs))
+        return future
+
+    def _collect(self):
+        next_check = time.monotonic() + self.liveness_interval
+        while not self._stopped.is_set():
+            # Checked on a timer rather than only when idle: under steady traffic
+            # from the other workers the results queue is never empty
+            if time.monotonic() >= next_check:
+                self._fail_dead_workers()
+                next_check = time.monotonic() + self.liveness_interval
+            try:
+                request_id, worker_id, ok, payload = self._results.get(timeout=self.liveness_interval)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._in_flight[worker_id].discard(request_id)
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _fail_dead_workers(self):
+        for worker_id, process in enumerate(self._processes):
+            if worker_id in self._dead or process.is_alive():
+                continue
+            logger.error(f"Worker {worker_id} exited (code {process.exitcode}); "
+                         f"{self.num_workers - len(self._dead) - 1} worker(s) left")
+            with self._lock:
+                self._dead.add(worker_id)
+                lost = [self._pending.pop(request_id) for request_id in self._in_flight[worker_id]
+                        if request_id in self._pending]
+                self._in_flight[worker_id].clear()
+            for future in lost:
+                future.set_exception(RuntimeError(f"Worker {worker_id} exited (code {process.exitcode})"))
+
+    # RAGPipeline-compatible interface, used by app.py, MicroBatcher and the API
+
+    def query(self, user_question: str, **kwargs) -> Dict[str, Any]:
+        return self.submit("query", user_question, **kwargs).result()
+
+    def query_extractive(self, user_question: str, **kwargs) -> Dict[str, Any]:
+        return self.submit("query_extractive", user_question, **kwargs).result()
+
+    def query_batch(self, user_questions: List[str], **kwargs) -> List[Dict[str, Any]]:
+        return self.submit("query_batch", user_questions, **kwargs).result()
+
+    def retrieve_relevant_complaints(self, query: str, **kwargs) -> List[Dict[str, Any]]:
+        return self.submit("retrieve_relevant_complaints", query, **kwargs).result()
+
+    def stream_answer(self, query: str, k: int = None, filter: Dict[str, Any] = None,
+                      deadline_ms: float = None) -> Iterator[Dict[str, Any]]:
+        response = self.query(query, k=k, filter=filter, deadline_ms=deadline_ms)
+        if response.get("sources"):
+            yield {"event": "sources", "data": response["sources"]}
+            yield {"event": "token", "data": response["answer"]}
+        yield {"event": "done", "data": response}
+
+    @property
+    def metrics(self) -> Instrumentation:
+        """
+        Stage histograms and counters summed over the workers and the parent.
+
+        A worker busy with a long generation for more than `metrics_timeout`
+        seconds is left out of this snapshot (and logged).
+        """
+        merged = Instrumentation(buckets=self.pipeline.metrics.buckets)
+        merged.merge(self.pipeline.metrics.snapshot())
+        with self._lock:
+            live = [worker_id for worker_id in range(self.num_workers) if worker_id not in self._dead]
+        futures = []
+        for worker_id in live:
+            try:
+                futures.append((worker_id, self._dispatch(worker_id, _METRICS, (), {})))
+            except RuntimeError as e:
+                logger.warning(f"Metrics from worker {worker_id} unavailable: {e}")
+        deadline = time.monotonic() + self.metrics_timeout
+        for worker_id, future in futures:
+            try:
+                merged.merge(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except Exception as e:
+                logger.warning(f"Metrics from worker {worker_id} unavailable: {e or type(e).__name__}")
+        return merged
+
+    @property
+    def cube(self):
+        return getattr(self.pipeline, "cube", None)
+
+    def query_aggregate(self, *args, **kwargs) -> Dict[str, Any]:
+        # The cube was loaded before fork and counting takes milliseconds, so it
+        # is answered here rather than queued behind generation on a worker
+        return self.pipeline.query_aggregate(*args, **kwargs)
+
+    def resolve_deadline(self, deadline_ms: float = None):
+        # CLOCK_MONOTONIC is system-wide, so deadlines set here hold in the workers
+        return self.pipeline.resolve_deadline(deadline_ms)
+
+    @property
+    def worker_pids(self) -> List[int]:
+        return [process.pid for process in self._processes]
+
+    def close(self, timeout: float = 10.0):
+        """Stop the workers; in-flight requests fail."""
+        self._stopped.set()
+        for requests in self._queues:
+            requests.put(None)
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+        # Stop the queue feeder threads and the collector so a later pool forks single-threaded
+        for requests in self._queues:
+            requests.close()
+            requests.join_thread()
+        if self._collector is not None and self._collector is not threading.current_thread():
+            self._collector.join(timeout=timeout)
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for future in pending:
+            future.set_exception(RuntimeError("PreforkPool closed"))
+
+
+def process_memory_mb(pid: int) -> Dict[str, float]:
+    """RSS, PSS (shared pages split between sharers) and private memory of a process."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report memory and QPS of pre-fork serving versus worker count.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to test")
+    parser.add_argument("--threads_per_worker", type=int, default=1, help="torch/FAISS threads per worker")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent closed-loop clients")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    pipeline = RAGPipeline(load_models=False)
+    parent_mb = process_memory_mb(os.getpid())
+
+    results = []
+    for workers in args.workers:
+        pool = PreforkPool(pipeline, workers=workers, threads_per_worker=args.threads_per_worker).start()
+        try:
+            # Load every worker's generator before measuring
+            for future in [pool.submit("query", DEFAULT_QUERIES[0]) for _ in range(workers)]:
+                future.result()
+            memory = [process_memory_mb(pid) for pid in pool.worker_pids]
+            load = run_closed_loop(pool.query, args.clients, args.requests)
+        finally:
+            pool.close()
+        results.append({
+            "workers": workers,
+            "worker_private_mb": sum(m["private_mb"] for m in memory) / workers,
+            "worker_pss_mb": sum(m["pss_mb"] for m in memory) / workers,
+            "total_pss_mb": parent_mb["pss_mb"] + sum(m["pss_mb"] for m in memory),
+            **load
+        })
+
+    print("\n=== Pre-fork Serving ===")
+    print(f"Parent (index + docstore): RSS {parent_mb['rss_mb']:.1f} MB")
+    print(f"{'workers':>7} | {'private MB/worker':>17} {'PSS MB/worker':>13} {'total PSS MB':>12} | "
+          f"{'qps':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in results:
+        print(f"{row['workers']:>7} | {row['worker_private_mb']:>17.1f} {row['worker_pss_mb']:>13.1f} "
+              f"{row['total_pss_mb']:>12.1f} | {row['throughput_qps']:>7.2f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"parent": parent_mb, "runs": results}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,32 @@
 import os
 import sys
+import argparse
 import pandas as pd
 
 # Ensure src is in the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from src.preprocessing import process_dataset
+from src.preprocessing import delta_path_for, process_dataset
 
 def main():
+    parser = argparse.ArgumentParser(description="Filter and clean the raw CFPB export.")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="csv: filtered_complaints.csv, parquet: partitioned complaints_parquet/")
+    parser.add_argument("--dedup", action="store_true", help="Drop near-duplicate narratives (MinHash LSH)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process rows new or amended since the last run and write a delta")
+    parser.add_argument("--track_state", action="store_true",
+                        help="Full run: also record the watermark that later --incremental runs need")
+    args = parser.parse_args()
+
     # Define paths
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     raw_data_path = os.path.join(base_dir, 'data', 'raw', 'complaints_sample.csv')
     processed_dir = os.path.join(base_dir, 'data', 'processed')
-    output_path = os.path.join(processed_dir, 'filtered_complaints.csv')
+    if args.format == 'parquet':
+        output_path = os.path.join(processed_dir, 'complaints_parquet')
+    else:
+        output_path = os.path.join(processed_dir, 'filtered_complaints.csv')
 
     # Ensure processed directory exists
     if not os.path.exists(processed_dir):
@@ -27,9 +41,15 @@ def main():
     print("Starting dataset processing...")
     try:
         # distinct chunk_size can be adjusted based on memory availability
-        processed_count = process_dataset(raw_data_path, output_path, chunk_size=100000)
+        processed_count = process_dataset(raw_data_path, output_path, chunk_size=100000,
+                                          workers=os.cpu_count() or 1, output_format=args.format,
+                                          dedup=args.dedup, incremental=args.incremental,
+                                          track_state=args.track_state)
         print(f"Successfully processed {processed_count} complaints.")
         print(f"Output saved to: {output_path}")
+        if args.incremental:
+            print("Update the vector store with: python -m src.build_vector_store "
+                  f"--apply_delta {delta_path_for(output_path)}")
     except Exception as e:
         print(f"An error occurred during processing: {e}")
 
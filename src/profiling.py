@@ -0,0 +1,138 @@
+"""
+Opt-in per-request profiling for the RAG pipeline.
+
+A profiled request runs under cProfile with tracemalloc tracing allocations.
+Each profile is written to `output_dir` as a pair of files sharing a stem:
+- `<stem>.prof`: raw cProfile stats (open with `python -m pstats` or snakeviz)
+- `<stem>.json`: the query, response timings, top functions by cumulative
+  time and top allocation sites
+
+Only the newest `max_profiles` pairs are kept. Profiling is requested per
+call (the `profile=True` flag on `RAGPipeline.query`, or the `X-Profile`
+header on the API) or by a random `sample_rate`. One request is profiled at a
+time, since tracemalloc is process-wide; concurrent requests run unprofiled.
+"""
+
+import io
+import os
+import json
+import time
+import pstats
+import random
+import logging
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfiler:
+    """
+    Captures cProfile and tracemalloc data for selected requests.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = "profiles",
+        sample_rate: float = 0.0,
+        max_profiles: int = 50,
+        top_n: int = 30,
+        tracemalloc_frames: int = 5
+    ):
+        """
+        Args:
+            output_dir: Directory the profiles are written to
+            sample_rate: Fraction of requests profiled without being asked (0 disables)
+            max_profiles: Number of most recent profiles kept on disk
+            top_n: Functions and allocation sites listed in the JSON summary
+            tracemalloc_frames: Stack depth recorded per allocation
+        """
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.max_profiles = max_profiles
+        self.top_n = top_n
+        self.tracemalloc_frames = tracemalloc_frames
+        self._busy = threading.Lock()
+
+    def should_profile(self, requested: bool = False) -> bool:
+        """True if this request was asked to be profiled or falls in the sample."""
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    @contextmanager
+    def profile(self, query: str) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Profile the enclosed block.
+
+        Yields a record dict; set `record["timings"]` inside the block to save
+        the response timings with the profile. After the block `record["path"]`
+        holds the JSON summary path. Yields None (and profiles nothing) when
+        another request is already being profiled.
+        """
+        if not self._busy.acquire(blocking=False):
+            yield None
+            return
+        record = {"query": query, "timings": None, "path": None}
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(self.tracemalloc_frames)
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                yield record
+            finally:
+                profiler.disable()
+                record["wall_time_ms"] = round((time.perf_counter() - started) * 1000, 3)
+                snapshot = tracemalloc.take_snapshot()
+                record["traced_memory_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 3)
+                if started_tracemalloc:
+                    tracemalloc.stop()
+                try:
+                    record["path"] = self._write(profiler, snapshot, record)
+                except OSError as e:
+                    logger.warning(f"Could not write request profile: {e}")
+        finally:
+            self._busy.release()
+
+    def _write(self, profiler: cProfile.Profile, snapshot, record: Dict[str, Any]) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.join(self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}")
+        profiler.dump_stats(f"{stem}.prof")
+
+        stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats("cumulative")
+        functions = []
+        for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+            functions.append({
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3)
+            })
+        functions.sort(key=lambda f: f["cumulative_ms"], reverse=True)
+
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        allocations = [
+            {"site": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:self.top_n]
+        ]
+
+        summary = {**record, "top_functions": functions[:self.top_n], "top_allocations": allocations}
+        summary.pop("path", None)
+        with open(f"{stem}.json", "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+        self._rotate()
+        return f"{stem}.json"
+
+    def _rotate(self):
+        """Delete all but the newest `max_profiles` profiles."""
+        stems = sorted(name[:-5] for name in os.listdir(self.output_dir) if name.endswith(".json"))
+        for stem in stems[:max(0, len(stems) - self.max_profiles)]:
+            for extension in (".json", ".prof"):
+                path = os.path.join(self.output_dir, stem + extension)
+                if os.path.exists(path):
+                    os.remove(path)
@@ -4,22 +4,39 @@ RAG Pipeline for CrediTrust Financial Complaint Analysis
 This module implements the core Retrieval-Augmented Generation (RAG) logic:
 - Vector store loading
 - Query retrieval
+- Query-focused context compression
 - Prompt engineering
 - Answer generation with LLM
+- Counting/trend questions answered from the aggregate cube
 """
 
 import os
+import time
 import logging
+import threading
 import yaml
-from typing import List, Dict, Any, Tuple
-from langchain_huggingface import HuggingFaceEmbeddings
+import numpy as np
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
 from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.aggregate_cube import DIMENSIONS, YEAR, AggregateCube, format_answer
+from src.context_compression import ContextCompressor
+from src.embeddings import create_embeddings
+from src.instrumentation import Instrumentation
+from src.profiling import RequestProfiler
+from src.retrieval_result import RetrievalResult
+from src.segmented_index import DATE_FIELD, DATE_FROM, DATE_TO, SegmentedIndex, in_date_range
+from src.workload import WorkloadRecorder
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Bump whenever _create_prompt or _format_context changes what the LLM sees;
+# cached evaluation results are keyed on it (with the compression settings)
+PROMPT_VERSION = "2"
+
 
 class RAGPipeline:
     """
@@ -28,13 +45,30 @@ class RAGPipeline:
     
     def __init__(
         self, 
-        config_path: str = "config.yaml"
+        config_path: str = "config.yaml",
+        load_models: bool = True,
+        embeddings: Optional[Embeddings] = None,
+        vector_store: Optional[FAISS] = None,
+        generator=None,
+        cube: Optional[AggregateCube] = None,
+        segments: Optional[SegmentedIndex] = None
     ):
         """
         Initialize the RAG pipeline.
         
         Args:
             config_path: Path to the configuration YAML file
+            load_models: Load the embedding model now; pass False to load only
+                the index and docstore and call `load_models()` later (e.g.
+                in each worker after fork)
+            embeddings: Embedder to use instead of `models.embeddings`
+            vector_store: FAISS store (index and docstore) to use instead of
+                loading `paths.vector_store` from disk
+            generator: Text2text generation callable used for `models.llm`
+                instead of loading the transformers pipeline
+            cube: Aggregate cube to use instead of loading `paths.aggregate_cube`
+            segments: Time-partitioned index to search instead of the single
+                vector store (see `segmented_index` in config.yaml)
         """
         self.config = self._load_config(config_path)
         self.vector_store_path = self.config['paths']['vector_store']
@@ -42,11 +76,95 @@ class RAGPipeline:
         self.llm_model_name = self.config['models']['llm']
         self.top_k = self.config['rag_params']['top_k']
         
-        self.vector_store = None
-        self.embeddings = None
+        self.max_new_tokens = self.config['rag_params'].get('max_new_tokens', 200)
+        
+        # Per-query time budget; once less than min_generation_ms is left after
+        # retrieval the extractive summary is served instead of generating
+        self.deadline_ms = self.config['rag_params'].get('deadline_ms', 0)
+        self.min_generation_ms = self.config['rag_params'].get('min_generation_ms', 200)
+        
+        self.vector_store = vector_store
+        self.embeddings = embeddings
+        
+        # Text2text generation pipelines, loaded once per model name on first use
+        self._generators = {}
+        if generator is not None:
+            self._generators[self.llm_model_name] = generator
+        self._generator_lock = threading.Lock()
+        
+        # Per-stage timings attached to responses and aggregated into histograms
+        self.metrics = Instrumentation(enabled=self.config.get('instrumentation', {}).get('enabled', True))
+        
+        # Opt-in cProfile/tracemalloc capture of individual requests
+        profiling_config = self.config.get('profiling', {})
+        self.profiler = RequestProfiler(
+            output_dir=profiling_config.get('output_dir', 'profiles'),
+            sample_rate=profiling_config.get('sample_rate', 0.0),
+            max_profiles=profiling_config.get('max_profiles', 50)
+        )
+        
+        # Opt-in log of answered queries for offline replay (src/replay.py)
+        capture_config = self.config.get('workload_capture', {})
+        self.workload = None
+        if capture_config.get('enabled', False):
+            self.workload = WorkloadRecorder(
+                capture_config.get('path', 'workloads/capture.jsonl'),
+                sample_rate=capture_config.get('sample_rate', 1.0)
+            )
+        
+        # Counts per product/issue/company/state/month for aggregate questions
+        self.cube = cube
+        cube_path = self.config['paths'].get('aggregate_cube')
+        if self.cube is None and self.config.get('aggregates', {}).get('enabled', True) \
+                and cube_path and os.path.exists(cube_path):
+            logger.info(f"Loading aggregate cube from {cube_path}...")
+            self.cube = AggregateCube.load(cube_path)
+        
+        # Date-partitioned segments replace the single index when configured
+        self.segments = segments
+        segments_config = self.config.get('segmented_index', {})
+        segments_path = self.config['paths'].get('segmented_index')
+        if self.segments is None and self.vector_store is None and segments_config.get('enabled', False) \
+                and segments_path and os.path.exists(os.path.join(segments_path, 'manifest.json')):
+            if load_models and self.embeddings is None:
+                self.embeddings = create_embeddings(self.embedding_model_name)
+            self.segments = SegmentedIndex(
+                segments_path,
+                self.embeddings,
+                hot_window_days=segments_config.get('hot_window_days', 365),
+                max_cold_loaded=segments_config.get('max_cold_loaded', 4),
+                mmap_cold=segments_config.get('mmap_cold', True)
+            )
+        elif self.segments is not None and self.embeddings is not None:
+            self.segments.set_embeddings(self.embeddings)
+        
+        # Load vector store (unless one was injected or segments are used)
+        if self.segments is not None:
+            if self.embeddings is None:
+                self.embeddings = self.segments.embeddings
+        elif self.vector_store is None:
+            self._load_vector_store(load_embeddings=load_models)
+        elif self.embeddings is None:
+            self.embeddings = self.vector_store.embedding_function
+        else:
+            self.vector_store.embedding_function = self.embeddings
         
-        # Load vector store
-        self._load_vector_store()
+        # Keep only the retrieved sentences closest to the question within a token budget
+        compression_config = self.config.get('context_compression', {})
+        self.compressor = None
+        if compression_config.get('enabled', False):
+            self.compressor = ContextCompressor(
+                self.embeddings,
+                token_budget=compression_config.get('token_budget', 160),
+                min_sentence_chars=compression_config.get('min_sentence_chars', 20)
+            )
+    
+    @property
+    def prompt_version(self) -> str:
+        """PROMPT_VERSION plus the compression settings, which also change what the LLM sees."""
+        if self.compressor is None:
+            return PROMPT_VERSION
+        return f"{PROMPT_VERSION}+{self.compressor.signature}"
 
     def _load_config(self, config_path: str) -> Dict:
         """Load the configuration from YAML."""
@@ -58,20 +176,19 @@ class RAGPipeline:
                     'embeddings': 'sentence-transformers/all-MiniLM-L6-v2',
                     'llm': 'google/flan-t5-small'
                 },
-                'rag_params': {'top_k': 5, 'max_new_tokens': 200}
+                'rag_params': {'top_k': 5, 'max_new_tokens': 200, 'deadline_ms': 10000}
             }
         with open(config_path, 'r') as f:
             return yaml.safe_load(f)
     
-    def _load_vector_store(self):
+    def _load_vector_store(self, load_embeddings: bool = True):
         """Load the FAISS vector store and embedding model."""
         try:
             logger.info(f"Loading vector store from {self.vector_store_path}...")
             
             # Initialize embeddings
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=self.embedding_model_name
-            )
+            if load_embeddings and self.embeddings is None:
+                self.embeddings = create_embeddings(self.embedding_model_name)
             
             # Load FAISS index
             self.vector_store = FAISS.load_local(
@@ -86,20 +203,100 @@ class RAGPipeline:
             logger.error(f"Failed to load vector store: {e}")
             raise
     
-    def retrieve_relevant_complaints(
-        self, 
-        query: str, 
-        k: int = None
-    ) -> List[Dict[str, Any]]:
+    def load_models(self):
+        """Load the embedding model if construction deferred it (`load_models=False`)."""
+        if self.embeddings is None:
+            logger.info(f"Loading embedding model {self.embedding_model_name}...")
+            self.embeddings = create_embeddings(self.embedding_model_name)
+            if self.segments is not None:
+                self.segments.set_embeddings(self.embeddings)
+            else:
+                self.vector_store.embedding_function = self.embeddings
+            if self.compressor is not None:
+                self.compressor.embeddings = self.embeddings
+    
+    @staticmethod
+    def _matches_filter(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
         """
-        Retrieve the most relevant complaint chunks for a given query.
+        True if every filter key equals the metadata value (or is in it, for
+        list values); `date_from` / `date_to` bound `date_received` inclusively.
+        """
+        for key, value in filter.items():
+            if key in (DATE_FROM, DATE_TO):
+                bounds = {key: value}
+                if not in_date_range(str(metadata.get(DATE_FIELD) or ""), bounds.get(DATE_FROM), bounds.get(DATE_TO)):
+                    return False
+            elif isinstance(value, (list, tuple, set)):
+                if metadata.get(key) not in value:
+                    return False
+            elif metadata.get(key) != value:
+                return False
+        return True
+    
+    def _search_by_vectors(
+        self,
+        query_vectors: List[List[float]],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        fetch_k: int = 20
+    ) -> List[RetrievalResult]:
+        """
+        Search the FAISS index for several query embeddings in one call.
+
+        Mirrors `FAISS.similarity_search_with_score_by_vector` (L2 distance,
+        optional normalization, metadata filtering over the top `fetch_k`
+        hits) but issues a single batched `index.search` for all queries and
+        leaves the docstore untouched unless a filter has to read metadata.
+        
+        Args:
+            query_vectors: Query embeddings
+            k: Number of documents per query
+            filter: Metadata values the returned documents must match
+            fetch_k: Candidates fetched per query before filtering
+            
+        Returns:
+            One RetrievalResult per query
+        """
+        if self.segments is not None:
+            with self.metrics.stage("faiss_search"):
+                return self.segments.search(query_vectors, k, filter=filter, fetch_k=fetch_k,
+                                            matches=self._matches_filter)
+        vectors = np.asarray(query_vectors, dtype=np.float32)
+        if getattr(self.vector_store, "_normalize_L2", False):
+            import faiss
+            faiss.normalize_L2(vectors)
+        with self.metrics.stage("faiss_search"):
+            scores, indices = self.vector_store.index.search(vectors, max(k, fetch_k) if filter else k)
+        
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            # -1 pads the row when the index holds fewer than k documents
+            found = row_indices != -1
+            hits = RetrievalResult(row_indices[found], row_scores[found], self.vector_store)
+            if filter:
+                with self.metrics.stage("docstore"):
+                    rows = [row for row in range(len(hits)) if self._matches_filter(hits.metadata(row), filter)]
+                hits = hits.take(rows[:k])
+            results.append(hits)
+        return results
+    
+    def retrieve(
+        self,
+        query: str,
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> RetrievalResult:
+        """
+        Low-level retrieval: vector ids and scores of the best chunks, with
+        text and metadata read from the docstore only for the rows used.
         
         Args:
             query: User's question
             k: Number of documents to retrieve (defaults to self.top_k)
+            filter: Optional metadata filter, e.g. {"product_category": "Credit Card"}
             
         Returns:
-            List of dictionaries containing document content and metadata
+            RetrievalResult (empty if retrieval failed)
         """
         if k is None:
             k = self.top_k
@@ -108,29 +305,95 @@ class RAGPipeline:
             logger.info(f"Retrieving top {k} documents for query: '{query[:50]}...'")
             
             # Perform similarity search
-            docs_with_scores = self.vector_store.similarity_search_with_score(
-                query, 
-                k=k
-            )
-            
-            # Format results
-            results = []
-            for doc, score in docs_with_scores:
-                result = {
-                    "content": doc.page_content,
-                    "metadata": doc.metadata,
-                    "similarity_score": float(score)
-                }
-                results.append(result)
+            with self.metrics.trace():
+                with self.metrics.stage("embed_query"):
+                    query_vector = self.embeddings.embed_query(query)
+                result = self._search_by_vectors([query_vector], k, filter=filter)[0]
             
-            logger.info(f"Retrieved {len(results)} documents.")
-            return results
+            logger.info(f"Retrieved {len(result)} documents.")
+            return result
             
         except Exception as e:
             logger.error(f"Retrieval failed: {e}")
+            return RetrievalResult.empty()
+    
+    def retrieve_many(
+        self,
+        queries: List[str],
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[RetrievalResult]:
+        """
+        Low-level batched retrieval: embeds all queries in one forward pass
+        and searches FAISS in one call.
+        
+        Args:
+            queries: User questions
+            k: Number of documents to retrieve per query (defaults to self.top_k)
+            filter: Optional metadata filter applied to every query
+            
+        Returns:
+            One RetrievalResult per query (empty ones if retrieval failed)
+        """
+        if k is None:
+            k = self.top_k
+        if not queries:
             return []
+            
+        try:
+            logger.info(f"Retrieving top {k} documents for a batch of {len(queries)} queries")
+            with self.metrics.trace():
+                with self.metrics.stage("embed_query"):
+                    query_vectors = self.embeddings.embed_documents(list(queries))
+                return self._search_by_vectors(query_vectors, k, filter=filter)
+        except Exception as e:
+            logger.error(f"Batch retrieval failed: {e}")
+            return [RetrievalResult.empty() for _ in queries]
     
-    def _format_context(self, retrieved_docs: List[Dict[str, Any]]) -> str:
+    def retrieve_relevant_complaints(
+        self, 
+        query: str, 
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve the most relevant complaint chunks for a given query.
+        
+        Dict view over `retrieve`.
+        
+        Args:
+            query: User's question
+            k: Number of documents to retrieve (defaults to self.top_k)
+            filter: Optional metadata filter, e.g. {"product_category": "Credit Card"}
+            
+        Returns:
+            List of dictionaries containing document content and metadata
+        """
+        return self.retrieve(query, k=k, filter=filter).to_dicts()
+    
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve relevant complaint chunks for several queries at once.
+
+        Dict view over `retrieve_many`.
+        
+        Args:
+            queries: User questions
+            k: Number of documents to retrieve per query (defaults to self.top_k)
+            filter: Optional metadata filter applied to every query
+            
+        Returns:
+            One result list per query, in the same format as
+            `retrieve_relevant_complaints`
+        """
+        return [result.to_dicts() for result in self.retrieve_many(queries, k=k, filter=filter)]
+    
+    def _format_context(self, retrieved_docs: Sequence[Dict[str, Any]]) -> str:
         """
         Format retrieved documents into a context string for the LLM.
         
@@ -145,6 +408,8 @@ class RAGPipeline:
         
         context_parts = []
         for i, doc in enumerate(retrieved_docs, 1):
+            # Compressed documents keep their original source number
+            i = doc.get("source_rank", i)
             content = doc["content"]
             # Simplified metadata for the model
             category = doc["metadata"].get('product_category', 'N/A')
@@ -155,6 +420,28 @@ class RAGPipeline:
         
         return "\n\n".join(context_parts)
     
+    def _compress_contexts(
+        self,
+        queries: List[str],
+        retrieved: List[Sequence[Dict[str, Any]]]
+    ) -> Tuple[List[Sequence[Dict[str, Any]]], List[Optional[Dict[str, Any]]]]:
+        """
+        Documents to format into each prompt, compressed when a compressor is configured.
+        
+        Returns:
+            Per query, the documents for the context and the compression
+            stats (None when compression is off or failed)
+        """
+        if self.compressor is None or not queries:
+            return retrieved, [None] * len(queries)
+        try:
+            with self.metrics.stage("compress_context"):
+                compressed = self.compressor.compress_batch(queries, retrieved)
+            return [docs for docs, _ in compressed], [stats for _, stats in compressed]
+        except Exception as e:
+            logger.warning(f"Context compression failed: {e}. Using the full retrieved chunks.")
+            return retrieved, [None] * len(queries)
+    
     def _create_prompt(self, query: str, context: str) -> str:
         """
         Create the prompt for the LLM.
@@ -173,7 +460,11 @@ If the answer is not in the excerpts, say "Information not available."
         self, 
         query: str, 
         use_huggingface: bool = True,
-        model_name: str = None
+        model_name: str = None,
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None,
+        return_context: bool = False
     ) -> Dict[str, Any]:
         """
         Generate an answer using the RAG pipeline.
@@ -182,90 +473,493 @@ If the answer is not in the excerpts, say "Information not available."
             query: User's question
             use_huggingface: Whether to use HuggingFace inference
             model_name: Name of the LLM to use (defaults to self.llm_model_name)
+            k: Number of documents to retrieve (defaults to self.top_k)
+            filter: Optional metadata filter for retrieval
+            deadline: `time.monotonic()` by which the answer is due
+                (defaults to now + `rag_params.deadline_ms`)
+            return_context: Also return every retrieved document ("retrieved")
+                and the excerpts the answer was produced from ("context"),
+                e.g. for evaluation
             
         Returns:
-            Dictionary containing answer and source documents
+            Dictionary containing answer, source documents and `served_by`
         """
         if model_name is None:
             model_name = self.llm_model_name
+        if deadline is None:
+            deadline = self.resolve_deadline()
+        with self.metrics.trace() as trace:
+            response = self._generate_answer(query, use_huggingface, model_name, k, filter, deadline, return_context)
+            if trace is not None:
+                response["timings"] = trace.as_dict()
+        return response
+    
+    def _generate_answer(
+        self,
+        query: str,
+        use_huggingface: bool,
+        model_name: str,
+        k: Optional[int],
+        filter: Optional[Dict[str, Any]],
+        deadline: Optional[float],
+        return_context: bool = False
+    ) -> Dict[str, Any]:
         try:
             # Step 1: Retrieve relevant documents
-            retrieved_docs = self.retrieve_relevant_complaints(query)
+            retrieved_docs = self.retrieve(query, k=k, filter=filter)
             
             if not retrieved_docs:
-                return {
-                    "answer": "I couldn't find any relevant complaint data to answer your question.",
-                    "sources": [],
-                    "query": query
-                }
+                return self._no_results_response(query)
             
-            # Step 2: Format context
-            context = self._format_context(retrieved_docs)
+            # Step 2: Compress and format context
+            context_docs, compression = retrieved_docs, None
+            if use_huggingface:
+                (context_docs,), (compression,) = self._compress_contexts([query], [retrieved_docs])
+            with self.metrics.stage("format_context"):
+                context = self._format_context(context_docs)
             
             # Step 3: Create prompt
-            prompt = self._create_prompt(query, context)
+            with self.metrics.stage("build_prompt"):
+                prompt = self._create_prompt(query, context)
             
-            # Step 4: Generate answer
-            if use_huggingface:
-                answer = self._generate_with_huggingface(prompt, model_name)
-            else:
+            # Step 4: Generate answer within the remaining budget
+            if not use_huggingface:
                 # Fallback: Use a simple extractive approach
-                answer = self._generate_extractive_answer(query, retrieved_docs)
+                answer, served_by = self._generate_extractive_answer(query, retrieved_docs), "extractive"
+            elif self._budget_exhausted(deadline):
+                logger.warning(f"Deadline reached before generation for query: '{query[:50]}...'")
+                answer, served_by = self._generate_extractive_answer(query, retrieved_docs), "extractive_deadline"
+            else:
+                try:
+                    answer = self._generate_with_huggingface(prompt, model_name, max_time=self._remaining(deadline))
+                    served_by = "generator_truncated" if self._remaining(deadline) == 0 else "generator"
+                except Exception as e:
+                    logger.warning(f"HuggingFace generation failed: {e}. Falling back to extractive method.")
+                    answer, served_by = self._generate_extractive_answer(query, retrieved_docs), "extractive_fallback"
             
             # Step 5: Return structured response
-            return {
-                "answer": answer,
-                "sources": retrieved_docs[:2],  # Return top 2 sources for display
-                "query": query,
-                "num_sources": len(retrieved_docs)
-            }
+            response = self._build_response(query, answer, retrieved_docs, served_by)
+            if compression is not None:
+                response["compression"] = compression
+            if return_context:
+                # The generator read the (compressed) prompt context; extractive answers the full chunks
+                used = context_docs if served_by.startswith("generator") else retrieved_docs
+                response["retrieved"] = retrieved_docs.to_dicts()
+                response["context"] = [doc["content"] for doc in used]
+            return response
             
         except Exception as e:
             logger.error(f"Answer generation failed: {e}")
-            return {
-                "answer": f"An error occurred while generating the answer: {str(e)}",
-                "sources": [],
-                "query": query
-            }
+            return self._error_response(query, e)
     
-    def _generate_with_huggingface(self, prompt: str, model_name: str) -> str:
+    def generate_answers(
+        self,
+        queries: List[str],
+        use_huggingface: bool = True,
+        model_name: str = None,
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Batched version of `generate_answer`.
+
+        Retrieval runs as one embedding pass and one FAISS search, and all
+        prompts go through the generator as a single batch.
+        
+        Args:
+            queries: User questions
+            use_huggingface: Whether to use HuggingFace inference
+            model_name: Name of the LLM to use (defaults to self.llm_model_name)
+            k: Number of documents to retrieve per query (defaults to self.top_k)
+            filter: Optional metadata filter applied to every query
+            deadline: `time.monotonic()` by which all answers are due
+                (defaults to now + `rag_params.deadline_ms`)
+            
+        Returns:
+            One response dictionary per query, in order
+        """
+        if model_name is None:
+            model_name = self.llm_model_name
+        if deadline is None:
+            deadline = self.resolve_deadline()
+        with self.metrics.trace() as trace:
+            responses = self._generate_answers(queries, use_huggingface, model_name, k, filter, deadline)
+            if trace is not None:
+                # Stages ran once for the whole batch; every response shares the batch timings
+                trace.count("batch_size", len(queries))
+                timings = trace.as_dict()
+                for response in responses:
+                    response["timings"] = dict(timings)
+        return responses
+    
+    def _generate_answers(
+        self,
+        queries: List[str],
+        use_huggingface: bool,
+        model_name: str,
+        k: Optional[int],
+        filter: Optional[Dict[str, Any]],
+        deadline: Optional[float]
+    ) -> List[Dict[str, Any]]:
+        try:
+            retrieved = self.retrieve_many(queries, k=k, filter=filter)
+            
+            responses = [None] * len(queries)
+            pending = []
+            for i, (query, retrieved_docs) in enumerate(zip(queries, retrieved)):
+                if not retrieved_docs:
+                    responses[i] = self._no_results_response(query)
+                else:
+                    pending.append(i)
+            
+            context_docs, compressions = [retrieved[i] for i in pending], [None] * len(pending)
+            if use_huggingface:
+                context_docs, compressions = self._compress_contexts([queries[i] for i in pending], context_docs)
+            with self.metrics.stage("format_context"):
+                contexts = [self._format_context(docs) for docs in context_docs]
+            with self.metrics.stage("build_prompt"):
+                prompts = [self._create_prompt(queries[i], context) for i, context in zip(pending, contexts)]
+            served_by = "generator"
+            if not use_huggingface:
+                served_by = "extractive"
+            elif pending and self._budget_exhausted(deadline):
+                logger.warning(f"Deadline reached before generation for a batch of {len(pending)} queries")
+                served_by = "extractive_deadline"
+            else:
+                try:
+                    answers = self._generate_batch_with_huggingface(prompts, model_name, max_time=self._remaining(deadline))
+                    if pending and self._remaining(deadline) == 0:
+                        served_by = "generator_truncated"
+                except Exception as e:
+                    logger.warning(f"HuggingFace batch generation failed: {e}. Falling back to extractive method.")
+                    served_by = "extractive_fallback"
+            if served_by.startswith("extractive"):
+                answers = [self._generate_extractive_answer(queries[i], retrieved[i]) for i in pending]
+            
+            for i, answer, compression in zip(pending, answers, compressions):
+                responses[i] = self._build_response(queries[i], answer, retrieved[i], served_by)
+                if compression is not None:
+                    responses[i]["compression"] = compression
+            return responses
+            
+        except Exception as e:
+            logger.error(f"Batch answer generation failed: {e}")
+            return [self._error_response(query, e) for query in queries]
+    
+    def resolve_deadline(self, deadline_ms: float = None) -> Optional[float]:
+        """
+        Absolute `time.monotonic()` deadline for a query starting now.
+        
+        Args:
+            deadline_ms: Budget for this query (defaults to `rag_params.deadline_ms`;
+                0 means no deadline)
+            
+        Returns:
+            Deadline, or None when the query is unbounded
+        """
+        budget_ms = self.deadline_ms if deadline_ms is None else deadline_ms
+        return time.monotonic() + budget_ms / 1000.0 if budget_ms else None
+    
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        """Seconds left before `deadline` (None when unbounded)."""
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.monotonic())
+    
+    def _budget_exhausted(self, deadline: Optional[float]) -> bool:
+        """True when too little time is left to start generating."""
+        remaining = self._remaining(deadline)
+        return remaining is not None and remaining * 1000 < self.min_generation_ms
+    
+    @staticmethod
+    def _build_response(
+        query: str,
+        answer: str,
+        retrieved_docs: Sequence[Dict[str, Any]],
+        served_by: str = "generator"
+    ) -> Dict[str, Any]:
+        return {
+            "answer": answer,
+            "sources": list(retrieved_docs[:2]),  # Return top 2 sources for display
+            "query": query,
+            "num_sources": len(retrieved_docs),
+            # generator | generator_truncated | extractive | extractive_deadline | extractive_fallback
+            "served_by": served_by
+        }
+    
+    @staticmethod
+    def _no_results_response(query: str) -> Dict[str, Any]:
+        return {
+            "answer": "I couldn't find any relevant complaint data to answer your question.",
+            "sources": [],
+            "query": query,
+            "served_by": "no_results"
+        }
+    
+    @staticmethod
+    def _error_response(query: str, error: Exception) -> Dict[str, Any]:
+        return {
+            "answer": f"An error occurred while generating the answer: {str(error)}",
+            "sources": [],
+            "query": query,
+            "served_by": "error"
+        }
+    
+    @staticmethod
+    def _aggregate_response(query: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "answer": format_answer(result),
+            "sources": [],
+            "query": query,
+            "num_sources": 0,
+            "served_by": "aggregate",
+            "aggregate": result
+        }
+    
+    def query_aggregate(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        group_by: Optional[List[str]] = None,
+        limit: Optional[int] = 10,
+        query: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Answer a structured counting question from the aggregate cube.
+        
+        Args:
+            filters: Dimension -> value(s), e.g. {"product_category": "Credit card", "year": 2023}
+            group_by: Dimensions to break the count down by, e.g. ["state"]
+            limit: Largest groups to return
+            query: Question echoed in the response
+            
+        Returns:
+            Response with the counts in "aggregate" and `served_by` "aggregate"
+        """
+        if self.cube is None:
+            raise RuntimeError("No aggregate cube loaded; build one with `python -m src.aggregate_cube`")
+        with self.metrics.trace() as trace:
+            with self.metrics.stage("aggregate"):
+                response = self._aggregate_response(query, self.cube.count(filters, group_by, limit))
+            if trace is not None:
+                response["timings"] = trace.as_dict()
+        return response
+    
+    def _answer_aggregate(self, question: str, filter: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Cube response if `question` is a counting/trend question the cube can answer, else None."""
+        if self.cube is None or (filter and any(key not in DIMENSIONS and key != YEAR for key in filter)):
+            return None
+        parsed = self.cube.parse_question(question)
+        if parsed is None:
+            return None
+        # A metadata filter narrows the question, e.g. {"product_category": ...}
+        filters = {**parsed["filters"], **(filter or {})}
+        return self.query_aggregate(filters, parsed["group_by"], query=question)
+    
+    def _get_generator(self, model_name: str):
+        """
+        Return the text2text generation pipeline for `model_name`.
+
+        The model is loaded once and reused; previously every query rebuilt the
+        pipeline. The lock keeps concurrent first requests from loading twice.
+        """
+        generator = self._generators.get(model_name)
+        if generator is not None:
+            self.metrics.count("generator_cache_hit")
+            return generator
+        with self._generator_lock:
+            if model_name not in self._generators:
+                from transformers import pipeline
+                
+                logger.info(f"Loading generation model {model_name}...")
+                self.metrics.count("generator_cache_miss")
+                with self.metrics.stage("model_load"):
+                    self._generators[model_name] = pipeline(
+                        "text2text-generation",
+                        model=model_name,
+                        max_length=512,
+                        device=-1  # CPU
+                    )
+            return self._generators[model_name]
+    
+    @staticmethod
+    def _generation_kwargs(max_new_tokens: int, max_time: Optional[float]) -> Dict[str, Any]:
+        kwargs = {"max_new_tokens": max_new_tokens, "do_sample": False}
+        if max_time is not None:
+            # transformers stops decoding once this many seconds have passed
+            kwargs["max_time"] = max_time
+        return kwargs
+    
+    def _generate_with_huggingface(self, prompt: str, model_name: str, max_time: Optional[float] = None) -> str:
         """
         Generate answer using HuggingFace inference.
         
         Args:
             prompt: Complete prompt
             model_name: HuggingFace model name
+            max_time: Seconds after which decoding stops (None for no limit)
             
         Returns:
             Generated answer
+            
+        Raises:
+            Exception: Model loading or generation errors; callers fall back
+                to the extractive answer over their retrieved documents
         """
-        try:
-            from transformers import pipeline
+        logger.info(f"Generating answer with {model_name}...")
+        
+        generator = self._get_generator(model_name)
+        
+        # Generate
+        with self.metrics.stage("generate"):
+            result = generator(prompt, **self._generation_kwargs(self.max_new_tokens, max_time))
+        answer = result[0]["generated_text"]
+        if self.metrics.active:
+            self._count_tokens(generator, [prompt], [answer])
+        
+        return answer.strip()
+    
+    def _count_tokens(self, generator, prompts: List[str], answers: List[str]):
+        """Record prompt (after truncation) and generated token counts in the current trace."""
+        tokenizer = getattr(generator, "tokenizer", None)
+        if tokenizer is None:
+            return
+        self.metrics.count("prompt_tokens", sum(
+            min(len(ids), 512) for ids in tokenizer(prompts)["input_ids"]))
+        self.metrics.count("generated_tokens", sum(
+            len(ids) for ids in tokenizer(answers, add_special_tokens=False)["input_ids"]))
+    
+    def _generate_batch_with_huggingface(
+        self,
+        prompts: List[str],
+        model_name: str,
+        max_time: Optional[float] = None
+    ) -> List[str]:
+        """
+        Generate answers for several prompts in one batched forward pass.
+        
+        Args:
+            prompts: Complete prompts
+            model_name: HuggingFace model name
+            max_time: Seconds after which decoding stops (None for no limit)
             
-            logger.info(f"Generating answer with {model_name}...")
+        Returns:
+            Generated answers, in prompt order
             
-            # Initialize the pipeline
-            generator = pipeline(
-                "text2text-generation",
-                model=model_name,
-                max_length=512,
-                device=-1  # CPU
+        Raises:
+            Exception: Model loading or generation errors
+        """
+        if not prompts:
+            return []
+        logger.info(f"Generating {len(prompts)} answers with {model_name}...")
+        
+        generator = self._get_generator(model_name)
+        with self.metrics.stage("generate"):
+            results = generator(
+                prompts,
+                batch_size=len(prompts),
+                **self._generation_kwargs(self.max_new_tokens, max_time)
             )
+        answers = [result[0]["generated_text"].strip() if isinstance(result, list)
+                   else result["generated_text"].strip() for result in results]
+        if self.metrics.active:
+            self._count_tokens(generator, prompts, answers)
+        return answers
+    
+    def _stream_with_huggingface(
+        self,
+        prompt: str,
+        model_name: str,
+        max_time: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Stream generated text pieces as the model decodes them.
+        
+        Args:
+            prompt: Complete prompt
+            model_name: HuggingFace model name
+            max_time: Seconds after which decoding stops (None for no limit)
             
-            # Generate
-            result = generator(prompt, max_new_tokens=200, do_sample=False)
-            answer = result[0]["generated_text"]
-            
-            return answer.strip()
+        Yields:
+            Successive text pieces of the answer
+        """
+        from transformers import TextIteratorStreamer
+        
+        generator = self._get_generator(model_name)
+        inputs = generator.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
+        streamer = TextIteratorStreamer(generator.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        worker = threading.Thread(
+            target=generator.model.generate,
+            kwargs={**inputs, "streamer": streamer, **self._generation_kwargs(self.max_new_tokens, max_time)},
+            daemon=True
+        )
+        worker.start()
+        for text in streamer:
+            if text:
+                yield text
+        worker.join()
+    
+    def stream_answer(
+        self,
+        query: str,
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None,
+        deadline_ms: float = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Answer a question incrementally.
+
+        Yields a `sources` event once retrieval is done, then one `token`
+        event per decoded text piece, then a `done` event carrying the same
+        response dictionary `query` would return.
+        
+        Args:
+            query: User's question
+            k: Number of documents to retrieve (defaults to self.top_k)
+            filter: Optional metadata filter for retrieval
+            deadline_ms: Time budget (defaults to `rag_params.deadline_ms`)
             
+        Yields:
+            Dictionaries with `event` and `data` keys
+        """
+        deadline = self.resolve_deadline(deadline_ms)
+        retrieved_docs = self.retrieve(query, k=k, filter=filter)
+        if not retrieved_docs:
+            yield {"event": "done", "data": self._no_results_response(query)}
+            return
+        yield {"event": "sources", "data": list(retrieved_docs[:2])}
+        
+        if self._budget_exhausted(deadline):
+            answer = self._generate_extractive_answer(query, retrieved_docs)
+            yield {"event": "token", "data": answer}
+            yield {"event": "done", "data": self._build_response(query, answer, retrieved_docs, "extractive_deadline")}
+            return
+        
+        (context_docs,), _ = self._compress_contexts([query], [retrieved_docs])
+        prompt = self._create_prompt(query, self._format_context(context_docs))
+        pieces = []
+        try:
+            for text in self._stream_with_huggingface(prompt, self.llm_model_name, max_time=self._remaining(deadline)):
+                pieces.append(text)
+                yield {"event": "token", "data": text}
+            answer = "".join(pieces).strip()
+            served_by = "generator_truncated" if self._remaining(deadline) == 0 else "generator"
         except Exception as e:
-            logger.warning(f"HuggingFace generation failed: {e}. Falling back to extractive method.")
-            return self._generate_extractive_answer(prompt.split("Question:")[-1].split("Answer:")[0].strip(), [])
+            if pieces:
+                logger.error(f"Streaming generation failed mid-answer: {e}")
+                yield {"event": "done", "data": self._error_response(query, e)}
+                return
+            logger.warning(f"Streaming generation failed: {e}. Falling back to extractive method.")
+            answer, served_by = self._generate_extractive_answer(query, retrieved_docs), "extractive_fallback"
+            yield {"event": "token", "data": answer}
+        
+        yield {"event": "done", "data": self._build_response(query, answer, retrieved_docs, served_by)}
     
     def _generate_extractive_answer(
         self, 
         query: str, 
-        retrieved_docs: List[Dict[str, Any]]
+        retrieved_docs: Sequence[Dict[str, Any]]
     ) -> str:
         """
         Generate a simple extractive answer by summarizing retrieved documents.
@@ -305,12 +999,27 @@ If the answer is not in the excerpts, say "Information not available."
         
         return " ".join(answer_parts)
     
-    def query(self, user_question: str) -> Dict[str, Any]:
+    def query(
+        self,
+        user_question: str,
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None,
+        profile: bool = False,
+        deadline_ms: float = None,
+        return_context: bool = False
+    ) -> Dict[str, Any]:
         """
         Main entry point for querying the RAG system.
         
         Args:
             user_question: User's question
+            k: Number of documents to retrieve (defaults to self.top_k)
+            filter: Optional metadata filter for retrieval
+            profile: Capture a cProfile/tracemalloc profile of this request
+                (requests are also sampled at `profiling.sample_rate`)
+            deadline_ms: Time budget for this query (defaults to
+                `rag_params.deadline_ms`; 0 disables the deadline)
+            return_context: Include "retrieved" and "context" (see `generate_answer`)
             
         Returns:
             Complete response with answer and sources
@@ -322,7 +1031,95 @@ If the answer is not in the excerpts, say "Information not available."
                 "sources": [],
                 "query": ""
             }
-        return self.generate_answer(user_question)
+        arrived_at, started = time.time(), time.perf_counter()
+        deadline = self.resolve_deadline(deadline_ms)
+        # Counting/trend questions are answered from the cube, without retrieval or the LLM
+        response = self._answer_aggregate(user_question, filter)
+        if response is None and self.profiler.should_profile(profile):
+            with self.profiler.profile(user_question) as record:
+                response = self.generate_answer(user_question, k=k, filter=filter, deadline=deadline,
+                                                return_context=return_context)
+                if record is not None:
+                    record["timings"] = response.get("timings")
+            if record is not None:
+                response["profile"] = record["path"]
+        elif response is None:
+            response = self.generate_answer(user_question, k=k, filter=filter, deadline=deadline,
+                                            return_context=return_context)
+        if self.workload is not None:
+            self.workload.record(user_question, arrived_at, time.perf_counter() - started, k=k, filter=filter,
+                                 deadline_ms=deadline_ms, served_by=response.get("served_by"))
+        return response
+    
+    def query_extractive(
+        self,
+        user_question: str,
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Degraded entry point for shed requests: retrieval plus the extractive
+        summary, never the generator.
+        
+        Args:
+            user_question: User's question
+            k: Number of documents to retrieve (defaults to self.top_k)
+            filter: Optional metadata filter for retrieval
+            
+        Returns:
+            Response with `served_by` set to "extractive_shed"
+        """
+        response = self.generate_answer(user_question, use_huggingface=False, k=k, filter=filter)
+        if response.get("served_by") == "extractive":
+            response["served_by"] = "extractive_shed"
+        return response
+    
+    def query_batch(
+        self,
+        user_questions: List[str],
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Batched entry point: answers several questions with batched embedding,
+        search and generation.
+        
+        Args:
+            user_questions: User questions
+            k: Number of documents to retrieve per question (defaults to self.top_k)
+            filter: Optional metadata filter applied to every question
+            deadline: `time.monotonic()` by which the answers are due; callers
+                that queued the questions pass the earliest arrival time plus
+                the budget (defaults to now + `rag_params.deadline_ms`)
+            
+        Returns:
+            One response per question, in order
+        """
+        responses = [None] * len(user_questions)
+        valid = []
+        arrived_at, started = time.time(), time.perf_counter()
+        for i, question in enumerate(user_questions):
+            if not question or not isinstance(question, str):
+                responses[i] = {
+                    "answer": "Please provide a valid question.",
+                    "sources": [],
+                    "query": ""
+                }
+            else:
+                responses[i] = self._answer_aggregate(question, filter)
+                if responses[i] is None:
+                    valid.append(i)
+        
+        answers = self.generate_answers([user_questions[i] for i in valid], k=k, filter=filter, deadline=deadline)
+        latency = time.perf_counter() - started
+        for i, response in zip(valid, answers):
+            responses[i] = response
+            if self.workload is not None:
+                # Each batched question was an individual request; all share the batch latency
+                self.workload.record(user_questions[i], arrived_at, latency, k=k, filter=filter,
+                                     served_by=response.get("served_by"))
+        return responses
 
 
 def main():
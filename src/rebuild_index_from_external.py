@@ -7,7 +7,8 @@ import pyarrow.parquet as pq
 from typing import List
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
-from langchain_huggingface import HuggingFaceEmbeddings
+
+from src.embeddings import create_embeddings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,10 +20,13 @@ def ingest_from_parquet(
     output_vector_store: str,
     text_column: str = "document",
     embedding_column: str = "element",
-    batch_size: int = 50000
+    batch_size: int = 50000,
+    embeddings=None
 ):
     """
     Ingests pre-computed embeddings and text from a parquet file into a FAISS index using memory-efficient batching.
+
+    `embeddings` (used only to embed queries later) overrides the model named by `embedding_model_name`.
     """
     if not os.path.exists(parquet_path):
         raise FileNotFoundError(f"Parquet file not found at {parquet_path}")
@@ -32,7 +36,7 @@ def ingest_from_parquet(
     
     logger.info(f"Schema columns: {pf.schema.names}")
     
-    embeddings_wrapper = HuggingFaceEmbeddings(model_name=embedding_model_name)
+    embeddings_wrapper = embeddings if embeddings is not None else create_embeddings(embedding_model_name)
     vector_store = None
     total_processed = 0
 
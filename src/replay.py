@@ -0,0 +1,227 @@
+"""
+Workload Replay Load Test
+
+Replays a workload captured by `workload_capture` (see src/workload.py)
+against an in-process RAGPipeline or a running app.py (`--url`), open-loop:
+requests are sent on schedule whether or not earlier ones have finished, and
+latency is measured from the scheduled send time, so a slow server shows up
+as latency instead of as a lower request rate.
+
+Modes:
+- original: recorded inter-arrival times
+- scaled:   recorded inter-arrival times divided by `--speed` (2.0 = twice the load)
+- open:     Poisson arrivals at `--rate` requests/sec, queries in recorded order
+
+Reports throughput, latency percentiles and histogram, error and shed rates,
+`served_by` counts and a per-stage breakdown from the responses' timings.
+
+Usage:
+    python -m src.replay workloads/capture.jsonl --mode scaled --speed 4
+    python -m src.replay workloads/capture.jsonl --mode open --rate 5 --url http://localhost:7860
+"""
+
+import time
+import json
+import logging
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from src.load_test import summarize_latencies
+from src.instrumentation import Histogram, DEFAULT_BUCKETS
+from src.workload import read_workload
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def schedule(entries: List[Dict[str, Any]], mode: str = "original", speed: float = 1.0,
+             rate: float = 1.0, seed: int = 42) -> np.ndarray:
+    """
+    Send offsets (seconds from the start of the replay) for each entry.
+
+    Args:
+        entries: Captured entries, in arrival order
+        mode: "original", "scaled" or "open"
+        speed: Time compression for "scaled"
+        rate: Mean requests/sec for "open"
+        seed: Seed for the Poisson arrivals
+    """
+    if not entries:
+        return np.array([])
+    if mode == "open":
+        gaps = np.random.default_rng(seed).exponential(1.0 / rate, size=len(entries))
+        return np.concatenate([[0.0], np.cumsum(gaps[1:])])
+    arrivals = np.array([entry["t"] for entry in entries], dtype=np.float64)
+    offsets = arrivals - arrivals[0]
+    if mode == "scaled":
+        return offsets / speed
+    if mode == "original":
+        return offsets
+    raise ValueError(f"Unknown replay mode: {mode}")
+
+
+def pipeline_target(pipeline) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Send entries to `pipeline.query` in this process."""
+    def send(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return pipeline.query(entry["q"], k=entry.get("k"), filter=entry.get("f"), deadline_ms=entry.get("d"))
+    return send
+
+
+def http_target(url: str, timeout: float = 120.0) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """POST entries to `<url>/api/v1/query` of a running app.py."""
+    endpoint = url.rstrip("/") + "/api/v1/query"
+
+    def send(entry: Dict[str, Any]) -> Dict[str, Any]:
+        body = {"question": entry["q"], "k": entry.get("k"), "filter": entry.get("f"), "deadline_ms": entry.get("d")}
+        request = urllib.request.Request(
+            endpoint,
+            data=json.dumps({key: value for key, value in body.items() if value is not None}).encode("utf-8"),
+            headers={"Content-Type": "application/json", "X-Client-Id": "replay"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise HTTPStatusError(e.code) from e
+    return send
+
+
+def replay(entries: List[Dict[str, Any]], offsets: np.ndarray, send: Callable[[Dict[str, Any]], Dict[str, Any]],
+           max_in_flight: int = 64) -> Dict[str, Any]:
+    """
+    Send each entry at its offset and collect the results.
+
+    Args:
+        entries: Captured entries
+        offsets: Send time of each entry, from `schedule`
+        send: Target from `pipeline_target` or `http_target`
+        max_in_flight: Worker threads; requests beyond this wait client-side,
+            which still counts towards their latency
+
+    Returns:
+        Summary with latency percentiles, histogram, errors and stage breakdown
+    """
+    latencies, errors, served_by, stages = [], Counter(), Counter(), {}
+    lock = threading.Lock()
+
+    def run(entry: Dict[str, Any], scheduled: float):
+        try:
+            response = send(entry)
+        except HTTPStatusError as e:
+            with lock:
+                errors["shed" if e.status in (429, 503) else f"http_{e.status}"] += 1
+            return
+        except Exception as e:
+            logger.warning(f"Request failed: {e}")
+            with lock:
+                errors[type(e).__name__] += 1
+            return
+        latency = time.perf_counter() - scheduled
+        with lock:
+            latencies.append(latency)
+            served_by[response.get("served_by", "unknown")] += 1
+            for name, value in (response.get("timings") or {}).items():
+                if name.endswith("_ms"):
+                    stages.setdefault(name[:-3], []).append(value)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="replay") as executor:
+        started = time.perf_counter()
+        for entry, offset in zip(entries, offsets):
+            scheduled = started + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run, entry, scheduled)
+    elapsed = time.perf_counter() - started
+
+    histogram = Histogram(DEFAULT_BUCKETS)
+    for latency in latencies:
+        histogram.observe(latency)
+    summary = summarize_latencies(latencies, elapsed, sum(errors.values()))
+    summary.update({
+        "offered_qps": len(entries) / offsets[-1] if len(entries) > 1 and offsets[-1] > 0 else None,
+        "error_rate": sum(errors.values()) / len(entries) if entries else 0.0,
+        "errors_by_type": dict(errors),
+        "served_by": dict(served_by),
+        "histogram": {("+Inf" if bound == float("inf") else str(bound)): count
+                      for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts)},
+        "stages_ms": {name: {"mean": float(np.mean(values)), "p95": float(np.percentile(values, 95))}
+                      for name, values in sorted(stages.items())}
+    })
+    return summary
+
+
+def print_report(summary: Dict[str, Any]):
+    print("\n=== Workload Replay ===")
+    offered = summary["offered_qps"]
+    print(f"requests {summary['requests']}  offered {offered:.2f} qps" if offered else f"requests {summary['requests']}")
+    print(f"throughput {summary['throughput_qps']:.2f} qps  errors {summary['errors']} "
+          f"({summary['error_rate']:.1%}) {summary['errors_by_type']}")
+    print(f"latency p50 {summary['p50_ms']:.1f} ms  p95 {summary['p95_ms']:.1f} ms  "
+          f"p99 {summary['p99_ms']:.1f} ms  mean {summary['mean_ms']:.1f} ms")
+    print(f"served_by {summary['served_by']}")
+
+    print("\nLatency histogram (seconds)")
+    peak = max(summary["histogram"].values()) or 1
+    for bound, count in summary["histogram"].items():
+        print(f"  <= {bound:>7} {count:>7} {'#' * int(40 * count / peak)}")
+
+    if summary["stages_ms"]:
+        print("\nStage breakdown (ms)")
+        for name, values in summary["stages_ms"].items():
+            print(f"  {name:<16} mean {values['mean']:>9.1f}  p95 {values['p95']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a captured query workload against the RAG pipeline.")
+    parser.add_argument("workload", help="Capture file written by workload_capture")
+    parser.add_argument("--mode", choices=["original", "scaled", "open"], default="original", help="Arrival pattern")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression for --mode scaled")
+    parser.add_argument("--rate", type=float, default=1.0, help="Requests/sec for --mode open")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N entries")
+    parser.add_argument("--url", default=None, help="Base URL of a running app.py (default: in-process pipeline)")
+    parser.add_argument("--max_in_flight", type=int, default=64, help="Concurrent requests in flight")
+    parser.add_argument("--output", default=None, help="Optional JSON file for the summary")
+    args = parser.parse_args()
+
+    entries = sorted(read_workload(args.workload), key=lambda entry: entry["t"])[:args.limit]
+    if not entries:
+        parser.error(f"No entries in {args.workload}")
+    offsets = schedule(entries, args.mode, speed=args.speed, rate=args.rate)
+
+    if args.url:
+        send = http_target(args.url)
+    else:
+        from src.rag_pipeline import RAGPipeline
+
+        pipeline = RAGPipeline()
+        # Don't capture the replay into the workload being replayed
+        pipeline.workload = None
+        # Load the generator before timing anything
+        pipeline.query(entries[0]["q"])
+        send = pipeline_target(pipeline)
+
+    logger.info(f"Replaying {len(entries)} requests over {offsets[-1]:.1f}s ({args.mode})")
+    summary = replay(entries, offsets, send, max_in_flight=args.max_in_flight)
+    print_report(summary)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Columnar Retrieval Results
+
+`RetrievalResult` holds one query's hits as NumPy arrays of FAISS vector ids
+and scores. Text and metadata stay in the vector store's docstore until a
+row is actually read, so large-k retrieval, reranking and batch jobs do not
+build per-hit Python objects they never look at. Indexing a row gives the
+familiar result dict ({"content", "metadata", "similarity_score"}), which is
+what `RAGPipeline.retrieve_relevant_complaints` returns for every row.
+Hits merged from several index segments (src/segmented_index.py) also carry
+the segment of each row; iterating or `to_dicts` then resolves the rows one
+segment at a time, so each segment's docstore is looked up once per result.
+"""
+
+from collections.abc import Sequence
+from typing import Any, Dict, List, Union
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+class RetrievalResult(Sequence):
+    """
+    Top hits of one query: `ids` and `scores` arrays plus lazy row access.
+
+    Rows are resolved against the vector store when accessed, so read them
+    before the store is modified (e.g. by `apply_delta_to_vector_store`).
+    """
+
+    __slots__ = ("ids", "scores", "segments", "_vector_store")
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray, vector_store=None, segments: np.ndarray = None):
+        """
+        Args:
+            ids: FAISS vector ids (positions in the index), best first
+            scores: Score of each hit (L2 distance; lower is closer)
+            vector_store: LangChain FAISS store whose docstore holds the rows,
+                or a list of stores when `segments` is given
+            segments: Position in `vector_store` of each row's store
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.segments = None if segments is None else np.asarray(segments, dtype=np.int32)
+        self._vector_store = vector_store
+
+    @classmethod
+    def empty(cls) -> "RetrievalResult":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        return f"RetrievalResult(ids={self.ids.tolist()}, scores={self.scores.tolist()})"
+
+    def _store(self, row: int):
+        if self.segments is None:
+            return self._vector_store
+        return self._vector_store[self.segments[row]]
+
+    def docstore_id(self, row: int) -> str:
+        return self._store(row).index_to_docstore_id[int(self.ids[row])]
+
+    def document(self, row: int) -> Document:
+        """The stored Document of one row (no copy)."""
+        return self._store(row).docstore.search(self.docstore_id(row))
+
+    def content(self, row: int) -> str:
+        return self.document(row).page_content
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        return self.document(row).metadata
+
+    def take(self, rows) -> "RetrievalResult":
+        """Subset or reorder rows (e.g. after reranking) without materializing any."""
+        return self[np.asarray(rows, dtype=np.int64)]
+
+    def __getitem__(self, row: Union[int, slice, np.ndarray]) -> Union[Dict[str, Any], "RetrievalResult"]:
+        if isinstance(row, (slice, np.ndarray)):
+            segments = None if self.segments is None else self.segments[row]
+            return RetrievalResult(self.ids[row], self.scores[row], self._vector_store, segments)
+        if not -len(self) <= row < len(self):
+            raise IndexError("RetrievalResult index out of range")
+        return self._as_dict(self.document(row), row)
+
+    def _as_dict(self, doc: Document, row: int) -> Dict[str, Any]:
+        return {
+            "content": doc.page_content,
+            "metadata": doc.metadata,
+            "similarity_score": float(self.scores[row])
+        }
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Materialize every row as a result dict."""
+        if self.segments is None:
+            return [self[row] for row in range(len(self))]
+        # Group rows by segment: a cold segment's docstore is fetched once even
+        # if loading another segment's evicts it from the cache
+        rows = [None] * len(self)
+        for segment in np.unique(self.segments):
+            store = self._vector_store[segment]
+            index_to_docstore_id, docstore = store.index_to_docstore_id, store.docstore
+            for row in np.flatnonzero(self.segments == segment):
+                rows[row] = self._as_dict(docstore.search(index_to_docstore_id[int(self.ids[row])]), row)
+        return rows
@@ -6,7 +6,7 @@ import pandas as pd
 sys.path.append(os.path.join(os.getcwd(), 'src'))
 
 from preprocessing import process_dataset
-from eda_utils import perform_eda
+from eda_utils import perform_streaming_eda
 
 def main():
     raw_path = 'data/raw/complaints_sample.csv'
@@ -16,17 +16,16 @@ def main():
         os.makedirs('data/processed')
     
     print("--- Starting EDA on Raw Data ---")
-    df_raw = pd.read_csv(raw_path)
     # Redirect output dir for images
     if not os.path.exists('docs/images'):
         os.makedirs('docs/images')
     
-    # Run EDA
-    perform_eda(df_raw, output_dir='docs/images')
+    # Run EDA in one chunked pass instead of loading the raw export into memory
+    eda_stats = perform_streaming_eda(raw_path, output_dir='docs/images', workers=os.cpu_count() or 1)
     
     print("\n--- Processing Dataset ---")
     processed_count = process_dataset(raw_path, processed_path)
-    print(f"Original size: {len(df_raw)}")
+    print(f"Original size: {eda_stats.total}")
     print(f"Filtered size: {processed_count}")
     
     print("\n--- Sample of Processed Data ---")
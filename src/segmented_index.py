@@ -0,0 +1,644 @@
+"""
+Time-Partitioned Index Segments
+
+The single FAISS index treats 2012 and last week identically and must be
+resident in full. `SegmentedIndex` keeps one FAISS store per
+`date_received` period (year, quarter or month) under one directory with a
+`manifest.json`:
+- hot segments (those ending within `hot_window_days` of the newest data)
+  are loaded into RAM up front;
+- cold segments are opened on first use with their index memory-mapped
+  (pages are read, and can be dropped, by the OS); their docstores, the
+  bulk of a segment's RAM, are loaded only when a row is read or filtered
+  and at most `max_cold_loaded` of them stay loaded (least recently used
+  first out).
+
+A query with `date_from` / `date_to` (filter keys, ISO dates or prefixes
+such as "2023" or "2023-06") searches only the overlapping segments, so
+memory and latency follow the window queried rather than the history kept.
+Per-segment hits are merged into one `RetrievalResult`. `compact` merges
+old segments into larger ones (e.g. months into years).
+
+Compaction may run in another process (the CLI) while a server is reading
+the index. It writes the merged segments to new directories and bumps the
+manifest's `generation`; a reader notices the new generation from `select`
+within `reload_interval` seconds and switches over. The replaced directories
+are only marked retired and are deleted by a later `compact` once they are
+`retain_seconds` old, so queries (and lazy results) still reading them keep
+working in the meantime.
+
+Usage:
+    python -m src.segmented_index split --vector_store vector_store --output vector_store_segments --period year
+    python -m src.segmented_index compact --index vector_store_segments --before 2020-01-01 --period year
+    python -m src.segmented_index stats --index vector_store_segments
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.retrieval_result import RetrievalResult
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+DATE_FIELD = "date_received"
+# Filter keys bounding date_received (inclusive); handled by segment pruning
+DATE_FROM, DATE_TO = "date_from", "date_to"
+PERIODS = ("year", "quarter", "month")
+
+
+def period_label(date_received: str, period: str = "year") -> str:
+    """Segment label of a 'YYYY-MM-DD' date ("undated" when missing)."""
+    if not date_received or len(date_received) < 7 or not date_received[:4].isdigit():
+        return "undated"
+    if period == "year":
+        return date_received[:4]
+    if period == "quarter":
+        return f"{date_received[:4]}-Q{(int(date_received[5:7]) - 1) // 3 + 1}"
+    return date_received[:7]
+
+
+def in_date_range(date_received: str, date_from: Optional[str], date_to: Optional[str]) -> bool:
+    """Inclusive range check; bounds may be prefixes ("2023", "2023-06")."""
+    if not date_received:
+        return date_from is None and date_to is None
+    if date_from and date_received[:len(date_from)] < date_from:
+        return False
+    if date_to and date_received[:len(date_to)] > date_to:
+        return False
+    return True
+
+
+class Segment:
+    """One period's FAISS store and its date bounds."""
+
+    def __init__(self, name: str, start: str, end: str, count: int):
+        """
+        Args:
+            name: Directory name under `<root>/segments`
+            start: Earliest date_received in the segment ("" if undated)
+            end: Latest date_received in the segment ("" if undated)
+            count: Number of vectors
+        """
+        self.name = name
+        self.start = start
+        self.end = end
+        self.count = count
+        self.hot = False
+        self.store: Optional[_SegmentStore] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "start": self.start, "end": self.end, "count": self.count}
+
+    def overlaps(self, date_from: Optional[str], date_to: Optional[str]) -> bool:
+        if not self.start:
+            return date_from is None and date_to is None
+        if date_from and self.end[:len(date_from)] < date_from:
+            return False
+        if date_to and self.start[:len(date_to)] > date_to:
+            return False
+        return True
+
+    def within(self, date_from: Optional[str], date_to: Optional[str]) -> bool:
+        """True if every date in the segment is inside the range (no per-row check needed)."""
+        return in_date_range(self.start, date_from, date_to) and in_date_range(self.end, date_from, date_to)
+
+
+def _read_settings(path: str) -> Dict[str, Any]:
+    settings = {}
+    settings_path = os.path.join(path, "settings.json")
+    if os.path.exists(settings_path):
+        with open(settings_path) as f:
+            settings = json.load(f)
+    return {
+        "normalize_L2": settings.get("normalize_L2", False),
+        "distance_strategy": DistanceStrategy(
+            settings.get("distance_strategy", DistanceStrategy.EUCLIDEAN_DISTANCE.value))
+    }
+
+
+def _load_store(path: str, embeddings) -> FAISS:
+    """FAISS.load_local without the deserialization opt-in (segments are written by this module)."""
+    index = faiss.read_index(os.path.join(path, "index.faiss"))
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id, **_read_settings(path))
+
+
+class _SegmentStore:
+    """
+    A segment's FAISS index, with its docstore loaded on first access.
+
+    Exposes the attributes of the LangChain FAISS store that `search` and
+    `RetrievalResult` read (`index`, `docstore`, `index_to_docstore_id`,
+    `_normalize_L2`, `distance_strategy`).
+    """
+
+    def __init__(self, path: str, mmap: bool = False, on_load: Optional[Callable[["_SegmentStore"], None]] = None):
+        """
+        Args:
+            path: Segment directory
+            mmap: Memory-map the index instead of reading it into RAM
+            on_load: Called after the docstore is loaded (for LRU accounting)
+        """
+        self.path = path
+        self.index = faiss.read_index(os.path.join(path, "index.faiss"), faiss.IO_FLAG_MMAP if mmap else 0)
+        settings = _read_settings(path)
+        self._normalize_L2 = settings["normalize_L2"]
+        self.distance_strategy = settings["distance_strategy"]
+        self._on_load = on_load
+        self._payload = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._payload is not None
+
+    def load(self):
+        """Load the docstore (if needed) and return `(docstore, index_to_docstore_id)`."""
+        payload = self._payload
+        if payload is not None:
+            return payload
+        # Concurrent queries wait for one unpickling instead of each doing their own
+        with self._load_lock:
+            payload = self._payload
+            if payload is not None:
+                return payload
+            with open(os.path.join(self.path, "index.pkl"), "rb") as f:
+                payload = pickle.load(f)
+            self._payload = payload
+        if self._on_load is not None:
+            self._on_load(self)
+        return payload
+
+    @property
+    def docstore(self):
+        return self.load()[0]
+
+    @property
+    def index_to_docstore_id(self) -> Dict[int, str]:
+        return self.load()[1]
+
+    def release(self):
+        """Drop the docstore; it is reloaded if a row is read again."""
+        self._payload = None
+
+
+def _save_store(store: FAISS, path: str):
+    store.save_local(path)
+    with open(os.path.join(path, "settings.json"), "w") as f:
+        json.dump({"normalize_L2": store._normalize_L2, "distance_strategy": store.distance_strategy.value}, f)
+
+
+def _segment_dir_name(start: str, end: str) -> str:
+    return f"{start}_{end}" if start else "undated"
+
+
+class SegmentedIndex:
+    """
+    Date-partitioned FAISS stores with a hot in-RAM tier and a cold on-demand tier.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        embeddings=None,
+        hot_window_days: int = 365,
+        max_cold_loaded: int = 4,
+        mmap_cold: bool = True,
+        reload_interval: float = 1.0
+    ):
+        """
+        Args:
+            root: Directory written by `build_segments` / `split_vector_store`
+            embeddings: Embedder attached to stores rebuilt by `compact`
+            hot_window_days: Segments ending within this many days of the
+                newest segment are kept in RAM
+            max_cold_loaded: Cold segment docstores kept loaded at once
+            mmap_cold: Memory-map cold indexes instead of reading them into RAM
+            reload_interval: Seconds between checks of the manifest for a
+                compaction done by another process
+        """
+        self.root = root
+        self.embeddings = embeddings
+        self.hot_window_days = hot_window_days
+        self.max_cold_loaded = max_cold_loaded
+        self.mmap_cold = mmap_cold
+        self.reload_interval = reload_interval
+        self._cold = OrderedDict()
+        self._lock = threading.Lock()
+
+        manifest, self._manifest_version = self._read_manifest()
+        self.period = manifest.get("period", "year")
+        self.generation = manifest.get("generation", 0)
+        self._retired = manifest.get("retired", [])
+        self.segments = [Segment(**entry) for entry in manifest["segments"]]
+        self._next_check = time.monotonic() + reload_interval
+        self._assign_tiers()
+        self._load_hot()
+        logger.info(
+            f"Segmented index: {len(self.segments)} segments, "
+            f"{sum(s.count for s in self.segments if s.hot):,} of {self.ntotal:,} vectors hot"
+        )
+
+    @property
+    def ntotal(self) -> int:
+        return sum(segment.count for segment in self.segments)
+
+    def _path(self, segment: Segment) -> str:
+        return os.path.join(self.root, "segments", segment.name)
+
+    def _read_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        stat = os.stat(path)
+        with open(path) as f:
+            return json.load(f), (stat.st_ino, stat.st_mtime_ns)
+
+    def refresh(self) -> bool:
+        """
+        Switch to the segments of a newer manifest generation, e.g. after a
+        `compact` run by another process. Segments present in both keep their
+        opened stores.
+
+        Returns:
+            True if the segment list changed
+        """
+        try:
+            # write_manifest replaces the file, so the inode changes even where mtimes are coarse
+            stat = os.stat(os.path.join(self.root, MANIFEST))
+            if (stat.st_ino, stat.st_mtime_ns) == self._manifest_version:
+                return False
+            manifest, version = self._read_manifest()
+        except (OSError, ValueError) as e:
+            # Mid-replace or unreadable: keep serving the current generation
+            logger.warning(f"Could not re-read {MANIFEST}: {e}")
+            return False
+        with self._lock:
+            self._manifest_version = version
+            self._retired = manifest.get("retired", [])
+            if manifest.get("generation", 0) == self.generation:
+                return False
+            current = {segment.name: segment for segment in self.segments}
+            segments = [current.get(entry["name"]) or Segment(**entry) for entry in manifest["segments"]]
+            for name in current.keys() - {segment.name for segment in segments}:
+                self._cold.pop(self._path(current[name]), None)
+            self.generation = manifest.get("generation", 0)
+            self.segments = segments
+        self._assign_tiers()
+        self._load_hot()
+        logger.info(f"Switched to manifest generation {self.generation} ({len(self.segments)} segments)")
+        return True
+
+    def _assign_tiers(self):
+        newest = max((s.end for s in self.segments if s.end), default="")
+        if not newest:
+            return
+        cutoff = (date.fromisoformat(newest[:10]) - timedelta(days=self.hot_window_days)).isoformat()
+        for segment in self.segments:
+            segment.hot = bool(segment.end) and segment.end >= cutoff
+
+    def _load_hot(self):
+        for segment in self.segments:
+            if segment.hot and segment.store is None:
+                segment.store = _SegmentStore(self._path(segment))
+                segment.store.load()
+
+    def set_embeddings(self, embeddings):
+        """Attach the embedder (e.g. after a deferred model load)."""
+        self.embeddings = embeddings
+
+    def _loaded(self, store: _SegmentStore):
+        """Track a cold docstore just loaded, releasing the least recently used beyond the cap."""
+        with self._lock:
+            self._cold[store.path] = store
+            self._cold.move_to_end(store.path)
+            while len(self._cold) > self.max_cold_loaded:
+                self._cold.popitem(last=False)[1].release()
+
+    def _open(self, segment: Segment) -> _SegmentStore:
+        """The segment's store; a cold index is opened once and stays mapped."""
+        with self._lock:
+            if segment.store is None:
+                logger.debug(f"Opening cold segment {segment.name} ({segment.count:,} vectors)")
+                segment.store = _SegmentStore(self._path(segment), mmap=self.mmap_cold, on_load=self._loaded)
+            elif segment.store.path in self._cold:
+                self._cold.move_to_end(segment.store.path)
+            return segment.store
+
+    def select(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Segment]:
+        """Segments overlapping the date range."""
+        if time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.reload_interval
+            self.refresh()
+        return [s for s in self.segments if s.count and s.overlaps(date_from, date_to)]
+
+    def search(
+        self,
+        query_vectors,
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        fetch_k: int = 20,
+        matches=None
+    ) -> List[RetrievalResult]:
+        """
+        Search the segments overlapping the filter's date range and merge the hits.
+
+        Args:
+            query_vectors: Query embeddings
+            k: Number of documents per query
+            filter: Metadata filter; `date_from` / `date_to` bound date_received
+            fetch_k: Candidates fetched per segment and query when rows must be filtered
+            matches: Predicate `(metadata, filter)` for the other filter keys
+                (defaults to equality on every key)
+
+        Returns:
+            One RetrievalResult per query, best first across segments
+        """
+        if matches is None:
+            matches = _matches_all
+        filter = dict(filter or {})
+        date_from, date_to = filter.pop(DATE_FROM, None), filter.pop(DATE_TO, None)
+        vectors = np.asarray(query_vectors, dtype=np.float32)
+        stores, ids, scores, origins = [], [], [], []
+        for segment in self.select(date_from, date_to):
+            store = self._open(segment)
+            segment_vectors = vectors
+            if store._normalize_L2:
+                segment_vectors = vectors.copy()
+                faiss.normalize_L2(segment_vectors)
+            check_dates = not segment.within(date_from, date_to)
+            check_rows = bool(filter) or check_dates
+            n = min(max(k, fetch_k) if check_rows else k, store.index.ntotal)
+            row_scores, row_ids = store.index.search(segment_vectors, n)
+            if check_rows:
+                docstore, index_to_docstore_id = store.docstore, store.index_to_docstore_id
+                keep = np.zeros(row_ids.shape, dtype=bool)
+                for q, query_ids in enumerate(row_ids):
+                    found = 0
+                    for j, i in enumerate(query_ids):
+                        if found == k:
+                            break
+                        if i == -1:
+                            continue
+                        metadata = docstore.search(index_to_docstore_id[i]).metadata
+                        if check_dates and not in_date_range(str(metadata.get(DATE_FIELD) or ""), date_from, date_to):
+                            continue
+                        if filter and not matches(metadata, filter):
+                            continue
+                        keep[q, j] = True
+                        found += 1
+                row_ids = np.where(keep, row_ids, -1)
+            stores.append(store)
+            ids.append(row_ids)
+            scores.append(row_scores)
+            origins.append(np.full(row_ids.shape, len(stores) - 1, dtype=np.int32))
+
+        if not stores:
+            return [RetrievalResult.empty() for _ in range(len(vectors))]
+        ids, scores, origins = np.hstack(ids), np.hstack(scores), np.hstack(origins)
+        higher_is_better = stores[0].distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT
+        results = []
+        for q in range(len(vectors)):
+            valid = np.flatnonzero(ids[q] != -1)
+            order = np.argsort(-scores[q, valid] if higher_is_better else scores[q, valid], kind="stable")[:k]
+            rows = valid[order]
+            results.append(RetrievalResult(ids[q, rows], scores[q, rows], stores, origins[q, rows]))
+        return results
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Tier and residency (index opened, docstore loaded) of every segment."""
+        return [
+            {**segment.to_dict(), "tier": "hot" if segment.hot else "cold",
+             "opened": segment.store is not None,
+             "loaded": segment.store is not None and segment.store.loaded}
+            for segment in self.segments
+        ]
+
+    def compact(self, before: str, period: str = "year", retain_seconds: float = 3600.0) -> int:
+        """
+        Merge segments that end before `before` into one segment per `period`.
+
+        The merged segments go to new directories under a new manifest
+        generation. The replaced directories are retired, not deleted: they
+        are removed by the first `compact` run at least `retain_seconds`
+        after they were retired, which gives readers in other processes time
+        to switch (see `refresh`). Pass 0 only when nothing else is serving
+        the index.
+
+        Args:
+            before: ISO date; only segments ending earlier are merged
+            period: Period of the merged segments ("year", "quarter", "month")
+            retain_seconds: How long retired segment directories are kept
+
+        Returns:
+            Number of merged segments written
+        """
+        self.refresh()
+        groups = {}
+        for segment in self.segments:
+            if segment.start and segment.end < before:
+                groups.setdefault(period_label(segment.start, period), []).append(segment)
+        groups = {label: members for label, members in groups.items() if len(members) > 1}
+        if not groups:
+            self._purge_retired(retain_seconds)
+            return 0
+
+        generation = self.generation + 1
+        replaced, merged_segments = set(), []
+        for label, members in sorted(groups.items()):
+            members.sort(key=lambda s: s.start)
+            # Read fully into RAM: merging appends to the first index
+            merged = _load_store(self._path(members[0]), self.embeddings)
+            for member in members[1:]:
+                merged.merge_from(_load_store(self._path(member), self.embeddings))
+            name = _segment_dir_name(members[0].start, members[-1].end)
+            if os.path.exists(os.path.join(self.root, "segments", name)):
+                # Never overwrite a directory a reader may still have open
+                name = f"{name}-g{generation}"
+            segment = Segment(name, members[0].start, members[-1].end, sum(m.count for m in members))
+            _save_store(merged, self._path(segment))
+            merged_segments.append(segment)
+            replaced.update(m.name for m in members)
+            logger.info(f"Compacted {len(members)} segments into {segment.name} ({segment.count:,} vectors)")
+
+        kept = [s for s in self.segments if s.name not in replaced]
+        retired = self._retired + [{"name": name, "retired_at": time.time()} for name in sorted(replaced)]
+        write_manifest(self.root, self.period, kept + merged_segments, generation, retired)
+        with self._lock:
+            for name in replaced:
+                self._cold.pop(os.path.join(self.root, "segments", name), None)
+            self.generation, self._retired = generation, retired
+            self.segments = sorted(kept + merged_segments, key=lambda s: (s.start or "~"))
+            self._manifest_version = self._read_manifest()[1]
+        self._assign_tiers()
+        self._load_hot()
+        self._purge_retired(retain_seconds)
+        return len(merged_segments)
+
+    def _purge_retired(self, retain_seconds: float):
+        """Delete retired segment directories older than `retain_seconds`."""
+        cutoff = time.time() - retain_seconds
+        expired = [entry for entry in self._retired if entry["retired_at"] <= cutoff]
+        if not expired:
+            return
+        retired = [entry for entry in self._retired if entry["retired_at"] > cutoff]
+        # Drop them from the manifest first so no reader picks them up afterwards
+        write_manifest(self.root, self.period, self.segments, self.generation, retired)
+        with self._lock:
+            self._retired = retired
+            self._manifest_version = self._read_manifest()[1]
+        for entry in expired:
+            shutil.rmtree(os.path.join(self.root, "segments", entry["name"]), ignore_errors=True)
+        logger.info(f"Deleted {len(expired)} retired segment directories")
+
+
+def _matches_all(metadata: Dict[str, Any], wanted: Dict[str, Any]) -> bool:
+    return all(metadata.get(key) == value for key, value in wanted.items())
+
+
+def write_manifest(root: str, period: str, segments: List[Segment], generation: int = 0,
+                   retired: Optional[List[Dict[str, Any]]] = None):
+    """
+    Atomically replace the manifest listing the live segments.
+
+    `generation` is bumped whenever live segments are replaced, so readers
+    know to switch; `retired` lists replaced segment directories not yet deleted.
+    """
+    segments = sorted(segments, key=lambda s: (s.start or "~"))
+    manifest = {"version": 1, "period": period, "generation": generation, "created_at": time.time(),
+                "segments": [segment.to_dict() for segment in segments], "retired": retired or []}
+    tmp_path = os.path.join(root, f"{MANIFEST}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(root, MANIFEST))
+
+
+def _write_segments(root: str, period: str, groups: Dict[str, FAISS], dates: Dict[str, List[str]]):
+    os.makedirs(os.path.join(root, "segments"), exist_ok=True)
+    segments = []
+    for label, store in groups.items():
+        known = [d for d in dates[label] if d]
+        start, end = (min(known)[:10], max(known)[:10]) if known else ("", "")
+        segment = Segment(_segment_dir_name(start, end), start, end, store.index.ntotal)
+        _save_store(store, os.path.join(root, "segments", segment.name))
+        segments.append(segment)
+    write_manifest(root, period, segments)
+    logger.info(f"Wrote {len(segments)} segments ({sum(s.count for s in segments):,} vectors) to {root}")
+    return segments
+
+
+def build_segments(documents: Iterable[Document], embeddings, root: str, period: str = "year") -> List[Segment]:
+    """
+    Embed chunked complaints into one FAISS store per `date_received` period.
+
+    Args:
+        documents: Chunks from `chunk_complaints`
+        embeddings: Embedder for the chunks (and later the queries)
+        root: Output directory
+        period: "year", "quarter" or "month"
+
+    Returns:
+        The written segments
+    """
+    by_label = {}
+    for doc in documents:
+        by_label.setdefault(period_label(str(doc.metadata.get(DATE_FIELD) or ""), period), []).append(doc)
+    groups = {label: FAISS.from_documents(docs, embeddings) for label, docs in by_label.items()}
+    dates = {label: [str(d.metadata.get(DATE_FIELD) or "") for d in docs] for label, docs in by_label.items()}
+    return _write_segments(root, period, groups, dates)
+
+
+def split_vector_store(vector_store: FAISS, root: str, period: str = "year", batch_size: int = 100000) -> List[Segment]:
+    """
+    Partition an existing FAISS store by period, reusing its vectors (no re-embedding).
+
+    Args:
+        vector_store: Store saved by `build_and_save_vector_store`
+        root: Output directory
+        period: "year", "quarter" or "month"
+        batch_size: Vectors reconstructed from the index at a time
+
+    Returns:
+        The written segments
+    """
+    index = vector_store.index
+    rows, dates = {}, {}
+    for i in range(index.ntotal):
+        doc_id = vector_store.index_to_docstore_id[i]
+        date_received = str(vector_store.docstore.search(doc_id).metadata.get(DATE_FIELD) or "")
+        label = period_label(date_received, period)
+        rows.setdefault(label, []).append(i)
+        dates.setdefault(label, []).append(date_received)
+
+    groups = {}
+    for label, positions in rows.items():
+        store = FAISS(vector_store.embedding_function, faiss.IndexFlat(index.d, index.metric_type),
+                      vector_store.docstore.__class__({}), {},
+                      normalize_L2=vector_store._normalize_L2, distance_strategy=vector_store.distance_strategy)
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            doc_ids = [vector_store.index_to_docstore_id[i] for i in batch]
+            offset = store.index.ntotal
+            store.index.add(index.reconstruct_batch(np.asarray(batch, dtype=np.int64)))
+            store.docstore.add({doc_id: vector_store.docstore.search(doc_id) for doc_id in doc_ids})
+            store.index_to_docstore_id.update({offset + j: doc_id for j, doc_id in enumerate(doc_ids)})
+        groups[label] = store
+    return _write_segments(root, period, groups, dates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, compact and inspect the time-partitioned index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    split = subparsers.add_parser("split", help="Partition an existing vector store by period")
+    split.add_argument("--vector_store", default="vector_store", help="FAISS store to partition")
+    split.add_argument("--output", default="vector_store_segments", help="Segmented index directory")
+    split.add_argument("--period", choices=PERIODS, default="year", help="Segment period")
+
+    compact = subparsers.add_parser("compact", help="Merge old segments into larger ones")
+    compact.add_argument("--index", default="vector_store_segments", help="Segmented index directory")
+    compact.add_argument("--before", required=True, help="Merge segments ending before this ISO date")
+    compact.add_argument("--period", choices=PERIODS, default="year", help="Period of the merged segments")
+    compact.add_argument("--retain_seconds", type=float, default=3600.0,
+                         help="Keep replaced segment directories this long for running readers")
+
+    stats = subparsers.add_parser("stats", help="List segments and tiers")
+    stats.add_argument("--index", default="vector_store_segments", help="Segmented index directory")
+    stats.add_argument("--hot_window_days", type=int, default=365, help="Hot tier window")
+    args = parser.parse_args()
+
+    if args.command == "split":
+        store = FAISS.load_local(args.vector_store, None, allow_dangerous_deserialization=True)
+        split_vector_store(store, args.output, args.period)
+    elif args.command == "compact":
+        merged = SegmentedIndex(args.index, hot_window_days=0).compact(args.before, args.period, args.retain_seconds)
+        print(f"Wrote {merged} merged segment(s)")
+    else:
+        index = SegmentedIndex(args.index, hot_window_days=args.hot_window_days)
+        print(f"{'segment':<24} {'vectors':>10} {'tier':>5}")
+        for row in index.stats():
+            print(f"{row['name']:<24} {row['count']:>10,} {row['tier']:>5}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
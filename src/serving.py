@@ -0,0 +1,133 @@
+"""
+Background loading and warm-up of the RAG pipeline for the serving layer.
+
+The dashboard binds its port immediately while `PipelineLoader` builds the
+pipeline (embedding model + FAISS index) on a background thread and then
+runs a warm-up query set to load the generator and prime caches. The
+loader exposes a readiness state the UI can poll.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Readiness states, in order
+STARTING = "starting"
+LOADING = "loading"
+WARMING_UP = "warming_up"
+READY = "ready"
+FAILED = "failed"
+
+
+class PipelineLoader:
+    """
+    Loads a pipeline on a background thread and reports progress.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        warmup_queries: Optional[List[str]] = None,
+        on_loaded: Optional[Callable[[Any], None]] = None,
+        started_at: Optional[float] = None
+    ):
+        """
+        Args:
+            factory: Builds the pipeline (e.g. `RAGPipeline`)
+            warmup_queries: Queries run once after loading to prime the models
+            on_loaded: Called with the pipeline as soon as it can serve queries
+            started_at: `time.monotonic()` of process start, for startup timings
+        """
+        self.factory = factory
+        self.warmup_queries = list(warmup_queries or [])
+        self.on_loaded = on_loaded
+        self.started_at = started_at if started_at is not None else time.monotonic()
+
+        self.pipeline = None
+        self.state = STARTING
+        self.message = "Waiting to start"
+        self.error = None
+        self.time_to_first_answer = None
+        self._warmed = 0
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self) -> "PipelineLoader":
+        """Begin loading on a daemon thread; returns immediately."""
+        self._thread = threading.Thread(target=self._run, name="pipeline-loader", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def is_serving(self) -> bool:
+        """True once the pipeline can answer queries (warm-up may still be running)."""
+        return self.pipeline is not None
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """Block until loading and warm-up finish (or fail)."""
+        return self._ready.wait(timeout)
+
+    def record_answer(self):
+        """Log time-to-first-answer the first time any query completes."""
+        with self._lock:
+            if self.time_to_first_answer is not None:
+                return
+            self.time_to_first_answer = time.monotonic() - self.started_at
+        logger.info(f"Startup: time to first answer {self.time_to_first_answer:.2f}s")
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot of the readiness state for the UI and health checks."""
+        total = len(self.warmup_queries)
+        if self.state in (READY, FAILED):
+            progress = 1.0
+        elif self.state == WARMING_UP:
+            progress = 0.5 + 0.5 * (self._warmed / total if total else 1.0)
+        else:
+            progress = 0.0
+        return {
+            "state": self.state,
+            "message": self.message,
+            "progress": progress,
+            "elapsed_s": time.monotonic() - self.started_at,
+            "error": self.error
+        }
+
+    def _set(self, state: str, message: str):
+        self.state = state
+        self.message = message
+        logger.info(f"Engine {state}: {message}")
+
+    def _run(self):
+        try:
+            self._set(LOADING, "Loading embedding model and vector index")
+            load_started = time.monotonic()
+            pipeline = self.factory()
+            logger.info(f"Startup: pipeline loaded in {time.monotonic() - load_started:.2f}s")
+
+            self.pipeline = pipeline
+            if self.on_loaded is not None:
+                self.on_loaded(pipeline)
+        except Exception as e:
+            self.error = str(e)
+            self._set(FAILED, f"Initialization failed: {e}")
+            self._ready.set()
+            return
+
+        # The pipeline is already published, so a failing warm-up query is only
+        # logged: queries are served either way
+        self._set(WARMING_UP, f"Running {len(self.warmup_queries)} warm-up queries")
+        for query in self.warmup_queries:
+            try:
+                pipeline.query(query)
+            except Exception as e:
+                logger.warning(f"Warm-up query failed: {e}")
+            else:
+                self.record_answer()
+            self._warmed += 1
+
+        self._set(READY, "Intelligence Engine online")
+        self._ready.set()
@@ -0,0 +1,416 @@
+"""
+Synthetic CFPB Complaint Corpus Generator
+
+Produces millions of rows in the full CFPB export schema so preprocessing,
+indexing and serving benchmarks can run offline at production scale
+(~1.37M complaints). Columns are sampled with NumPy per chunk:
+- products with a realistic mix (credit reporting dominates, as in the export),
+  and product-specific sub-products and issues
+- companies from a Zipf-like distribution, states weighted by population
+- dates received over the export's span, sent to the company 0-3 days later
+- narratives assembled from product-specific templated sentences, with a
+  log-normal sentence count (median ~180 words, long tail), CFPB-style
+  XXXX redactions, occasional boilerplate openings and upper-case rants
+- a controllable share of missing narratives and of exact / near-duplicate
+  narratives copied from earlier rows
+
+Rows are written in chunks to CSV or Parquet, so memory stays flat.
+
+Usage:
+    python -m src.synthetic_corpus --rows 1370000 --output data/raw/complaints_synthetic.csv
+    python -m src.synthetic_corpus --rows 2000000 --output data/raw/synthetic.parquet --duplicate_rate 0.05
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.preprocessing import NARRATIVE_COL
+
+COLUMNS = [
+    "Date received", "Product", "Sub-product", "Issue", "Sub-issue",
+    "Consumer complaint narrative", "Company public response", "Company",
+    "State", "ZIP code", "Tags", "Consumer consent provided?", "Submitted via",
+    "Date sent to company", "Company response to consumer", "Timely response?",
+    "Consumer disputed?", "Complaint ID"
+]
+
+# product: (share of complaints, sub-products, issues, narrative sentences)
+CATALOG = {
+    "Credit reporting, credit repair services, or other personal consumer reports": (
+        0.52,
+        ["Credit reporting", "Other personal consumer report", "Credit repair services"],
+        ["Incorrect information on your report", "Improper use of your report",
+         "Problem with a credit reporting company's investigation into an existing problem"],
+        ["There is an account on my credit report that does not belong to me.",
+         "I disputed the XXXX account with the bureau on XX/XX/XXXX and they verified it without any investigation.",
+         "This inquiry was made without my permission and is lowering my score.",
+         "Under the FCRA the bureau must remove inaccurate information within 30 days."]),
+    "Debt collection": (
+        0.14,
+        ["Other debt", "Credit card debt", "Medical debt", "I do not know"],
+        ["Attempts to collect debt not owed", "Written notification about debt",
+         "Communication tactics", "False statements or representation"],
+        ["A collection agency keeps calling me about a debt I do not owe.",
+         "They called my workplace several times after I asked them to stop.",
+         "I requested validation of the debt and never received it.",
+         "The collector threatened to sue me over a balance of ${amount}."]),
+    "Credit card or prepaid card": (
+        0.09,
+        ["General-purpose credit card or charge card", "Store credit card", "General-purpose prepaid card"],
+        ["Problem with a purchase shown on your statement", "Fees or interest",
+         "Getting a credit card", "Trouble using your card", "Closing your account"],
+        ["There are charges on my credit card that I did not make.",
+         "I was charged a late fee of ${amount} even though I paid on time.",
+         "My credit card was used for unauthorized transactions totaling ${amount}.",
+         "The card company raised my interest rate without notice.",
+         "I disputed the charge but the bank sided with the merchant."]),
+    "Checking or savings account": (
+        0.08,
+        ["Checking account", "Savings account", "Other banking product or service"],
+        ["Managing an account", "Closing an account", "Opening an account",
+         "Problem with a lender or other company charging your account"],
+        ["I cannot access my savings account and the bank is not helping.",
+         "The bank froze my account without any explanation.",
+         "An overdraft fee of ${amount} was charged twice in one day.",
+         "My deposit of ${amount} has been on hold for over two weeks.",
+         "They closed my account and have not returned my balance."]),
+    "Mortgage": (
+        0.06,
+        ["Conventional home mortgage", "FHA mortgage", "VA mortgage"],
+        ["Trouble during payment process", "Struggling to pay mortgage", "Applying for a mortgage"],
+        ["I'm having trouble with my mortgage payments.",
+         "The servicer misapplied my payment of ${amount} to escrow.",
+         "My loan modification application has been pending for months."]),
+    "Money transfer, virtual currency, or money service": (
+        0.05,
+        ["Domestic (US) money transfer", "Mobile or digital wallet", "Virtual currency",
+         "International money transfer"],
+        ["Fraud or scam", "Money was not available when promised",
+         "Other transaction problem", "Unauthorized transactions or other transaction problem"],
+        ["The money transfer of ${amount} never arrived at the destination.",
+         "I was scammed and the app refused to reverse the payment.",
+         "My digital wallet account was locked with my funds inside.",
+         "Customer service never called back about the missing transfer."]),
+    "Payday loan, title loan, or personal loan": (
+        0.03,
+        ["Installment loan", "Personal line of credit", "Payday loan", "Title loan"],
+        ["Charged fees or interest you didn't expect", "Getting the loan",
+         "Problem when making payments", "Struggling to pay your loan"],
+        ["My personal loan has a very high interest rate that wasn't disclosed.",
+         "The lender took ${amount} from my account without authorization.",
+         "I was never told about the origination fee.",
+         "They keep charging interest even though the loan was paid off."]),
+    "Vehicle loan or lease": (
+        0.02,
+        ["Loan", "Lease"],
+        ["Managing the loan or lease", "Struggling to pay your loan"],
+        ["The dealer added products to my auto loan that I did not agree to.",
+         "My car was repossessed even though I was current on payments."]),
+    "Student loan": (
+        0.01,
+        ["Federal student loan servicing", "Private student loan"],
+        ["Dealing with your lender or servicer", "Struggling to repay your loan"],
+        ["My student loan servicer lost my income-driven repayment paperwork.",
+         "I was placed in forbearance without my consent."]),
+}
+
+COMMON_SENTENCES = [
+    "I have called them many times and each time I was told something different.",
+    "Please investigate this matter and help me resolve it.",
+    "This has caused me a great deal of stress and financial hardship.",
+    "I have attached copies of my statements and correspondence.",
+    "On XX/XX/XXXX I spoke with a representative named XXXX.",
+    "They told me the issue would be fixed within 7-10 business days but nothing happened.",
+    "I am requesting a full refund and a written explanation.",
+    "I was on hold for over an hour before the call was disconnected.",
+]
+
+OPENINGS = [
+    "I am writing to file a complaint about my account.",
+    "To whom it may concern,",
+    "I am filing this complaint because the company has not resolved my issue.",
+]
+
+COMPANIES = [
+    "EQUIFAX, INC.", "TRANSUNION INTERMEDIATE HOLDINGS, INC.", "Experian Information Solutions Inc.",
+    "BANK OF AMERICA, NATIONAL ASSOCIATION", "WELLS FARGO & COMPANY", "JPMORGAN CHASE & CO.",
+    "CAPITAL ONE FINANCIAL CORPORATION", "CITIBANK, N.A.", "SYNCHRONY FINANCIAL", "Navient Solutions, LLC.",
+    "U.S. BANCORP", "PAYPAL HOLDINGS, INC.", "Block, Inc.", "DISCOVER BANK", "AMERICAN EXPRESS COMPANY",
+    "PNC Bank N.A.", "TRUIST FINANCIAL CORPORATION", "Ocwen Financial Corporation", "Coinbase, Inc.",
+    "Portfolio Recovery Associates, Inc.", "ENCORE CAPITAL GROUP INC.", "Santander Holdings USA, Inc",
+    "ALLY FINANCIAL INC.", "Paypal Holdings, Inc", "TD BANK US HOLDING COMPANY",
+]
+
+# Roughly proportional to population
+STATES = {
+    "CA": 12.0, "TX": 9.0, "FL": 8.5, "NY": 6.0, "GA": 4.5, "IL": 3.8, "PA": 3.8, "NC": 3.2, "OH": 3.2,
+    "NJ": 2.8, "VA": 2.6, "MI": 2.8, "MD": 2.2, "AZ": 2.2, "WA": 2.2, "TN": 2.0, "MA": 2.0, "IN": 1.8,
+    "MO": 1.7, "SC": 1.6, "CO": 1.6, "AL": 1.4, "LA": 1.4, "MN": 1.5, "NV": 1.2, "WI": 1.6, "KY": 1.2,
+    "OK": 1.1, "OR": 1.2, "CT": 1.0, "UT": 0.9, "AR": 0.9, "MS": 0.8, "IA": 0.9, "KS": 0.8, "NM": 0.6,
+    "NE": 0.6, "ID": 0.5, "WV": 0.5, "HI": 0.4, "NH": 0.4, "ME": 0.4, "DE": 0.3, "RI": 0.3, "MT": 0.3,
+    "SD": 0.3, "ND": 0.2, "AK": 0.2, "VT": 0.2, "WY": 0.2, "DC": 0.3, "PR": 0.3,
+}
+
+SUBMITTED_VIA = (["Web", "Referral", "Phone", "Postal mail", "Fax", "Email"], [0.86, 0.07, 0.04, 0.02, 0.005, 0.005])
+COMPANY_RESPONSES = (["Closed with explanation", "Closed with non-monetary relief", "Closed with monetary relief",
+                      "In progress", "Untimely response"], [0.72, 0.16, 0.06, 0.05, 0.01])
+PUBLIC_RESPONSES = ([np.nan, "Company has responded to the consumer and the CFPB and chooses not to provide a public response",
+                     "Company believes it acted appropriately as authorized by contract or law"], [0.55, 0.35, 0.10])
+TAGS = ([np.nan, "Servicemember", "Older American", "Older American, Servicemember"], [0.88, 0.06, 0.05, 0.01])
+
+AMOUNTS = ["25.00", "35.00", "39.99", "120.00", "300.00", "450.75", "1,200.00", "2,500.00", "9,800.00"]
+START_DATE, END_DATE = np.datetime64("2011-12-01"), np.datetime64("2025-06-30")
+
+
+def _probabilities(weights) -> np.ndarray:
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum()
+
+
+def _sentence_bank(sentences) -> np.ndarray:
+    """Expand `{amount}` templates into one sentence per amount."""
+    bank = []
+    for sentence in sentences:
+        if "{amount}" in sentence:
+            bank.extend(sentence.format(amount=amount) for amount in AMOUNTS)
+        else:
+            bank.append(sentence)
+    return np.array(bank, dtype=object)
+
+
+class SyntheticCorpus:
+    """
+    Chunked generator of synthetic raw complaints.
+    """
+
+    def __init__(
+        self,
+        seed: int = 42,
+        narrative_rate: float = 0.4,
+        duplicate_rate: float = 0.02,
+        near_duplicate_share: float = 0.5,
+        median_sentences: float = 12.0,
+        first_complaint_id: int = 1000000
+    ):
+        """
+        Args:
+            seed: Random seed; the same seed and chunk sizes give the same corpus
+            narrative_rate: Share of rows with a consumer narrative (about 0.4 in the export)
+            duplicate_rate: Share of narratives copied from an earlier row
+            near_duplicate_share: Share of copies that get a small edit instead of being exact
+            median_sentences: Median narrative length in sentences (log-normal)
+            first_complaint_id: Complaint ID of the first row
+        """
+        self.rng = np.random.default_rng(seed)
+        self.narrative_rate = narrative_rate
+        self.duplicate_rate = duplicate_rate
+        self.near_duplicate_share = near_duplicate_share
+        self.median_sentences = median_sentences
+        self.next_id = first_complaint_id
+
+        self.products = np.array(list(CATALOG), dtype=object)
+        self.product_p = _probabilities([spec[0] for spec in CATALOG.values()])
+        self.sub_products = [np.array(spec[1], dtype=object) for spec in CATALOG.values()]
+        self.issues = [np.array(spec[2], dtype=object) for spec in CATALOG.values()]
+        self.sentences = [_sentence_bank(spec[3]) for spec in CATALOG.values()]
+        self.common = _sentence_bank(COMMON_SENTENCES)
+        self.openings = np.array(OPENINGS, dtype=object)
+        self.companies = np.array(COMPANIES, dtype=object)
+        self.company_p = _probabilities(1.0 / np.arange(1, len(COMPANIES) + 1) ** 1.1)
+        self.states = np.array(list(STATES), dtype=object)
+        self.state_p = _probabilities(list(STATES.values()))
+        # Narratives of the previous chunk, so duplicates can cross chunk boundaries
+        self._previous = np.array([], dtype=object)
+
+    def _choice(self, values, n: int, p=None) -> np.ndarray:
+        return np.asarray(values, dtype=object)[self.rng.choice(len(values), size=n, p=p)]
+
+    def _narratives(self, product_codes: np.ndarray) -> np.ndarray:
+        """Assemble one narrative per row from product-specific and common sentences."""
+        rng = self.rng
+        n = len(product_codes)
+        counts = np.clip(np.round(rng.lognormal(np.log(self.median_sentences), 0.6, size=n)), 1, 120).astype(np.int64)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        # Product-specific sentences about 60% of the time, generic ones otherwise
+        specific = rng.random(counts.sum()) < 0.6
+        uniform = rng.random(counts.sum())
+        row_codes = np.repeat(product_codes, counts)
+
+        pieces = np.empty(counts.sum(), dtype=object)
+        common_idx = (uniform * len(self.common)).astype(np.int64)
+        pieces[:] = self.common[common_idx]
+        for code, bank in enumerate(self.sentences):
+            mask = specific & (row_codes == code)
+            pieces[mask] = bank[(uniform[mask] * len(bank)).astype(np.int64)]
+
+        opening = rng.random(n) < 0.25
+        opening_text = self._choice(self.openings, n)
+        shout = rng.random(n) < 0.05
+        narratives = np.empty(n, dtype=object)
+        for i in range(n):
+            text = " ".join(pieces[starts[i]:starts[i] + counts[i]])
+            if opening[i]:
+                text = f"{opening_text[i]} {text}"
+            narratives[i] = text.upper() if shout[i] else text
+        return narratives
+
+    def _add_duplicates(self, narratives: np.ndarray, has_narrative: np.ndarray) -> np.ndarray:
+        """Overwrite `duplicate_rate` of the narratives with copies of earlier ones."""
+        rng = self.rng
+        rows = np.flatnonzero(has_narrative)
+        if len(rows) < 2 or self.duplicate_rate <= 0:
+            return narratives
+        targets = rows[rng.random(len(rows)) < self.duplicate_rate]
+        pool = np.concatenate([self._previous, narratives[rows]])
+        offset = len(self._previous)
+        near = rng.random(len(targets)) < self.near_duplicate_share
+        for target, is_near in zip(targets, near):
+            # Copy from anything generated before this row (previous chunk included)
+            position = offset + np.searchsorted(rows, target)
+            if position == 0:
+                continue
+            source = pool[rng.integers(0, position)]
+            narratives[target] = f"{source} I have still not received a response." if is_near else source
+        return narratives
+
+    def chunk(self, n: int) -> pd.DataFrame:
+        """Generate the next `n` rows."""
+        rng = self.rng
+        product_codes = rng.choice(len(self.products), size=n, p=self.product_p)
+        sub_products = np.empty(n, dtype=object)
+        issues = np.empty(n, dtype=object)
+        for code in range(len(self.products)):
+            mask = product_codes == code
+            sub_products[mask] = self._choice(self.sub_products[code], int(mask.sum()))
+            issues[mask] = self._choice(self.issues[code], int(mask.sum()))
+
+        has_narrative = rng.random(n) < self.narrative_rate
+        narratives = np.full(n, np.nan, dtype=object)
+        narratives[has_narrative] = self._narratives(product_codes[has_narrative])
+        narratives = self._add_duplicates(narratives, has_narrative)
+        self._previous = narratives[has_narrative][-20000:]
+
+        span = int((END_DATE - START_DATE).astype(np.int64))
+        received = START_DATE + rng.integers(0, span, size=n).astype("timedelta64[D]")
+        sent = received + rng.integers(0, 4, size=n).astype("timedelta64[D]")
+        zips = np.char.zfill(rng.integers(501, 99951, size=n).astype(str), 5)
+        # The public export truncates about a third of ZIP codes to "123XX"
+        zips = np.where(rng.random(n) < 0.3, np.char.add(zips.astype("<U3"), "XX"), zips)
+        timely = np.where(rng.random(n) < 0.98, "Yes", "No")
+
+        df = pd.DataFrame({
+            "Date received": np.datetime_as_string(received, unit="D"),
+            "Product": self.products[product_codes],
+            "Sub-product": sub_products,
+            "Issue": issues,
+            "Sub-issue": np.nan,
+            NARRATIVE_COL: narratives,
+            "Company public response": self._choice(PUBLIC_RESPONSES[0], n, p=_probabilities(PUBLIC_RESPONSES[1])),
+            "Company": self._choice(self.companies, n, p=self.company_p),
+            "State": self._choice(self.states, n, p=self.state_p),
+            "ZIP code": zips,
+            "Tags": self._choice(TAGS[0], n, p=_probabilities(TAGS[1])),
+            "Consumer consent provided?": np.where(has_narrative, "Consent provided", "Consent not provided"),
+            "Submitted via": self._choice(SUBMITTED_VIA[0], n, p=_probabilities(SUBMITTED_VIA[1])),
+            "Date sent to company": np.datetime_as_string(sent, unit="D"),
+            "Company response to consumer": self._choice(COMPANY_RESPONSES[0], n, p=_probabilities(COMPANY_RESPONSES[1])),
+            "Timely response?": timely,
+            "Consumer disputed?": "N/A",
+            "Complaint ID": np.arange(self.next_id, self.next_id + n, dtype=np.int64),
+        }, columns=COLUMNS)
+        self.next_id += n
+        return df
+
+    def iter_chunks(self, n_rows: int, chunk_rows: int = 200000) -> Iterator[pd.DataFrame]:
+        """Yield `n_rows` rows in chunks of at most `chunk_rows`."""
+        written = 0
+        while written < n_rows:
+            n = min(chunk_rows, n_rows - written)
+            yield self.chunk(n)
+            written += n
+
+
+def generate_corpus(
+    output_path: str,
+    n_rows: int,
+    chunk_rows: int = 200000,
+    output_format: str = None,
+    **corpus_options
+) -> Dict[str, int]:
+    """
+    Stream a synthetic raw export to CSV or Parquet.
+
+    Args:
+        output_path: Destination file (overwritten)
+        n_rows: Number of complaints
+        chunk_rows: Rows generated and written per chunk
+        output_format: "csv" or "parquet"; inferred from the extension by default
+        **corpus_options: Passed to SyntheticCorpus (seed, narrative_rate, duplicate_rate, ...)
+
+    Returns:
+        Row and narrative counts
+    """
+    if output_format is None:
+        output_format = "parquet" if output_path.endswith(".parquet") else "csv"
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    corpus = SyntheticCorpus(**corpus_options)
+    rows = narratives = 0
+    writer = None
+    try:
+        for i, df in enumerate(corpus.iter_chunks(n_rows, chunk_rows)):
+            if output_format == "parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                if writer is None:
+                    # Explicit schema: a chunk where a sparse column is all-null
+                    # would otherwise infer `null` and no longer match the file
+                    schema = pa.schema([(column, pa.int64() if column == "Complaint ID" else pa.string())
+                                        for column in COLUMNS])
+                    writer = pq.ParquetWriter(output_path, schema)
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+                writer.write_table(table)
+            else:
+                df.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            rows += len(df)
+            narratives += int(df[NARRATIVE_COL].notna().sum())
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"rows": rows, "narratives": narratives}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic CFPB-schema complaint export.")
+    parser.add_argument("--rows", type=int, default=1370000, help="Number of complaints")
+    parser.add_argument("--output", default="data/raw/complaints_synthetic.csv", help="Output .csv or .parquet file")
+    parser.add_argument("--chunk_rows", type=int, default=200000, help="Rows per generated chunk")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--narrative_rate", type=float, default=0.4, help="Share of rows with a narrative")
+    parser.add_argument("--duplicate_rate", type=float, default=0.02, help="Share of narratives copied from earlier rows")
+    parser.add_argument("--median_sentences", type=float, default=12.0, help="Median narrative length in sentences")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = generate_corpus(
+        args.output, args.rows, chunk_rows=args.chunk_rows, seed=args.seed,
+        narrative_rate=args.narrative_rate, duplicate_rate=args.duplicate_rate,
+        median_sentences=args.median_sentences
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {counts['rows']:,} rows ({counts['narratives']:,} with narratives) to {args.output} "
+          f"in {elapsed:.1f}s ({counts['rows'] / elapsed:,.0f} rows/sec, {os.path.getsize(args.output) / 1e6:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Workload capture for offline replay.
+
+`WorkloadRecorder` appends one compact JSON line per answered query:
+
+    {"t": 1718000000.123, "q": "...", "k": 3, "f": {...}, "d": 5000, "ms": 812.4, "by": "generator"}
+
+`t` is the wall-clock arrival time, `ms` the server-side latency and `by` the
+`served_by` path; `k`, `f` (filter) and `d` (deadline_ms) are omitted when the
+request used the defaults. Each line is written with a single `os.write` on an
+O_APPEND descriptor, so threads and pre-fork workers can share one file
+without interleaving. `src/replay.py` reads the file back.
+"""
+
+import os
+import json
+import random
+import logging
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkloadRecorder:
+    """
+    Append-only JSON-lines log of queries.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0):
+        """
+        Args:
+            path: Capture file (created if missing, appended to otherwise)
+            sample_rate: Fraction of queries recorded
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def record(
+        self,
+        query: str,
+        arrived_at: float,
+        latency: float,
+        k: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        deadline_ms: Optional[float] = None,
+        served_by: Optional[str] = None
+    ):
+        """
+        Log one query.
+
+        Args:
+            query: The user question
+            arrived_at: `time.time()` when the query arrived
+            latency: Seconds taken to answer it
+            k: Requested number of documents, if not the default
+            filter: Metadata filter, if any
+            deadline_ms: Requested deadline, if not the default
+            served_by: Path that produced the answer
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        entry = {"t": round(arrived_at, 3), "q": query}
+        if k is not None:
+            entry["k"] = k
+        if filter:
+            entry["f"] = filter
+        if deadline_ms is not None:
+            entry["d"] = deadline_ms
+        entry["ms"] = round(latency * 1000, 1)
+        if served_by:
+            entry["by"] = served_by
+        line = json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+        try:
+            os.write(self._fd, line.encode("utf-8"))
+        except OSError as e:
+            # Capture must never fail a user request
+            logger.warning(f"Workload capture failed: {e}")
+
+    def close(self):
+        os.close(self._fd)
+
+
+def read_workload(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield captured entries in file order, skipping a torn trailing line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed workload line in {path}")
@@ -1,5 +1,6 @@
 import pytest
 from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
 import numpy as np
 import sys
 import os
@@ -7,23 +8,75 @@ import os
 # Add the project root to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-@pytest.fixture
-def sample_text():
-    return "This is a sample consumer complaint about reaching out to the bank regarding unauthorized charges. The bank did not resolve the issue quickly."
+from src.embeddings import HashingEmbeddings
+from src.rag_pipeline import RAGPipeline
 
-@pytest.fixture
-def mock_documents():
+def pytest_addoption(parser):
+    parser.addoption("--real-models", action="store_true", default=False,
+                     help="Run tests marked real_models (downloads models, needs vector_store/)")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "real_models: needs the real embedding/LLM models and the production index")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--real-models"):
+        return
+    skip = pytest.mark.skip(reason="needs --real-models")
+    for item in items:
+        if "real_models" in item.keywords:
+            item.add_marker(skip)
+
+def _mock_documents():
     return [
         Document(
             page_content="I had an unauthorized charge on my credit card.",
-            metadata={"product_category": "Credit Card", "issue": "Unauthorized charge", "id": "1"}
+            metadata={"product_category": "Credit Card", "issue": "Unauthorized charge", "id": "1", "complaint_id": "1"}
         ),
         Document(
             page_content="My personal loan application was rejected without clear reason.",
-            metadata={"product_category": "Personal Loan", "issue": "Loan application", "id": "2"}
+            metadata={"product_category": "Personal Loan", "issue": "Loan application", "id": "2", "complaint_id": "2"}
         )
     ]
 
+class FixtureGenerator:
+    """Stands in for the text2text pipeline: answers with the first retrieved excerpt."""
+
+    def _answer(self, prompt):
+        excerpts = prompt.split("EXCERPTS:", 1)[-1].strip().splitlines()
+        return {"generated_text": f"Customers report: {excerpts[0] if excerpts else 'no details'}"}
+
+    def __call__(self, prompts, **kwargs):
+        if isinstance(prompts, str):
+            return [self._answer(prompts)]
+        return [[self._answer(prompt)] for prompt in prompts]
+
+@pytest.fixture
+def sample_text():
+    return "This is a sample consumer complaint about reaching out to the bank regarding unauthorized charges. The bank did not resolve the issue quickly."
+
+@pytest.fixture
+def mock_documents():
+    return _mock_documents()
+
 @pytest.fixture
 def mock_embedding():
     return np.random.rand(384).astype('float32').tolist()
+
+@pytest.fixture(scope="session")
+def hashing_embeddings():
+    return HashingEmbeddings(size=384)
+
+@pytest.fixture(scope="session")
+def fixture_vector_store(hashing_embeddings):
+    """Tiny in-memory FAISS index over the mock documents; treat as read-only."""
+    return FAISS.from_documents(_mock_documents(), hashing_embeddings)
+
+@pytest.fixture(scope="session")
+def rag_pipeline(hashing_embeddings, fixture_vector_store):
+    """One pipeline for the whole session: fixture index, hashing embedder, no model downloads."""
+    return RAGPipeline(
+        config_path="missing-config.yaml",
+        embeddings=hashing_embeddings,
+        vector_store=fixture_vector_store,
+        generator=FixtureGenerator()
+    )
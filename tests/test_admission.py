@@ -0,0 +1,72 @@
+from src.admission import AdmissionController, AdmissionRejected
+import threading
+import time
+import pytest
+
+def _wait_for_queue(controller, depth):
+    while controller.queue_depth < depth:
+        time.sleep(0.001)
+
+def test_sheds_when_queue_is_full_and_on_queue_timeout():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, max_queue_time_ms=50)
+    controller.acquire("a")
+    outcome = []
+
+    def wait():
+        try:
+            controller.acquire("b")
+            outcome.append("admitted")
+        except AdmissionRejected as e:
+            outcome.append(e.reason)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    _wait_for_queue(controller, 1)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire("c")
+    assert rejected.value.reason == "queue_full"
+    waiter.join()
+    assert outcome == ["queue_timeout"]
+    controller.release()
+
+    assert controller.stats()["shed"] == {"queue_full": 1, "client_queue_full": 0, "queue_timeout": 1}
+    assert controller.in_flight == 0 and controller.queue_depth == 0
+
+def test_waiting_clients_are_served_round_robin():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, max_queue_time_ms=5000)
+    controller.acquire("holder")
+    order = []
+
+    def request(client):
+        with controller.admit(client):
+            order.append(client)
+
+    threads = []
+    # One bulk client queues three requests before an analyst queues one
+    for client in ["bulk", "bulk", "bulk", "analyst"]:
+        threads.append(threading.Thread(target=request, args=(client,)))
+        threads[-1].start()
+        _wait_for_queue(controller, len(threads))
+    controller.release()
+    for thread in threads:
+        thread.join()
+
+    assert order == ["bulk", "analyst", "bulk", "bulk"]
+
+def test_per_client_limit_and_extractive_overflow():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, max_queue_per_client=1,
+                                     max_queue_time_ms=5000, overflow="extractive")
+    controller.acquire("holder")
+    waiter = threading.Thread(target=lambda: controller.run("bulk", lambda: "full"))
+    waiter.start()
+    _wait_for_queue(controller, 1)
+
+    assert controller.run("bulk", lambda: "full", degraded=lambda: "extractive") == "extractive"
+    controller.release()
+    waiter.join()
+
+    text = controller.render_prometheus()
+    assert 'rag_admission_shed_total{reason="client_queue_full"} 1' in text
+    assert "rag_admission_degraded_total 1" in text
+    assert "rag_admission_queue_depth 0" in text
@@ -0,0 +1,61 @@
+from src.aggregate_cube import AggregateCube, build_cube
+from src.rag_pipeline import RAGPipeline
+import pandas as pd
+
+ROWS = pd.DataFrame({
+    "Product": ["Money transfer, virtual currency, or money service"] * 3 + ["Credit card or prepaid card"] * 2,
+    "Issue": ["Fraud or scam", "Fraud or scam", "Lost or stolen money order", "Fraud or scam", "Closing your account"],
+    "Company": ["PAYPAL HOLDINGS, INC.", "PAYPAL HOLDINGS, INC.", "WELLS FARGO & COMPANY", "CITIBANK, N.A.", "CITIBANK, N.A."],
+    "State": ["CA", "TX", "CA", "CA", None],
+    "Date received": ["2023-01-05", "2023-02-10", "2023-02-11", "2022-07-01", "2023-03-03"]
+})
+
+def test_counts_survive_chunked_build_and_save(tmp_path):
+    cube = build_cube([ROWS.iloc[:2], ROWS.iloc[2:]])
+    path = str(tmp_path / "cube.npz")
+    cube.save(path)
+    cube = AggregateCube.load(path)
+
+    assert cube.total == 5
+    assert cube.count({"issue": "fraud or scam", "year": 2023})["total"] == 2
+    by_state = cube.count({"company": "CITIBANK, N.A."}, group_by=["state"])["groups"]
+    assert by_state == [{"state": "(not provided)", "count": 1}, {"state": "CA", "count": 1}]
+    assert [g["month"] for g in cube.count(group_by=["month"])["groups"]] == ["2022-07", "2023-01", "2023-02", "2023-03"]
+
+def test_parses_counting_questions_only():
+    cube = build_cube(ROWS)
+    parsed = cube.parse_question("How many money transfer complaints about fraud in 2023 by state?")
+    assert parsed == {
+        "filters": {"product_category": ["Money transfer, virtual currency, or money service"],
+                    "issue": ["Fraud or scam"], "year": [2023]},
+        "group_by": ["state"]
+    }
+    assert cube.count(**parsed)["groups"] == [{"state": "CA", "count": 1}, {"state": "TX", "count": 1}]
+    assert cube.parse_question("What are the main issues with money transfers?") is None
+
+def test_qualitative_questions_are_not_routed_to_the_cube():
+    cube = build_cube(ROWS)
+    for question in [
+        "Why are customers unhappy with monthly fees on credit cards?",
+        "What are common issues across products?",
+        "Why did a number of customers report fraud?",
+        "What do monthly fee complaints say?",
+        # Counting questions whose qualifiers the cube cannot represent
+        "How many customers complained about rude staff at Chase?",
+        "How many complaints mention hidden charges after a mortgage refinance?",
+        "How many fraud complaints were filed against Chase?",
+    ]:
+        assert cube.parse_question(question) is None, question
+    assert cube.parse_question("Show the trend of credit card complaints")["group_by"] == ["month"]
+    assert cube.parse_question("Break down complaints by product")["group_by"] == ["product_category"]
+    assert cube.parse_question("How many Credit Card complaints about fraud in March 2023?")["filters"] == {
+        "product_category": ["Credit card or prepaid card"], "issue": ["Fraud or scam"], "year": [2023]
+    }
+
+def test_pipeline_answers_aggregates_without_retrieval(hashing_embeddings, fixture_vector_store):
+    rag = RAGPipeline(config_path="missing-config.yaml", embeddings=hashing_embeddings,
+                      vector_store=fixture_vector_store, cube=build_cube(ROWS))
+    response = rag.query("Number of complaints per company in CA")
+    assert response["served_by"] == "aggregate" and response["sources"] == []
+    assert response["aggregate"]["total"] == 3
+    assert response["answer"].startswith("There are 3 complaints matching state: CA.")
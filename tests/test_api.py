@@ -0,0 +1,110 @@
+from fastapi.testclient import TestClient
+from src.api import create_api
+import asyncio
+import json
+import pytest
+
+class _FakePipeline:
+    def query(self, question, k=None, filter=None, profile=False, deadline_ms=None):
+        return {"answer": f"answer to {question}", "sources": [], "query": question, "profiled": profile}
+
+    def query_extractive(self, question, k=None, filter=None):
+        return {"answer": "summary", "sources": [], "query": question, "served_by": "extractive_shed"}
+
+    def query_batch(self, questions, k=None, filter=None):
+        return [self.query(question) for question in questions]
+
+    def retrieve_relevant_complaints(self, query, k=None, filter=None):
+        docs = [{"content": "late fee", "metadata": {"product_category": "Credit Card"}, "similarity_score": 0.1},
+                {"content": "wire lost", "metadata": {"product_category": "Money Transfer"}, "similarity_score": 0.2}]
+        docs = [d for d in docs if not filter or d["metadata"]["product_category"] == filter["product_category"]]
+        return docs[:k]
+
+    def stream_answer(self, question, k=None, filter=None, deadline_ms=None):
+        yield {"event": "sources", "data": []}
+        for token in ("late ", "fees"):
+            yield {"event": "token", "data": token}
+        yield {"event": "done", "data": self.query(question)}
+
+def _client(pipeline=None, **config):
+    return TestClient(create_api(lambda: pipeline, config=config, get_metrics=lambda: "rag_events_total 1\n"))
+
+def test_query_batch_and_search_endpoints():
+    client = _client(_FakePipeline())
+    assert client.post("/api/v1/query", json={"question": "fees?"}).json()["answer"] == "answer to fees?"
+    profiled = client.post("/api/v1/query", json={"question": "fees?"}, headers={"X-Profile": "1"})
+    assert profiled.json()["profiled"] is True
+    batch = client.post("/api/v1/query/batch", json={"questions": ["a", "b"]}).json()["responses"]
+    assert [r["query"] for r in batch] == ["a", "b"]
+
+    search = client.post("/api/v1/search", json={"query": "x", "k": 5, "filter": {"product_category": "Money Transfer"}})
+    assert [r["content"] for r in search.json()["results"]] == ["wire lost"]
+
+def test_stream_endpoint_emits_server_sent_events():
+    response = _client(_FakePipeline()).post("/api/v1/query/stream", json={"question": "fees?"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert events == ["sources", "token", "token", "done"]
+
+def test_limits_and_readiness():
+    client = _client(_FakePipeline(), max_batch_size=2, max_question_chars=10, max_k=3, max_body_bytes=200)
+    assert client.post("/api/v1/query/batch", json={"questions": ["a", "b", "c"]}).status_code == 413
+    assert client.post("/api/v1/query", json={"question": "x" * 11}).status_code == 413
+    assert client.post("/api/v1/search", json={"query": "x", "k": 4}).status_code == 422
+    assert client.post("/api/v1/query", json={"question": "x" * 300}).status_code == 413
+
+    # Chunked bodies carry no Content-Length and are counted as they are read
+    chunked = (b'{"question": "' + b"x" * 100 + b'"}' for _ in range(1))
+    assert client.post("/api/v1/query", content=chunked,
+                       headers={"content-type": "application/json"}).status_code == 413
+
+    loading = _client(None)
+    assert loading.post("/api/v1/query", json={"question": "fees?"}).status_code == 503
+    assert loading.get("/api/v1/health").status_code == 503
+
+def test_metrics_endpoint_serves_prometheus_text():
+    response = _client(_FakePipeline()).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text == "rag_events_total 1\n"
+
+def test_shed_requests_get_503_or_extractive_answer():
+    from src.admission import AdmissionController
+
+    admission = AdmissionController(max_concurrency=1, max_queue=0)
+    admission.acquire("someone-else")
+    client = TestClient(create_api(lambda: _FakePipeline(), admission=admission))
+    busy = client.post("/api/v1/search", json={"query": "x"})
+    assert busy.status_code == 503 and busy.headers["retry-after"] == "1"
+
+    admission.overflow = "extractive"
+    assert client.post("/api/v1/query", json={"question": "fees?"}).json()["served_by"] == "extractive_shed"
+
+def test_stream_releases_its_slot_when_the_response_never_starts():
+    from src.admission import AdmissionController
+
+    admission = AdmissionController(max_concurrency=1, max_queue=0)
+    app = create_api(lambda: _FakePipeline(), admission=admission)
+    body = json.dumps({"question": "fees?"}).encode()
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/query/stream", "raw_path": b"/api/v1/query/stream",
+             "query_string": b"", "root_path": "", "scheme": "http", "http_version": "1.1",
+             "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+             "client": ("testclient", 50000), "server": ("testserver", 80)}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        # The client is gone before the headers go out, so the body is never iterated
+        raise OSError("connection reset")
+
+    # Starlette's task group may wrap the OSError in an ExceptionGroup
+    with pytest.raises(Exception, match="connection reset|unhandled errors"):
+        asyncio.run(app(scope, receive, send))
+    assert admission.in_flight == 0
+    assert TestClient(app).post("/api/v1/query/stream", json={"question": "fees?"}).status_code == 200
+    assert admission.in_flight == 0
+
+def test_aggregate_endpoint_needs_a_cube():
+    response = _client(_FakePipeline()).post("/api/v1/aggregate", json={"group_by": ["state"]})
+    assert response.status_code == 404
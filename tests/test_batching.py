@@ -0,0 +1,41 @@
+from src.batching import MicroBatcher
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+class RecordingPipeline:
+    def __init__(self):
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def query_batch(self, questions):
+        with self.lock:
+            self.batch_sizes.append(len(questions))
+        return [{"answer": q.upper(), "sources": [], "query": q} for q in questions]
+
+def test_concurrent_queries_are_batched_and_routed_back():
+    rag = RecordingPipeline()
+    batcher = MicroBatcher(rag, max_batch_size=4, max_wait_ms=200)
+    questions = [f"question {i}" for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(batcher.query, questions))
+    batcher.close()
+
+    assert [r["answer"] for r in responses] == [q.upper() for q in questions]
+    assert max(rag.batch_sizes) <= 4
+    assert sum(rag.batch_sizes) == 8
+    assert len(rag.batch_sizes) < 8
+
+def test_batch_failure_propagates_to_every_caller():
+    class FailingPipeline:
+        def query_batch(self, questions):
+            raise RuntimeError("model offline")
+
+    batcher = MicroBatcher(FailingPipeline(), max_batch_size=2, max_wait_ms=1)
+    future = batcher.submit("anything")
+    try:
+        future.result(timeout=5)
+        assert False, "expected the pipeline error"
+    except RuntimeError as e:
+        assert "model offline" in str(e)
+    batcher.close()
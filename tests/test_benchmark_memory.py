@@ -0,0 +1,24 @@
+from src.benchmark_memory import MemoryMonitor, fit_scaling, predict_mb
+import numpy as np
+
+def test_monitor_records_peak_rss_and_allocation_growth():
+    monitor = MemoryMonitor(trace_allocations=True, sample_interval=0.01)
+    with monitor.stage("allocate") as record:
+        block = np.ones(20_000_000)
+        record["items"] = block.size
+        del block
+    result = monitor.close()
+
+    stage = result["stages"][0]
+    assert stage["stage"] == "allocate" and stage["items"] == 20_000_000
+    assert stage["traced_peak_mb"] >= 150
+    if stage["peak_rss_is_per_stage"]:
+        assert stage["peak_rss_mb"] - stage["rss_before_mb"] >= 100
+    assert stage["wall_s"] > 0
+
+def test_scaling_fit_extrapolates_linearly():
+    fit = fit_scaling([1000, 2000, 4000], [150.0, 250.0, 450.0])
+
+    assert abs(fit["fixed_mb"] - 50.0) < 1e-6
+    assert abs(fit["per_complaint_kb"] - 102.4) < 1e-6
+    assert abs(predict_mb(fit, 10000) - 1050.0) < 1e-6
@@ -0,0 +1,20 @@
+from src.benchmark_retrieval import recall_at_k, run_benchmark, split_queries, synthetic_embeddings
+import numpy as np
+
+def test_recall_at_k():
+    truth = np.array([[1, 2], [3, 4]])
+    found = np.array([[2, 9], [4, 3]])
+    assert recall_at_k(found, truth) == 0.75
+
+def test_flat_index_matches_ground_truth():
+    database, queries = split_queries(synthetic_embeddings(2000, dim=16, n_clusters=8), 50)
+    results = run_benchmark(database, queries, [
+        {"factory": "Flat", "search_params": [""]},
+        {"factory": "IVF{nlist},Flat", "search_params": ["nprobe=1", "nprobe=176"]},
+    ], k=5, threads=1)
+
+    assert [r["index"] for r in results] == ["Flat", "IVF176,Flat", "IVF176,Flat"]
+    assert results[0]["recall@5"] == 1.0
+    assert results[1]["recall@5"] <= results[2]["recall@5"] == 1.0
+    assert all(r["p50_ms"] <= r["p99_ms"] and r["serialized_mb"] > 0 for r in results)
+    assert all(isinstance(r["rss_delta_mb"], float) for r in results)
@@ -0,0 +1,47 @@
+from src.context_compression import ContextCompressor
+from src.embeddings import HashingEmbeddings
+from src.rag_pipeline import RAGPipeline
+from tests.conftest import FixtureGenerator
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__(size=512)
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return super().embed_documents(texts)
+
+DOCS = [
+    {"content": "I moved to a new apartment last spring. The weather was nice that week.",
+     "metadata": {"product_category": "Credit Card", "issue": "Billing"}, "similarity_score": 0.4},
+    {"content": "The bank charged a late fee on my credit card although I paid on time. I called twice about it.",
+     "metadata": {"product_category": "Credit Card", "issue": "Late fee"}, "similarity_score": 0.5}
+]
+
+def test_keeps_relevant_sentences_with_their_source():
+    embeddings = CountingEmbeddings()
+    compressor = ContextCompressor(embeddings, token_budget=20)
+    results = compressor.compress_batch(["why was a late fee charged on my credit card"] * 2, [DOCS, DOCS[:1]])
+    assert embeddings.calls == 1
+
+    docs, stats = results[0]
+    assert [doc["source_rank"] for doc in docs] == [2]
+    assert docs[0]["content"] == "The bank charged a late fee on my credit card although I paid on time."
+    assert docs[0]["metadata"]["issue"] == "Late fee"
+    assert stats["sentences_kept"] == 1 and stats["sentences_total"] == 4 and stats["ratio"] < 0.6
+    # The best sentence is always kept, even from an irrelevant source
+    assert results[1][1]["sentences_kept"] >= 1
+
+def test_pipeline_prompts_with_compressed_context(hashing_embeddings, fixture_vector_store):
+    rag = RAGPipeline(config_path="missing-config.yaml", embeddings=hashing_embeddings,
+                      vector_store=fixture_vector_store, generator=FixtureGenerator())
+    version = rag.prompt_version
+    rag.compressor = ContextCompressor(hashing_embeddings, token_budget=8)
+    assert rag.prompt_version != version
+
+    response = rag.generate_answer("unauthorized charge on my credit card", k=2)
+    assert response["served_by"] == "generator" and response["num_sources"] == 2
+    assert response["compression"]["compressed_tokens"] <= response["compression"]["original_tokens"]
+    assert response["answer"].startswith("Customers report: Source 1 (Product: Credit Card, Issue: Unauthorized charge): "
+                                         "I had an unauthorized charge on my credit card.")
@@ -0,0 +1,38 @@
+from src.rag_pipeline import RAGPipeline
+import time
+import pytest
+
+@pytest.fixture
+def offline_pipeline(hashing_embeddings, fixture_vector_store):
+    return RAGPipeline(config_path="missing-config.yaml", embeddings=hashing_embeddings,
+                       vector_store=fixture_vector_store)
+
+def test_generation_failure_falls_back_to_retrieved_documents(offline_pipeline, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(offline_pipeline, "_generate_with_huggingface", broken)
+    response = offline_pipeline.query("unauthorized credit card charge")
+    assert response["served_by"] == "extractive_fallback"
+    assert "Credit Card" in response["answer"] and response["num_sources"] == 2
+
+def test_exhausted_deadline_skips_generation(offline_pipeline, monkeypatch):
+    calls = []
+    monkeypatch.setattr(offline_pipeline, "_generate_with_huggingface", lambda *a, **kw: calls.append(a))
+    response = offline_pipeline.query("loan rejected", deadline_ms=1)
+    assert response["served_by"] == "extractive_deadline" and not calls
+
+    responses = offline_pipeline.query_batch(["loan rejected", "card charge"], deadline=time.monotonic() - 1)
+    assert [r["served_by"] for r in responses] == ["extractive_deadline"] * 2
+
+def test_generation_receives_remaining_budget(offline_pipeline, monkeypatch):
+    budgets = []
+
+    def generate(prompt, model_name, max_time=None):
+        budgets.append(max_time)
+        return "Customers report unauthorized charges."
+
+    monkeypatch.setattr(offline_pipeline, "_generate_with_huggingface", generate)
+    response = offline_pipeline.query("card charge", deadline_ms=5000)
+    assert response["served_by"] == "generator"
+    assert 0 < budgets[0] <= 5.0
@@ -0,0 +1,35 @@
+from src.eda_utils import EDAStats, perform_streaming_eda
+import numpy as np
+import pandas as pd
+
+def _raw_frame(n_rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    narratives = [" ".join(["word"] * int(k)) + "\tend\x0bx" for k in rng.integers(1, 400, size=n_rows)]
+    df = pd.DataFrame({
+        "Product": rng.choice(["Credit card", "Mortgage", "Personal loan"], size=n_rows),
+        "Consumer complaint narrative": narratives,
+    })
+    df.loc[rng.random(n_rows) < 0.25, "Consumer complaint narrative"] = np.nan
+    return df
+
+def test_merged_chunk_stats_match_in_memory_describe():
+    df = _raw_frame()
+    stats = EDAStats()
+    for start in range(0, len(df), 37):
+        stats.merge(EDAStats.from_chunk(df.iloc[start:start + 37]))
+
+    expected = df["Consumer complaint narrative"].dropna().str.split().str.len().describe()
+    pd.testing.assert_series_equal(stats.describe(), expected, check_names=False)
+    assert stats.total == len(df)
+    assert stats.missing_narratives == df["Consumer complaint narrative"].isna().sum()
+    assert stats.product_counts.to_dict() == df["Product"].value_counts().to_dict()
+
+def test_streaming_eda_writes_plots(tmp_path):
+    csv_path = tmp_path / "raw.csv"
+    _raw_frame().to_csv(csv_path, index=False)
+
+    stats = perform_streaming_eda(str(csv_path), output_dir=str(tmp_path / "images"), chunk_size=50, workers=2)
+
+    assert stats.total == 200
+    assert (tmp_path / "images" / "product_distribution.png").exists()
+    assert (tmp_path / "images" / "narrative_length_dist.png").exists()
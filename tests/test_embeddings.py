@@ -1,16 +1,31 @@
 import numpy as np
 from src.rag_pipeline import RAGPipeline
+from src.embeddings import HashingEmbeddings, create_embeddings
 import pytest
 
+def test_hashing_embeddings_are_deterministic_and_normalised():
+    first = HashingEmbeddings(size=384).embed_documents(["late fee on my credit card", "loan rejected"])
+    second = create_embeddings("hashing:384").embed_documents(["late fee on my credit card", "loan rejected"])
+    assert first == second
+    assert len(first[0]) == 384
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+
+def test_embedding_type(rag_pipeline):
+    test_text = "Standardizing this text to vector."
+    vector = rag_pipeline.embeddings.embed_query(test_text)
+    assert isinstance(vector, list)
+    assert isinstance(vector[0], float)
+
+@pytest.mark.real_models
 def test_embedding_dimension():
     # We mock the embedding generation or check the configured model
     rag = RAGPipeline()
     embedding_dim = rag.embeddings.client.get_sentence_embedding_dimension()
     assert embedding_dim == 384  # MiniLM-L6-v2 dimension
 
-def test_embedding_type():
+@pytest.mark.real_models
+def test_real_embedding_type():
     rag = RAGPipeline()
-    test_text = "Standardizing this text to vector."
-    vector = rag.embeddings.embed_query(test_text)
+    vector = rag.embeddings.embed_query("Standardizing this text to vector.")
     assert isinstance(vector, list)
     assert isinstance(vector[0], float)
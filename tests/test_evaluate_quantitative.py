@@ -0,0 +1,51 @@
+from src.evaluate_quantitative import MetricsEngine, split_sentences, write_metrics
+from sklearn.feature_extraction.text import HashingVectorizer
+import json
+import numpy as np
+
+class BagOfWordsEmbeddings:
+    def __init__(self):
+        self.vectorizer = HashingVectorizer(n_features=512, alternate_sign=False)
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return self.vectorizer.transform(texts).toarray().tolist()
+
+QUESTIONS = ["why are credit card late fees charged", "why was my transfer delayed", "how do customers describe fraud"]
+ANSWERS = [
+    "The bank charged a late fee on the credit card. Customers paid on time.",
+    "Weather patterns in tropical regions vary widely.",
+    "Information not available."
+]
+CONTEXTS = [
+    ["The bank charged a late fee on the credit card even though I paid on time.", "Customers paid on time."],
+    ["My money transfer was delayed for two weeks."],
+    []
+]
+
+def test_split_sentences():
+    assert split_sentences("First one. Second!\nThird? ok") == ["First one.", "Second!", "Third?"]
+
+def test_scores_grounded_answers_above_ungrounded_ones():
+    embeddings = BagOfWordsEmbeddings()
+    df = MetricsEngine(embeddings, batch_size=4).score(QUESTIONS, ANSWERS, CONTEXTS)
+
+    assert df.loc[0, "faithfulness"] > 0.9 and df.loc[0, "supported_ratio"] == 1.0
+    assert df.loc[1, "faithfulness"] < 0.2 and df.loc[1, "supported_ratio"] == 0.0
+    # Refusals are faithful; no sources means no context relevance
+    assert df.loc[2, "faithfulness"] == 1.0 and df.loc[2, "context_relevance"] == 0.0
+    assert df.loc[0, "answer_relevancy"] > df.loc[1, "answer_relevancy"]
+    assert df["answer_sentences"].tolist() == [2, 1, 1]
+    # Texts are deduplicated and encoded in batches of 4
+    assert embeddings.calls == 3
+
+def test_block_size_does_not_change_scores(tmp_path):
+    one = MetricsEngine(BagOfWordsEmbeddings(), block_size=1).score(QUESTIONS, ANSWERS, CONTEXTS)
+    many = MetricsEngine(BagOfWordsEmbeddings(), block_size=64).score(QUESTIONS, ANSWERS, CONTEXTS)
+    assert np.allclose(one.drop(columns=["question"]).values, many.drop(columns=["question"]).values)
+
+    paths = write_metrics(many, str(tmp_path))
+    with open(paths["json"]) as f:
+        report = json.load(f)
+    assert report["questions"] == 3 and "faithfulness" in report["aggregate"]
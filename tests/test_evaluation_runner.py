@@ -0,0 +1,80 @@
+from src.evaluation_runner import EvaluationRunner, compare_to_baseline, save_baseline
+from src.context_compression import ContextCompressor
+from src.evaluate_quantitative import faithfulness
+from src.rag_pipeline import RAGPipeline
+from tests.conftest import FixtureGenerator
+import json
+
+class FakePipeline:
+    vector_store_path = "missing-vector-store"
+    embedding_model_name = "fake-embeddings"
+    llm_model_name = "fake-llm"
+    top_k = 2
+
+    def __init__(self, complaint_ids=(1, 2)):
+        self.complaint_ids = complaint_ids
+        self.calls = 0
+
+    def query(self, question, k=None, return_context=False):
+        self.calls += 1
+        retrieved = [{"content": f"complaint about {question}", "metadata": {"complaint_id": cid, "chunk_index": 0},
+                      "similarity_score": 0.1} for cid in self.complaint_ids[:k]]
+        return {"answer": f"complaint about {question}", "sources": [], "num_sources": k, "served_by": "generator",
+                "retrieved": retrieved, "context": [doc["content"] for doc in retrieved]}
+
+def test_second_run_is_served_from_cache(tmp_path):
+    questions = [f"fees question {i}" for i in range(6)]
+    pipeline = FakePipeline()
+
+    first = EvaluationRunner(pipeline, cache_dir=str(tmp_path), workers=3, index_version="v1").run(questions)
+    second = EvaluationRunner(pipeline, cache_dir=str(tmp_path), workers=3, index_version="v1").run(questions)
+
+    assert [record["question"] for record in first] == questions
+    assert pipeline.calls == 6
+    assert all(record["generation_cached"] for record in second)
+    assert [record["answer"] for record in second] == [record["answer"] for record in first]
+    assert [record["source_ids"] for record in second] == [record["source_ids"] for record in first]
+
+    # A new index version invalidates the cache
+    EvaluationRunner(pipeline, cache_dir=str(tmp_path), index_version="v2").run(questions[:1])
+    assert pipeline.calls == 7
+
+def test_baseline_gate_flags_retrieval_regression(tmp_path):
+    questions = ["why fees", "why fraud"]
+    baseline_path = str(tmp_path / "baseline.json")
+    records = EvaluationRunner(FakePipeline(), cache_dir=str(tmp_path / "a"), index_version="v1").run(questions)
+    save_baseline(baseline_path, records)
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    assert compare_to_baseline(records, baseline) == []
+
+    drifted = EvaluationRunner(FakePipeline(complaint_ids=(3, 4)), cache_dir=str(tmp_path / "b"),
+                               index_version="v2").run(questions)
+    # Latencies of the fake pipeline are microseconds of noise; only retrieval is under test
+    failures = compare_to_baseline(drifted, baseline, {"max_latency_increase": float("inf")})
+    assert len(failures) == 1 and failures[0].startswith("Retrieval overlap")
+
+def test_baseline_gate_refuses_a_baseline_scored_differently(tmp_path):
+    records = EvaluationRunner(FakePipeline(), cache_dir=str(tmp_path), index_version="v1").run(["why fees"])
+    baseline_path = str(tmp_path / "baseline.json")
+    save_baseline(baseline_path, records)
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    assert baseline["metrics"] == "keyword"
+
+    embedding_scored = [{**record, "metrics": {"context_precision": 1.0}} for record in records]
+    failures = compare_to_baseline(embedding_scored, baseline)
+    assert len(failures) == 1 and "--update_baseline" in failures[0]
+
+def test_scores_use_the_context_the_answer_was_generated_from(tmp_path, hashing_embeddings, fixture_vector_store):
+    rag = RAGPipeline(config_path="missing-config.yaml", embeddings=hashing_embeddings,
+                      vector_store=fixture_vector_store, generator=FixtureGenerator())
+    rag.compressor = ContextCompressor(hashing_embeddings, token_budget=8)
+    question = "unauthorized charge on my credit card"
+
+    record = EvaluationRunner(rag, cache_dir=str(tmp_path), index_version="v1").run([question])[0]
+    response = rag.query(question, k=rag.top_k, return_context=True)
+    assert record["source_ids"] == ["1:", "2:"]
+    assert response["context"] == ["I had an unauthorized charge on my credit card."]
+    assert record["faithfulness_score"] == faithfulness(record["answer"], " ".join(response["context"]))
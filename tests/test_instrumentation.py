@@ -0,0 +1,37 @@
+from src.instrumentation import Instrumentation
+
+def test_nested_traces_record_once_with_stage_timings():
+    metrics = Instrumentation()
+    with metrics.trace() as outer:
+        with metrics.stage("embed_query"):
+            pass
+        with metrics.trace() as inner:
+            assert inner is outer
+            with metrics.stage("faiss_search"):
+                pass
+            metrics.count("generator_cache_hit")
+        timings = outer.as_dict()
+
+    assert {"embed_query_ms", "faiss_search_ms", "total_ms"} <= set(timings)
+    assert timings["generator_cache_hit"] == 1
+    assert metrics.histograms["total"].count == 1
+    assert metrics.histograms["faiss_search"].count == 1
+
+def test_disabled_instrumentation_is_a_noop():
+    metrics = Instrumentation(enabled=False)
+    with metrics.trace() as trace:
+        assert trace is None
+        with metrics.stage("generate"):
+            metrics.count("prompt_tokens", 10)
+        assert not metrics.active
+    assert metrics.histograms == {} and metrics.counters == {}
+
+def test_prometheus_rendering():
+    metrics = Instrumentation(buckets=(0.1, 1.0))
+    with metrics.trace():
+        metrics.count("generated_tokens", 7)
+    text = metrics.render_prometheus()
+    assert 'rag_stage_seconds_bucket{stage="total",le="0.1"} 1' in text
+    assert 'rag_stage_seconds_bucket{stage="total",le="+Inf"} 1' in text
+    assert 'rag_stage_seconds_count{stage="total"} 1' in text
+    assert 'rag_events_total{event="generated_tokens"} 7' in text
@@ -1,12 +1,7 @@
 from src.rag_pipeline import RAGPipeline
 import pytest
 
-def test_full_rag_flow():
-    """
-    Integration test: Query -> Retrieval -> Generation
-    Ensures all components work together.
-    """
-    rag = RAGPipeline()
+def _check_full_rag_flow(rag):
     query = "What are common complaints about credit cards?"
     
     # 1. Test Query
@@ -25,3 +20,15 @@ def test_full_rag_flow():
     for source in response["sources"]:
         assert "content" in source
         assert "metadata" in source
+
+def test_full_rag_flow(rag_pipeline):
+    """
+    Integration test: Query -> Retrieval -> Generation
+    Ensures all components work together.
+    """
+    _check_full_rag_flow(rag_pipeline)
+
+@pytest.mark.real_models
+def test_full_rag_flow_with_real_models():
+    """Same flow with the configured models and the production index."""
+    _check_full_rag_flow(RAGPipeline())
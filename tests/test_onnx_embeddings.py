@@ -0,0 +1,66 @@
+from src.embeddings import HashingEmbeddings, create_embeddings
+from src.onnx_embeddings import DEFAULT_MODEL, OnnxEmbeddings, export_onnx, mean_pool, parity_check
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+WORDS = ["late", "fee", "on", "my", "credit", "card", "transfer", "was", "delayed", "again"]
+
+class _StubSession:
+    """Encoder whose hidden state per token is (id, id**2, 1), over a model without token_type_ids."""
+
+    def __init__(self):
+        self.batches = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def run(self, output_names, inputs):
+        assert set(inputs) == {"input_ids", "attention_mask"}
+        ids = inputs["input_ids"].astype(np.float32)
+        self.batches.append(ids.shape)
+        return [np.stack([ids, ids ** 2, np.ones_like(ids)], axis=-1)]
+
+def _stub_embeddings(batch_size):
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+
+    tokenizer = Tokenizer(WordLevel({"[PAD]": 0, "[UNK]": 1, **{w: i + 2 for i, w in enumerate(WORDS)}},
+                                    unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    return OnnxEmbeddings("unused", batch_size=batch_size, max_length=4, session=_StubSession(), tokenizer=tokenizer)
+
+def test_mean_pool_ignores_padding():
+    hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    pooled = mean_pool(hidden, np.array([[1, 1, 0]]), normalize=False)
+    assert np.allclose(pooled, [[2.0, 0.0]])
+    assert np.allclose(np.linalg.norm(mean_pool(hidden, np.array([[1, 1, 0]])), axis=1), 1.0)
+
+def test_parity_check_reports_cosine():
+    texts = ["late fee on my credit card", "my transfer was delayed"]
+    same = parity_check(HashingEmbeddings(384), HashingEmbeddings(384), texts)
+    assert same["min_cosine"] > 0.999 and same["max_abs_diff"] < 1e-6
+    assert same["texts"] == 2
+
+def test_length_sorted_batches_are_returned_in_input_order():
+    embeddings = _stub_embeddings(batch_size=2)
+    texts = ["late fee on my credit card", "fee", "my transfer was delayed again", "card was late", "on"]
+    vectors = np.asarray(embeddings.embed_documents(texts))
+
+    # Batches are built shortest first (truncated to max_length), so padding stays small
+    assert embeddings.session.batches == [(2, 1), (2, 4), (1, 4)]
+    assert np.allclose(vectors, [embeddings.embed_query(text) for text in texts])
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert embeddings.embed_documents([]) == []
+
+@pytest.mark.real_models
+def test_quantized_export_matches_pytorch_model(tmp_path):
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    export_onnx(DEFAULT_MODEL, str(tmp_path))
+    onnx = create_embeddings(f"onnx:{tmp_path}")
+    assert isinstance(onnx, OnnxEmbeddings)
+    texts = ["Why was I charged a late fee on my credit card?", "My money transfer never arrived.", "fee"]
+    result = parity_check(HuggingFaceEmbeddings(model_name=DEFAULT_MODEL), onnx, texts)
+    assert result["min_cosine"] > 0.99
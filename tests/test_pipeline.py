@@ -1,14 +1,18 @@
-from src.rag_pipeline import RAGPipeline
 import pytest
 
-def test_pipeline_response_keys():
-    rag = RAGPipeline()
-    response = rag.query("Test question?")
+def test_pipeline_response_keys(rag_pipeline):
+    response = rag_pipeline.query("Test question?")
     expected_keys = {"answer", "sources", "query", "num_sources"}
     assert all(key in response for key in expected_keys)
 
-def test_pipeline_invalid_input():
-    rag = RAGPipeline()
-    response = rag.query(None)
+def test_pipeline_invalid_input(rag_pipeline):
+    response = rag_pipeline.query(None)
     assert "Please provide a valid question" in response["answer"]
     assert response["sources"] == []
+
+def test_injected_components_are_used(rag_pipeline, hashing_embeddings, fixture_vector_store):
+    assert rag_pipeline.embeddings is hashing_embeddings
+    assert rag_pipeline.vector_store is fixture_vector_store
+    response = rag_pipeline.query("unauthorized credit card charge")
+    assert response["served_by"] == "generator"
+    assert response["answer"].startswith("Customers report:")
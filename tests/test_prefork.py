@@ -0,0 +1,98 @@
+from src.prefork import PreforkPool, process_memory_mb
+from src.instrumentation import Instrumentation
+import os
+import signal
+import threading
+import time
+import pytest
+
+class _FakePipeline:
+    def __init__(self):
+        self.loaded_in = None
+        self.index = list(range(100000))  # stands in for the shared FAISS index
+        self.metrics = Instrumentation()
+
+    def load_models(self):
+        self.loaded_in = os.getpid()
+
+    def query(self, question, **kwargs):
+        if question == "boom":
+            raise ValueError("bad question")
+        with self.metrics.trace():
+            time.sleep(0.05)
+        return {"answer": question, "pid": os.getpid(), "models_loaded_in": self.loaded_in}
+
+    def resolve_deadline(self, deadline_ms=None):
+        return None
+
+    cube = "cube"
+
+    def query_aggregate(self, filters=None, group_by=None, limit=10):
+        return {"aggregate": {"filters": filters, "group_by": group_by}}
+
+@pytest.fixture
+def pool():
+    pool = PreforkPool(_FakePipeline(), workers=2).start()
+    yield pool
+    pool.close()
+
+def test_requests_are_spread_over_workers_with_models_loaded_after_fork(pool):
+    futures = [pool.submit("query", f"q{i}") for i in range(6)]
+    responses = [future.result(timeout=10) for future in futures]
+
+    assert [r["answer"] for r in responses] == [f"q{i}" for i in range(6)]
+    assert {r["pid"] for r in responses} == set(pool.worker_pids)
+    assert all(r["models_loaded_in"] == r["pid"] != os.getpid() for r in responses)
+
+def test_worker_errors_are_raised_to_the_caller(pool):
+    with pytest.raises(RuntimeError, match="bad question"):
+        pool.query("boom")
+    assert pool.query("still alive")["answer"] == "still alive"
+
+def test_aggregates_are_served_by_the_pool(pool):
+    assert pool.cube is not None
+    assert pool.query_aggregate({"state": "CA"}, ["company"])["aggregate"]["group_by"] == ["company"]
+
+def test_metrics_are_summed_over_workers(pool):
+    for future in [pool.submit("query", f"q{i}") for i in range(4)]:
+        future.result(timeout=10)
+    assert pool.metrics.histograms["total"].count == 4
+    assert 'rag_stage_seconds_count{stage="total"} 4' in pool.metrics.render_prometheus()
+
+def test_a_killed_worker_fails_its_requests_and_leaves_rotation():
+    pool = PreforkPool(_FakePipeline(), workers=2, liveness_interval=0.2).start()
+    stop = threading.Event()
+
+    def steady_load():
+        # Keeps results flowing from the surviving worker so the results queue never idles
+        while not stop.is_set():
+            try:
+                pool.query("load")
+            except RuntimeError:
+                pass
+
+    load = threading.Thread(target=steady_load)
+    try:
+        load.start()
+        futures = [pool.submit("query", f"q{i}") for i in range(6)]
+        os.kill(pool.worker_pids[0], signal.SIGKILL)
+
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result(timeout=10)["pid"])
+            except RuntimeError as e:
+                outcomes.append(str(e))
+        assert any("exited" in str(outcome) for outcome in outcomes)
+
+        survivor = pool.worker_pids[1]
+        assert {pool.query(f"after{i}")["pid"] for i in range(4)} == {survivor}
+        assert pool.metrics.histograms["total"].count > 0
+    finally:
+        stop.set()
+        load.join(timeout=10)
+        pool.close()
+
+def test_process_memory_report():
+    memory = process_memory_mb(os.getpid())
+    assert memory["rss_mb"] > 0 and 0 < memory["private_mb"] <= memory["rss_mb"]
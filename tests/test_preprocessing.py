@@ -0,0 +1,172 @@
+from src.build_vector_store import (
+    apply_delta_to_vector_store, build_and_save_vector_store, chunk_complaints, load_and_sample_data
+)
+from src.preprocessing import (
+    clean_narrative, clean_narratives, delta_path_for, incremental_state_paths, process_dataset,
+    read_duplicate_counts, read_processed_parquet
+)
+import json
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+EDGE_CASES = [
+    "I am writing to file a complaint about my CREDIT card!!!",
+    "To Whom It May Concern,\n\tmy  loan\x0bwas denied.\x1c ",
+    "to whom it may conceto whom it may concernrn",
+    "i am writing to file a complainto whom it may concern",
+    "Café İstanbul — charges of $300.00 (unauthorized) fee",
+    "XXXX/XXXX/2020 {card} #1234 ... ok?",
+    "",
+    "   ",
+    None,
+    np.nan,
+    12345,
+]
+
+def _write_raw(path, n_rows=60):
+    products = ["Credit card or prepaid card", "Mortgage", "Checking or savings account", "Student loan"]
+    rows = []
+    for i in range(n_rows):
+        narrative = EDGE_CASES[i % len(EDGE_CASES)]
+        rows.append({
+            "Date received": "2023-01-01",
+            "Product": products[i % len(products)],
+            "Issue": f"Issue {i % 3}",
+            "Consumer complaint narrative": narrative if isinstance(narrative, str) else np.nan,
+            "Company": "Company XYZ",
+            "Complaint ID": 1000 + i,
+        })
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+def test_clean_narratives_matches_reference():
+    expected = [clean_narrative(text) for text in EDGE_CASES]
+    assert clean_narratives(EDGE_CASES) == expected
+    assert clean_narratives(pd.Series(EDGE_CASES, dtype=object)) == expected
+
+def test_process_dataset_output_independent_of_workers(tmp_path):
+    raw = tmp_path / "raw.csv"
+    _write_raw(raw)
+    serial, parallel = tmp_path / "serial.csv", tmp_path / "parallel.csv"
+
+    count_serial = process_dataset(str(raw), str(serial), chunk_size=7, workers=1)
+    count_parallel = process_dataset(str(raw), str(parallel), chunk_size=7, workers=2)
+
+    assert count_serial == count_parallel > 0
+    assert serial.read_bytes() == parallel.read_bytes()
+
+    df = pd.read_csv(serial, keep_default_na=False)
+    assert set(df["Product"]) == {"Credit card or prepaid card", "Checking or savings account"}
+    expected = [clean_narrative(text) for text in df["Consumer complaint narrative"]]
+    assert df["cleaned_narrative"].tolist() == expected
+
+def test_parquet_output_is_partitioned_and_prunable(tmp_path):
+    raw = tmp_path / "raw.csv"
+    _write_raw(raw)
+    csv_out, parquet_out = tmp_path / "out.csv", tmp_path / "parquet"
+
+    expected = process_dataset(str(raw), str(csv_out), chunk_size=7)
+    assert process_dataset(str(raw), str(parquet_out), chunk_size=7, output_format="parquet") == expected
+    assert any(path.name.startswith("Product=") for path in parquet_out.iterdir())
+
+    df = read_processed_parquet(str(parquet_out), columns=["Complaint ID", "Date received", "cleaned_narrative"],
+                                products=["Credit card or prepaid card"], years=[2023])
+    assert list(df.columns) == ["Complaint ID", "Date received", "cleaned_narrative"]
+    assert set(df["Date received"]) == {"2023-01-01"}
+    csv_df = pd.read_csv(csv_out, keep_default_na=False)
+    credit = csv_df[csv_df["Product"] == "Credit card or prepaid card"]
+    assert sorted(df["Complaint ID"]) == sorted(credit["Complaint ID"])
+
+def test_parquet_keeps_values_after_an_all_null_leading_chunk(tmp_path):
+    raw = tmp_path / "raw.csv"
+    pd.DataFrame([{
+        "Date received": "2023-01-01",
+        "Product": "Credit card",
+        "Issue": "Billing",
+        "Sub-issue": np.nan if i < 20 else "Late fee",
+        "Consumer complaint narrative": f"complaint number {i}",
+        "Company": "Company XYZ",
+        "State": "NY",
+        "Complaint ID": i,
+    } for i in range(40)]).to_csv(raw, index=False)
+
+    process_dataset(str(raw), str(tmp_path / "parquet"), chunk_size=10, output_format="parquet")
+    df = read_processed_parquet(str(tmp_path / "parquet")).sort_values("Complaint ID")
+    assert len(df) == 40
+    assert df["Sub-issue"].isna().tolist() == [True] * 20 + [False] * 20
+    assert set(df["Sub-issue"].dropna()) == {"Late fee"}
+
+def test_minhash_dedup_keeps_first_representative(tmp_path):
+    base = "my credit card was charged twice for the same purchase and the bank refused to refund the second charge"
+    narratives = [base, "the money transfer never arrived and nobody at the company would explain why", base + " again", base]
+    raw = tmp_path / "raw.csv"
+    pd.DataFrame({
+        "Date received": "2023-01-01",
+        "Product": "Credit card or prepaid card",
+        "Consumer complaint narrative": narratives,
+        "Complaint ID": [1, 2, 3, 4],
+    }).to_csv(raw, index=False)
+    out = tmp_path / "out.csv"
+
+    # chunk_size=2 forces duplicates to be matched across chunks
+    assert process_dataset(str(raw), str(out), chunk_size=2, dedup=True) == 2
+    assert pd.read_csv(out)["Complaint ID"].tolist() == [1, 2]
+    assert read_duplicate_counts(str(out)).to_dict() == {1: 2}
+
+def test_incremental_run_only_processes_new_and_amended_rows(tmp_path):
+    raw, out = tmp_path / "raw.csv", tmp_path / "out.csv"
+    _write_raw(raw, n_rows=20)
+    process_dataset(str(raw), str(out), chunk_size=7)
+    assert not os.path.exists(incremental_state_paths(str(out))[0])
+    with pytest.raises(ValueError, match="track_state"):
+        process_dataset(str(raw), str(out), chunk_size=7, incremental=True)
+    first = process_dataset(str(raw), str(out), chunk_size=7, track_state=True)
+
+    # Next export: one amended complaint plus one brand-new complaint
+    df = pd.read_csv(raw)
+    df.loc[df["Complaint ID"] == 1000, "Consumer complaint narrative"] = "Amended: the fee was charged again."
+    new_row = df[df["Complaint ID"] == 1002].assign(**{"Complaint ID": 5000, "Date received": "2023-02-01"})
+    pd.concat([df, new_row]).to_csv(raw, index=False)
+
+    assert process_dataset(str(raw), str(out), chunk_size=7, incremental=True) == 2
+    delta = pd.read_csv(delta_path_for(str(out)))
+    assert sorted(delta["Complaint ID"]) == [1000, 5000]
+    assert len(pd.read_csv(out)) == first + 2
+
+    with open(incremental_state_paths(str(out))[0]) as f:
+        watermark = json.load(f)
+    assert watermark["max_date_received"] == "2023-02-01"
+    assert watermark["last_run_new"] == 1 and watermark["last_run_amended"] == 1
+
+    # Nothing changed: nothing processed, empty delta
+    assert process_dataset(str(raw), str(out), chunk_size=7, incremental=True) == 0
+
+def test_applying_a_delta_replaces_amended_complaints_in_the_vector_store(tmp_path, hashing_embeddings):
+    from langchain_community.vectorstores import FAISS
+
+    raw, out, store_path = tmp_path / "raw.csv", tmp_path / "out.csv", str(tmp_path / "vector_store")
+    _write_raw(raw, n_rows=20)
+    process_dataset(str(raw), str(out), chunk_size=7, track_state=True)
+    documents = chunk_complaints(load_and_sample_data(str(out)), chunk_size=40, chunk_overlap=0)
+    build_and_save_vector_store(documents, "unused", store_path, embeddings=hashing_embeddings)
+
+    df = pd.read_csv(raw)
+    amended = "Amended: the late fee was charged twice on my statement and never refunded by the bank."
+    df.loc[df["Complaint ID"] == 1000, "Consumer complaint narrative"] = amended
+    new_row = df[df["Complaint ID"] == 1002].assign(**{"Complaint ID": 5000})
+    pd.concat([df, new_row]).to_csv(raw, index=False)
+    process_dataset(str(raw), str(out), chunk_size=7, incremental=True)
+
+    added = apply_delta_to_vector_store(delta_path_for(str(out)), "unused", store_path, chunk_size=40,
+                                        chunk_overlap=0, embeddings=hashing_embeddings)
+    store = FAISS.load_local(store_path, hashing_embeddings, allow_dangerous_deserialization=True)
+    chunks = {}
+    for doc in store.docstore._dict.values():
+        chunks.setdefault(str(doc.metadata["complaint_id"]), []).append(doc)
+
+    stale = sum(str(doc.metadata["complaint_id"]) == "1000" for doc in documents)
+    assert store.index.ntotal == len(store.docstore._dict) == len(documents) - stale + added
+    assert [doc.metadata["chunk_index"] for doc in chunks["1000"]] == list(range(len(chunks["1000"])))
+    assert all(doc.page_content in clean_narrative(amended) for doc in chunks["1000"])
+    assert len(chunks["5000"]) == len(chunks["1002"])
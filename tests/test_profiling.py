@@ -0,0 +1,33 @@
+from src.profiling import RequestProfiler
+import json
+import os
+
+def _work():
+    return sorted(str(i) for i in range(20000))
+
+def test_profile_writes_summary_and_stats(tmp_path):
+    profiler = RequestProfiler(output_dir=str(tmp_path), top_n=5)
+    with profiler.profile("why are fees high?") as record:
+        _work()
+        record["timings"] = {"total_ms": 1.0}
+
+    with open(record["path"]) as f:
+        summary = json.load(f)
+    assert summary["query"] == "why are fees high?" and summary["timings"] == {"total_ms": 1.0}
+    assert any("_work" in entry["function"] for entry in summary["top_functions"])
+    assert summary["top_allocations"] and summary["traced_memory_peak_mb"] > 0
+    assert os.path.exists(record["path"][:-5] + ".prof")
+
+def test_rotation_and_single_profile_at_a_time(tmp_path):
+    profiler = RequestProfiler(output_dir=str(tmp_path), max_profiles=2)
+    for _ in range(4):
+        with profiler.profile("q") as record:
+            with profiler.profile("concurrent") as nested:
+                assert nested is None
+    assert len(os.listdir(tmp_path)) == 4  # two .json + two .prof
+    assert record["path"] is not None and os.path.exists(record["path"])
+
+def test_sampling():
+    assert not RequestProfiler(sample_rate=0.0).should_profile()
+    assert RequestProfiler(sample_rate=0.0).should_profile(requested=True)
+    assert RequestProfiler(sample_rate=1.0).should_profile()
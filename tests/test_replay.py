@@ -0,0 +1,47 @@
+from src.replay import HTTPStatusError, replay, schedule
+from src.workload import WorkloadRecorder, read_workload
+import threading
+
+def test_recorder_appends_compact_lines_from_many_threads(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    recorder = WorkloadRecorder(path)
+
+    def record(i):
+        recorder.record(f"question {i}", 1000.0 + i, 0.25, k=5 if i % 2 else None, served_by="generator")
+
+    threads = [threading.Thread(target=record, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    recorder.close()
+
+    entries = sorted(read_workload(path), key=lambda entry: entry["t"])
+    assert len(entries) == 20
+    assert entries[0] == {"t": 1000.0, "q": "question 0", "ms": 250.0, "by": "generator"}
+    assert entries[1]["k"] == 5
+
+def test_schedule_modes():
+    entries = [{"t": 100.0}, {"t": 101.0}, {"t": 104.0}]
+
+    assert schedule(entries, "original").tolist() == [0.0, 1.0, 4.0]
+    assert schedule(entries, "scaled", speed=2.0).tolist() == [0.0, 0.5, 2.0]
+    open_loop = schedule(entries * 100, "open", rate=50.0)
+    assert open_loop[0] == 0.0 and (open_loop[1:] >= open_loop[:-1]).all()
+
+def test_replay_reports_latency_errors_and_stages():
+    entries = [{"t": float(i), "q": f"q{i}"} for i in range(10)]
+
+    def send(entry):
+        if entry["q"] == "q3":
+            raise HTTPStatusError(503)
+        return {"served_by": "generator", "timings": {"faiss_search_ms": 2.0, "total_ms": 5.0, "batch_size": 1}}
+
+    summary = replay(entries, schedule(entries, "scaled", speed=1000.0), send, max_in_flight=4)
+
+    assert summary["requests"] == 10
+    assert summary["errors_by_type"] == {"shed": 1}
+    assert summary["served_by"] == {"generator": 9}
+    assert sum(summary["histogram"].values()) == 9
+    assert summary["stages_ms"]["faiss_search"]["mean"] == 2.0
+    assert "batch_size" not in summary["stages_ms"]
@@ -0,0 +1,119 @@
+from src.rag_pipeline import RAGPipeline
+from src.segmented_index import SegmentedIndex, build_segments, split_vector_store
+from src.evaluation_runner import index_fingerprint
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+import json
+import os
+
+def _documents():
+    rows = [
+        ("2015-03-02", "Credit card", "Late fee charged on my credit card in 2015."),
+        ("2016-08-19", "Credit card", "Unauthorized charge on my credit card in 2016."),
+        ("2023-05-01", "Money transfer", "My wire transfer was lost and never refunded."),
+        ("2024-02-11", "Credit card", "A late fee was charged on my credit card although I paid."),
+        ("2024-09-30", "Personal loan", "My personal loan application was rejected."),
+    ]
+    return [
+        Document(page_content=text, metadata={"complaint_id": str(i), "date_received": day, "product_category": product})
+        for i, (day, product, text) in enumerate(rows)
+    ]
+
+def test_date_range_searches_only_overlapping_segments(tmp_path, hashing_embeddings):
+    root = str(tmp_path / "segments")
+    build_segments(_documents(), hashing_embeddings, root, period="year")
+    index = SegmentedIndex(root, hashing_embeddings, hot_window_days=365, max_cold_loaded=1)
+    assert [row["tier"] for row in index.stats()] == ["cold", "cold", "cold", "hot"]
+    assert not any(row["loaded"] for row in index.stats() if row["tier"] == "cold")
+
+    vector = [hashing_embeddings.embed_query("late fee on my credit card")]
+    recent = index.search(vector, k=3, filter={"date_from": "2024"})[0]
+    assert [recent.metadata(row)["date_received"][:4] for row in range(len(recent))] == ["2024", "2024"]
+    assert not any(row["loaded"] for row in index.stats() if row["tier"] == "cold")
+
+    window = index.search(vector, k=5, filter={"date_from": "2016-01-01", "date_to": "2023-12-31",
+                                                "product_category": "Credit card"})[0]
+    assert [window.metadata(row)["complaint_id"] for row in range(len(window))] == ["1"]
+    everything = index.search(vector, k=5)[0]
+    assert len(everything) == 5 and everything[0]["metadata"]["complaint_id"] in {"0", "3"}
+    assert sum(row["loaded"] for row in index.stats() if row["tier"] == "cold") == 1
+
+def test_compaction_merges_old_segments(tmp_path, hashing_embeddings):
+    documents = _documents() + [Document(page_content="Second 2015 complaint about a card fee.",
+                                         metadata={"complaint_id": "5", "date_received": "2015-11-05"})]
+    root = str(tmp_path / "segments")
+    split_vector_store(FAISS.from_documents(documents, hashing_embeddings), root, period="month")
+    index = SegmentedIndex(root, hashing_embeddings)
+    assert len(index.segments) == 6
+    fingerprint = index_fingerprint(root)
+
+    assert index.compact(before="2020-01-01", period="year") == 1
+    assert index_fingerprint(root) != fingerprint
+    assert [s.name for s in index.segments][0] == "2015-03-02_2015-11-05"
+    with open(os.path.join(root, "manifest.json")) as f:
+        manifest = json.load(f)
+    assert [entry["count"] for entry in manifest["segments"]] == [2, 1, 1, 1, 1]
+    assert manifest["generation"] == 1
+    assert [entry["name"] for entry in manifest["retired"]] == ["2015-03-02_2015-03-02", "2015-11-05_2015-11-05"]
+    # Retired directories outlive the compaction until they are old enough to purge
+    assert os.path.exists(os.path.join(root, "segments", "2015-03-02_2015-03-02"))
+    assert index.compact(before="2020-01-01", period="year", retain_seconds=0) == 0
+    assert not os.path.exists(os.path.join(root, "segments", "2015-03-02_2015-03-02"))
+
+    vector = [hashing_embeddings.embed_query("card fee")]
+    found = SegmentedIndex(root, hashing_embeddings).search(vector, k=5, filter={"date_to": "2015"})[0]
+    assert sorted(found.metadata(row)["complaint_id"] for row in range(len(found))) == ["0", "5"]
+
+def test_a_running_reader_switches_to_segments_compacted_by_another_process(tmp_path, hashing_embeddings):
+    documents = _documents() + [Document(page_content="Second 2015 complaint about a card fee.",
+                                         metadata={"complaint_id": "5", "date_received": "2015-11-05"})]
+    root = str(tmp_path / "segments")
+    split_vector_store(FAISS.from_documents(documents, hashing_embeddings), root, period="month")
+    server = SegmentedIndex(root, hashing_embeddings, hot_window_days=0, max_cold_loaded=1, reload_interval=0)
+    vector = [hashing_embeddings.embed_query("card fee")]
+    # Whole segments inside the window: no docstore is loaded until a row is read
+    lazy = server.search(vector, k=5, filter={"date_to": "2015"})[0]
+    assert not any(row["loaded"] for row in server.stats() if row["tier"] == "cold")
+
+    assert SegmentedIndex(root, hashing_embeddings).compact(before="2020-01-01", period="year") == 1
+
+    assert sorted(lazy.metadata(row)["complaint_id"] for row in range(len(lazy))) == ["0", "5"]
+    found = server.search(vector, k=5, filter={"date_to": "2015"})[0]
+    assert sorted(found.metadata(row)["complaint_id"] for row in range(len(found))) == ["0", "5"]
+    assert server.generation == 1 and server.segments[0].name == "2015-03-02_2015-11-05"
+
+def test_pipeline_retrieves_from_segments(tmp_path, hashing_embeddings):
+    root = str(tmp_path / "segments")
+    build_segments(_documents(), hashing_embeddings, root)
+    rag = RAGPipeline(config_path="missing-config.yaml", embeddings=hashing_embeddings,
+                      segments=SegmentedIndex(root, hashing_embeddings))
+    results = rag.retrieve_relevant_complaints("late fee credit card", k=2, filter={"date_to": "2015"})
+    assert [r["metadata"]["complaint_id"] for r in results] == ["0"]
+
+def test_rows_from_more_cold_segments_than_the_cap_load_each_once(tmp_path, hashing_embeddings, monkeypatch):
+    import pickle
+    import threading
+    from src import segmented_index
+
+    root = str(tmp_path / "segments")
+    build_segments(_documents(), hashing_embeddings, root, period="year")
+    index = SegmentedIndex(root, hashing_embeddings, hot_window_days=0, max_cold_loaded=1)
+    unpickled, load = [], pickle.load
+    monkeypatch.setattr(segmented_index.pickle, "load", lambda f: unpickled.append(f.name) or load(f))
+
+    result = index.search([hashing_embeddings.embed_query("credit card fee")], k=5)[0]
+    rows = list(result)
+    # Rows span the hot segment and all three cold ones; each cold docstore is unpickled once
+    assert len(rows) == 5 and len(set(result.segments.tolist())) == 4
+    assert len(unpickled) == len(set(unpickled)) == 3
+    assert sum(row["loaded"] for row in index.stats() if row["tier"] == "cold") == 1
+
+    unpickled.clear()
+    store = result._vector_store[0]
+    store.release()
+    threads = [threading.Thread(target=store.load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(unpickled) == 1
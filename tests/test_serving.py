@@ -0,0 +1,40 @@
+from src.serving import PipelineLoader, READY, FAILED
+
+class _FakePipeline:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, question):
+        self.queries.append(question)
+        return {"answer": question, "sources": []}
+
+def test_loader_publishes_pipeline_and_runs_warmup():
+    loaded = []
+    loader = PipelineLoader(_FakePipeline, warmup_queries=["a", "b"], on_loaded=loaded.append).start()
+    assert loader.wait_until_ready(timeout=5)
+
+    status = loader.status()
+    assert status["state"] == READY and status["progress"] == 1.0
+    assert loaded[0] is loader.pipeline and loader.pipeline.queries == ["a", "b"]
+    assert loader.time_to_first_answer is not None
+
+def test_loader_reports_failure():
+    def broken():
+        raise RuntimeError("vector store missing")
+
+    loader = PipelineLoader(broken, warmup_queries=["a"]).start()
+    assert loader.wait_until_ready(timeout=5)
+    assert not loader.is_serving
+    assert loader.status()["state"] == FAILED and "vector store missing" in loader.status()["error"]
+
+def test_warmup_errors_do_not_take_a_served_pipeline_offline():
+    class _FlakyPipeline(_FakePipeline):
+        def query(self, question):
+            if question == "bad":
+                raise RuntimeError("worker exited")
+            return super().query(question)
+
+    loader = PipelineLoader(_FlakyPipeline, warmup_queries=["bad", "good"]).start()
+    assert loader.wait_until_ready(timeout=5)
+    assert loader.status()["state"] == READY and loader.status()["error"] is None
+    assert loader.pipeline.queries == ["good"]
@@ -0,0 +1,37 @@
+from src.preprocessing import NARRATIVE_COL, filter_complaints
+from src.synthetic_corpus import COLUMNS, SyntheticCorpus, generate_corpus
+import pandas as pd
+
+def test_chunk_matches_cfpb_schema_and_rates():
+    corpus = SyntheticCorpus(seed=1, narrative_rate=0.5, duplicate_rate=0.2, near_duplicate_share=0.0)
+    df = corpus.chunk(5000)
+
+    assert list(df.columns) == COLUMNS
+    assert df["Complaint ID"].is_unique
+    assert (pd.to_datetime(df["Date sent to company"]) >= pd.to_datetime(df["Date received"])).all()
+
+    narratives = df[NARRATIVE_COL].dropna()
+    assert 0.45 < len(narratives) / len(df) < 0.55
+    assert 0.15 < narratives.duplicated().mean() < 0.25
+    # The target products survive filtering, others are dropped
+    assert 0 < len(filter_complaints(df)) < len(narratives)
+
+def test_streamed_csv_and_parquet_agree(tmp_path):
+    csv_path = str(tmp_path / "raw.csv")
+    parquet_path = str(tmp_path / "raw.parquet")
+
+    counts = generate_corpus(csv_path, 2500, chunk_rows=1000, seed=7)
+    generate_corpus(parquet_path, 2500, chunk_rows=1000, seed=7)
+
+    from_csv = pd.read_csv(csv_path, dtype={"ZIP code": str})
+    from_parquet = pd.read_parquet(parquet_path)
+    assert counts == {"rows": 2500, "narratives": int(from_csv[NARRATIVE_COL].notna().sum())}
+    assert from_csv["Complaint ID"].tolist() == from_parquet["Complaint ID"].tolist()
+    assert from_csv[NARRATIVE_COL].fillna("").tolist() == from_parquet[NARRATIVE_COL].fillna("").tolist()
+
+def test_parquet_with_small_trailing_chunk(tmp_path):
+    path = str(tmp_path / "raw.parquet")
+    counts = generate_corpus(path, 1001, chunk_rows=1000, seed=3)
+    df = pd.read_parquet(path)
+    assert counts["rows"] == len(df) == 1001
+    assert df["Complaint ID"].is_unique